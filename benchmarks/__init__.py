@@ -0,0 +1,4 @@
+"""
+Benchmarks for DeltaStrik.
+Run individual modules with ``python -m benchmarks.<name>`` from the repo root.
+"""
@@ -0,0 +1,80 @@
+# benchmarks/bench_prefill.py
+"""
+Time to first token with and without speculative prefill (``prefill``), through
+the TUI against a fake server that emulates Ollama's prefix (KV) cache.
+
+The session starts with more history than the context budget holds, so every
+turn slides the window and the whole prompt would be evaluated again: the
+long-session case prefill is for. Each turn types a message, pauses like a
+user reading it over, then presses Enter.
+
+    python -m benchmarks.bench_prefill [turns] [prompt_ms_per_token] [pause_s]
+"""
+
+import asyncio
+import random
+import statistics
+import sys
+from typing import Dict, List
+
+from benchmarks.fake_ollama import start_server
+from deltastrik.core.config import load_config
+from deltastrik.utils.logging_utils import configure_logging
+
+WORDS = "the model keeps history context tokens summary prompt cache latency throughput stream reply".split()
+
+
+def run(prefill: bool, turns: int, prompt_ms_per_token: float, pause_s: float) -> Dict[str, List[float]]:
+    from deltastrik.tui.app import DeltaStrikApp
+
+    server = start_server(prompt_ms_per_token=prompt_ms_per_token)
+    config = load_config()
+    config.update({"ollama_url": server.url, "stream": True, "session_db": "", "memory": False, "prefill": prefill, "prefill_idle_ms": 300})
+    # No auto-compaction: the window has to keep sliding, and the history length is how turns are counted
+    config["auto_compact_tokens"] = 10**9
+    rng = random.Random(5)
+    app = DeltaStrikApp(config)
+    ttft: List[float] = []
+    evaluated: List[float] = []
+
+    async def main() -> None:
+        async with app.run_test(size=(120, 40)) as pilot:
+            for i in range(400):
+                app.session._append("user" if i % 2 == 0 else "assistant", " ".join(rng.choice(WORDS) for _ in range(60)))
+            for i in range(turns):
+                expected = app.session.conversation_length + 2
+                app.input_bar.value = f"question {i}: " + " ".join(rng.choice(WORDS) for _ in range(12))
+                await asyncio.sleep(pause_s)
+                await pilot.press("enter")
+                while app.session.conversation_length < expected:
+                    await asyncio.sleep(0.001)
+                record = app.session.metrics.records[-1]
+                ttft.append(record.ttft_ms or 0.0)
+                evaluated.append(record.prompt_eval_count)
+                await pilot.pause()
+
+    try:
+        asyncio.run(main())
+    finally:
+        server.shutdown()
+    return {"ttft_ms": ttft, "prompt_eval_count": evaluated}
+
+
+def main() -> None:
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    prompt_ms_per_token = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    pause_s = float(sys.argv[3]) if len(sys.argv) > 3 else 2.5
+    configure_logging("WARNING")
+
+    print(f"{turns} turns, {prompt_ms_per_token} ms per uncached prompt token, {pause_s} s pause before Enter\n")
+    print(f"{'mode':<10} {'TTFT median ms':>15} {'TTFT max ms':>12} {'prompt tokens evaluated':>24}")
+    for prefill in (False, True):
+        result = run(prefill, turns, prompt_ms_per_token, pause_s)
+        print(
+            f"{'prefill' if prefill else 'baseline':<10} {statistics.median(result['ttft_ms']):15.0f} "
+            f"{max(result['ttft_ms']):12.0f} {statistics.median(result['prompt_eval_count']):24.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
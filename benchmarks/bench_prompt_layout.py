@@ -0,0 +1,48 @@
+# benchmarks/bench_prompt_layout.py
+"""
+Compare Ollama's prompt_eval_count per turn for the classic and stable prompt layouts.
+Needs a real Ollama server, since the savings come from its KV-cache prefix reuse.
+
+The classic layout's timestamp changes once a minute; to make that visible in
+a short run, each classic turn is stamped with a different minute.
+
+    python -m benchmarks.bench_prompt_layout [ollama_url] [model] [turns]
+"""
+
+import sys
+
+from deltastrik.core.ollama_client import OllamaClient
+from deltastrik.core.prompt_engine import build_runtime_context, build_system_prompt
+
+
+def run(client: OllamaClient, config: dict, turns: int) -> list[int]:
+    history: list[dict] = []
+    counts = []
+    for turn in range(turns):
+        prompt = build_system_prompt(config)
+        if config["prompt_layout"] == "classic":
+            prompt = prompt.replace(" UTC]", f" +{turn}min UTC]")
+        question = f"Turn {turn}: name one Linux command and what it does, in one sentence."
+        reply, done = "", {}
+        for chunk in client.stream_query(prompt, question, history, runtime_context=build_runtime_context(config)):
+            reply += client.chunk_text(chunk)
+            if chunk.get("done"):
+                done = chunk
+        history += [{"role": "user", "content": question}, {"role": "assistant", "content": reply}]
+        counts.append(done.get("prompt_eval_count", 0))
+    return counts
+
+
+def main() -> None:
+    url = sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:11434"
+    model = sys.argv[2] if len(sys.argv) > 2 else "gpt-oss:latest"
+    turns = int(sys.argv[3]) if len(sys.argv) > 3 else 6
+
+    for layout in ("classic", "stable"):
+        config = {"ollama_url": url, "model": model, "max_tokens": 48, "temperature": 0, "timeout": 300, "prompt_layout": layout, "keep_alive": "10m"}
+        counts = run(OllamaClient(config), config, turns)
+        print(f"{layout:<8} prompt_eval_count per turn: {counts}  total={sum(counts)}")
+
+
+if __name__ == "__main__":
+    main()
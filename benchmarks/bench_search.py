@@ -0,0 +1,54 @@
+# benchmarks/bench_search.py
+"""
+Full-text search latency over a synthetic session database.
+
+    python -m benchmarks.bench_search [messages]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from deltastrik.core.session_store import SessionStore
+
+WORDS = (
+    "nginx config upstream proxy timeout docker compose volume python asyncio event loop "
+    "sqlite index query cache kubernetes pod deploy rollout latency token stream model "
+    "prompt context summary gpu memory thread pool socket retry backoff json schema"
+).split()
+
+
+def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(42)
+    # Topical words plus a long tail of filler, closer to a real vocabulary than a tiny word list
+    filler = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(5000)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SessionStore(os.path.join(tmp, "bench.db"))
+
+        start = time.perf_counter()
+        for i in range(total):
+            session_id = f"s{i // 200:05d}"
+            seq = i % 200 + 1
+            if seq == 1:
+                store.create_session(session_id, "2026-01-01T00:00:00")
+            text = " ".join(rng.choice(WORDS if rng.random() < 0.1 else filler) for _ in range(rng.randint(20, 80)))
+            store.append_message(session_id, seq, "user" if seq % 2 else "assistant", text, "2026-01-01T00:00:00")
+        store.flush()
+        print(f"indexed {total} messages in {time.perf_counter() - start:.2f} s")
+
+        for query in ["nginx config", "upstream timeout", "asyncio event loop", "gpu memory retry"]:
+            runs = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                hits = store.search(query)
+                runs.append(time.perf_counter() - t0)
+            runs.sort()
+            print(f"{query!r:<24} {len(hits):>3} hits   median {runs[len(runs) // 2] * 1000:6.2f} ms   max {runs[-1] * 1000:6.2f} ms")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
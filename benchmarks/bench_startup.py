@@ -0,0 +1,41 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start regression check: import the TUI in fresh interpreters and fail
+(exit status 1) if the best run exceeds the budget.
+
+    python -m benchmarks.bench_startup [budget_ms] [runs]
+"""
+
+import sys
+
+from deltastrik.cli import STARTUP_MODULE, profile_import
+
+# Modules that must not be imported at startup; each is deferred until first use
+DEFERRED = ("requests", "yaml", "rich.markdown", "markdown_it", "langchain_core")
+
+
+def main() -> None:
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 600.0
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    best_us = None
+    eager: set[str] = set()
+    for _ in range(runs):
+        total_us, rows = profile_import()
+        best_us = total_us if best_us is None else min(best_us, total_us)
+        eager |= {name.strip() for _, _, name in rows if name.strip() in DEFERRED}
+
+    best_ms = (best_us or 0) / 1000
+    print(f"{STARTUP_MODULE}: best cold import {best_ms:.1f} ms over {runs} runs (budget {budget_ms:.0f} ms)")
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(sorted(eager))}")
+        failed = True
+    if best_ms > budget_ms:
+        print("FAIL: over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
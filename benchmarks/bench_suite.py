@@ -0,0 +1,395 @@
+# benchmarks/bench_suite.py
+"""
+Regression benchmark suite, driven by the fake Ollama server.
+
+Groups:
+- client:  OllamaClient request overhead (blocking, async, streamed) with a zero-latency server
+- chat_view: rendering and mounting 10/100/1000 messages in ChatView, and how long one long
+  code answer holds up the event loop
+- compact: SessionManager compaction prompt building for long histories
+- memory:  long-term memory index search at 1k/10k turns, recall latency and prompt size vs plain history
+- payload: /api/chat request body encoding at 1k/10k messages, dict history vs cached Message fragments
+- e2e:     end-to-end turn latency through the TUI using Textual's headless pilot, with the UI's
+  frame times while replies stream
+- frames:  several tabs streaming Markdown replies at once: event-loop stalls, CPU time and frame
+  times against the ``ui_fps`` budget
+
+Results are JSON (with git commit and interpreter metadata) so runs can be diffed over time.
+
+    python -m benchmarks.bench_suite [--out results.json] [--only client,e2e] [--repeat N]
+"""
+
+import argparse
+import asyncio
+import functools
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.fake_ollama import start_server
+from benchmarks.harness import ameasure, measure, summarize, write_results
+from deltastrik.core.config import Config, load_config
+from deltastrik.utils.logging_utils import configure_logging
+
+GROUPS = ("client", "chat_view", "compact", "memory", "payload", "e2e", "frames")
+CHAT_VIEW_SIZES = (10, 100, 1000)
+COMPACT_SIZES = (100, 1000)
+MEMORY_SIZES = (1000, 10000)
+MEMORY_SESSION_SIZES = (100, 1000)
+PAYLOAD_SIZES = (1000, 10000)
+LONG_REPLY_SECTIONS = 60  # about 150k characters, 2800 lines once rendered
+FRAMES_TABS = 3
+
+WORDS = (
+    "the model returns a streamed reply with code blocks lists and inline `code` while the session keeps history context tokens summary prompt cache latency throughput"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _assistant_text(rng: random.Random) -> str:
+    """A reply with the Markdown features real answers use (heading, list, code fence)."""
+    return f"## {_text(rng, 3)}\n\n{_text(rng, 40)}\n\n- {_text(rng, 6)}\n- **{_text(rng, 4)}**\n\n```python\nfor item in items:\n    print(item)\n```\n"
+
+
+def _long_reply(rng: random.Random) -> str:
+    """A long code answer: section after section of prose and a 40-line code fence."""
+    code = "\n".join(f"    value_{i} = compute(item, factor={i})  # {_text(rng, 4)}" for i in range(40))
+    return "".join(f"## {_text(rng, 3)}\n\n{_text(rng, 30)}\n\n```python\n{code}\n```\n\n" for _ in range(LONG_REPLY_SECTIONS))
+
+
+def _config(url: str, stream: bool) -> Config:
+    config = load_config()
+    config.update({"ollama_url": url, "stream": stream, "session_db": "", "timeout": 30})
+    return config
+
+
+# ----------------------------------------------------------
+# Groups
+# ----------------------------------------------------------
+def bench_client(repeat: int) -> Dict[str, Any]:
+    from deltastrik.core.ollama_client import OllamaClient
+
+    server = start_server()
+    config = _config(server.url, stream=False)
+    client = OllamaClient(config)
+    results: Dict[str, Any] = {}
+    try:
+        results["query"] = measure(lambda: client.query("system", "ping"), repeat * 50)
+
+        async def run_async() -> None:
+            async def stream() -> None:
+                async for _ in client.astream_query("system", "ping"):
+                    pass
+
+            results["aquery"] = await ameasure(lambda: client.aquery("system", "ping"), repeat * 50)
+            results["astream_query"] = await ameasure(stream, repeat * 50)
+            await client.async_transport.aclose()
+
+        asyncio.run(run_async())
+    finally:
+        client.transport.close()
+        server.shutdown()
+    return results
+
+
+def bench_chat_view(repeat: int) -> Dict[str, Any]:
+    from rich.console import Console
+    from textual.app import App, ComposeResult
+
+    from deltastrik.tui import chat_view
+    from deltastrik.tui.chat_view import ChatView, MessageWidget, StreamingMarkdown, render_message
+
+    rng = random.Random(7)
+    results: Dict[str, Any] = {}
+    for size in CHAT_VIEW_SIZES:
+        messages = [("user", _text(rng, 20)) if i % 2 == 0 else ("assistant", _assistant_text(rng)) for i in range(size)]
+
+        # Rich rendering alone: build each panel and lay it out at a typical terminal width
+        def render_all(messages: List[Tuple[str, str]] = messages) -> None:
+            console = Console(file=io.StringIO(), width=100, color_system="truecolor")
+            for role, content in messages:
+                console.print(render_message(role, content))
+
+        results[f"render_{size}"] = measure(render_all, repeat)
+
+    # One frame's re-render of a reply still streaming, near the end of a 20-block reply: the whole
+    # reply parsed again, or only the block being written (earlier frames kept the finished ones as lines)
+    reply = "\n\n".join(_assistant_text(rng) for _ in range(20))
+    console = Console(file=io.StringIO(), width=100, color_system="truecolor")
+    stream = StreamingMarkdown()
+    console.render_lines(render_message("assistant", reply, stream))
+    results["stream_frame_full"] = measure(lambda: console.render_lines(render_message("assistant", reply)), repeat * 4)
+    results["stream_frame_tail"] = measure(lambda: console.render_lines(render_message("assistant", reply, stream)), repeat * 4)
+
+    class ChatApp(App):
+        def compose(self) -> ComposeResult:
+            yield ChatView()
+
+    async def run_mount() -> None:
+        app = ChatApp()
+        async with app.run_test(size=(120, 40)) as pilot:
+            view = app.query_one(ChatView)
+            for size in CHAT_VIEW_SIZES:
+                messages = [("user", _text(rng, 20)) if i % 2 == 0 else ("assistant", _assistant_text(rng)) for i in range(size)]
+
+                async def mount_all(messages: List[Tuple[str, str]] = messages) -> None:
+                    view.clear_messages()
+                    for role, content in messages:
+                        view.add_message(role, content)
+                    await pilot.pause()  # until mounted, laid out and painted
+
+                results[f"mount_{size}"] = await ameasure(mount_all, repeat)
+
+            # The longest the event loop goes without running (gaps between 5 ms ticks, beyond
+            # the 5 ms) from adding a long code answer until its full render is on screen
+            long_reply = _long_reply(rng)
+
+            async def add_long_reply() -> float:
+                view.clear_messages()
+                chat_view._rendered.clear()
+                view.add_message("assistant", long_reply)
+                widget = view.query(MessageWidget).last()
+                start = time.perf_counter()
+                worst = 0.0
+                while widget.render_pending or time.perf_counter() - start < 0.2:
+                    tick = time.perf_counter()
+                    await asyncio.sleep(0.005)
+                    worst = max(worst, time.perf_counter() - tick - 0.005)
+                return worst
+
+            await add_long_reply()  # warm-up: imports, lexers
+            results["long_reply_stall"] = summarize([await add_long_reply() for _ in range(repeat)])
+
+    asyncio.run(run_mount())
+    return results
+
+
+def bench_compact(repeat: int) -> Dict[str, Any]:
+    from deltastrik.core.session_manager import SessionManager
+
+    rng = random.Random(11)
+    results: Dict[str, Any] = {}
+    for size in COMPACT_SIZES:
+        session = SessionManager(config={"context_tokens": 8192, "max_tokens": 1024})
+        for i in range(size):
+            session._append("user" if i % 2 == 0 else "assistant", _text(rng, 60))
+        session.summary = _text(rng, 200)
+
+        def build(keep_recent: bool, session: SessionManager = session) -> None:
+            cut = session._plan_segment(keep_recent)
+            session._build_summary_prompt(session.history[:cut], "keep design decisions")
+
+        results[f"rolling_{size}"] = measure(functools.partial(build, True), repeat * 10)
+        results[f"full_{size}"] = measure(functools.partial(build, False), repeat * 10)
+    return results
+
+
+def bench_memory(repeat: int) -> Dict[str, Any]:
+    from benchmarks.fake_ollama import embed
+    from deltastrik.core import memory
+    from deltastrik.core.memory import MemoryIndex, turn_text
+    from deltastrik.core.ollama_client import OllamaClient
+    from deltastrik.core.session_manager import SessionManager
+
+    rng = random.Random(13)
+    results: Dict[str, Any] = {"search_backend": memory.search_backend()}
+    if results["search_backend"] == "python":
+        # Larger indexes only have their newest rows searched
+        results["python_search_rows"] = memory.PYTHON_SEARCH_ROWS
+    for size in MEMORY_SIZES:
+        # Search alone, at the size of a real embedding model's vectors (768 for nomic-embed-text)
+        index = MemoryIndex()
+        for i in range(size):
+            index.add([rng.random() - 0.5 for _ in range(768)], {"user": f"q{i}", "assistant": ""})
+        query = [rng.random() - 0.5 for _ in range(768)]
+        results[f"search_{size}"] = measure(functools.partial(index.search, query, 4), repeat * 4)
+
+    server = start_server()
+    try:
+        for size in MEMORY_SESSION_SIZES:
+            config = _config(server.url, stream=False)
+            config.update({"memory": True})
+            client = OllamaClient(config)
+            session = SessionManager(config=config, client=client)
+            assert session.memory is not None
+            for i in range(0, size, 2):
+                turn = {"user": _text(rng, 30), "assistant": _text(rng, 60)}
+                session._append("user", turn["user"])
+                session._append("assistant", turn["assistant"])
+                session.memory.add(embed(turn_text(turn)), turn)
+            question = _text(rng, 20)
+
+            async def recall(session: SessionManager = session, question: str = question) -> None:
+                await session.abuild_context("system", question)
+
+            async def run(client: OllamaClient = client) -> Dict[str, Any]:
+                timing = await ameasure(recall, repeat * 10)
+                await client.async_transport.aclose()
+                return timing
+
+            results[f"recall_{size}"] = asyncio.run(run())
+            # Raw token estimates of what each turn would send
+            results[f"prompt_tokens_memory_{size}"] = session._last_prompt_raw
+            session.memory = None
+            session.build_context("system", question)
+            results[f"prompt_tokens_history_{size}"] = session._last_prompt_raw
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_e2e(turns: int, latency_ms: float, tokens_per_sec: float) -> Dict[str, Any]:
+    from deltastrik.tui.app import DeltaStrikApp
+
+    server = start_server(latency_ms=latency_ms, tokens_per_sec=tokens_per_sec)
+    results: Dict[str, Any] = {"server": {"latency_ms": latency_ms, "tokens_per_sec": tokens_per_sec}}
+
+    async def run(stream: bool) -> Dict[str, Any]:
+        app = DeltaStrikApp(_config(server.url, stream))
+        samples = []
+        async with app.run_test(size=(120, 40)) as pilot:
+            loop = asyncio.get_running_loop()
+            for i in range(turns):
+                expected = app.session.conversation_length + 2
+                app.input_bar.value = f"turn {i}"
+                start = loop.time()
+                await pilot.press("enter")
+                while app.session.conversation_length < expected:
+                    await asyncio.sleep(0.0005)
+                samples.append(loop.time() - start)
+                await pilot.pause()
+        return {**summarize(samples), "frames": app.frames.stats()}
+
+    try:
+        results["stream"] = asyncio.run(run(True))
+        results["blocking"] = asyncio.run(run(False))
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_frames(tokens_per_sec: float) -> Dict[str, Any]:
+    from deltastrik.tui.app import DeltaStrikApp
+    from deltastrik.tui.session_tab import SessionTab
+
+    rng = random.Random(11)
+    reply = "\n\n".join(_assistant_text(rng) for _ in range(8))
+    server = start_server(tokens_per_sec=tokens_per_sec, reply=reply)
+    results: Dict[str, Any] = {"tabs": FRAMES_TABS, "reply_tokens": len(reply.split(" ")), "tokens_per_sec": tokens_per_sec}
+
+    async def run() -> None:
+        config = _config(server.url, stream=True)
+        config["endpoint_parallel"] = FRAMES_TABS
+        app = DeltaStrikApp(config)
+        async with app.run_test(size=(120, 40)) as pilot:
+            for _ in range(FRAMES_TABS - 1):
+                app.open_tab()
+                await pilot.pause()
+            tabs = [app.tab, *(tab for tab in app.query(SessionTab) if tab is not app.tab)]
+            cpu = time.process_time()
+            for i, tab in enumerate(tabs):
+                app._start_generation(tab, f"tab {i}")
+            # Gaps between 5 ms ticks, beyond the 5 ms, while the replies stream
+            stalls = []
+            while any(tab.session.conversation_length < 2 for tab in tabs):
+                tick = time.perf_counter()
+                await asyncio.sleep(0.005)
+                stalls.append(time.perf_counter() - tick - 0.005)
+            results["cpu_s"] = round(time.process_time() - cpu, 3)
+            results["stall"] = summarize(stalls)
+            results["frames"] = app.frames.stats()
+
+    try:
+        asyncio.run(run())
+    finally:
+        server.shutdown()
+    return results
+
+
+def bench_payload(repeat: int) -> Dict[str, Any]:
+    from deltastrik.core.message import Message, encode_payload
+    from deltastrik.core.ollama_client import OllamaClient
+
+    rng = random.Random(17)
+    client = OllamaClient(_config("http://127.0.0.1:11434", stream=True))
+    results: Dict[str, Any] = {}
+    for size in PAYLOAD_SIZES:
+        texts = [_text(rng, 60) if i % 2 == 0 else _assistant_text(rng) for i in range(size)]
+        roles = ["user" if i % 2 == 0 else "assistant" for i in range(size)]
+
+        tracemalloc.start()
+        dicts = [{"role": role, "content": text} for role, text in zip(roles, texts)]
+        results[f"history_kb_dicts_{size}"] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+        tracemalloc.stop()
+        tracemalloc.start()
+        messages = [Message(role, text) for role, text in zip(roles, texts)]
+        results[f"history_kb_messages_{size}"] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+        tracemalloc.stop()
+
+        # Everything a turn does between "send" and the socket write. Before: a fresh list
+        # of dicts, the whole conversation re-serialized
+        def dict_body(dicts: List[Dict[str, str]] = dicts) -> bytes:
+            history = [{"role": "system", "content": "system"}, *dicts, {"role": "user", "content": _text(rng, 20)}]
+            return json.dumps(client._build_payload(history, stream=True)).encode("utf-8")
+
+        # After: only the new message is serialized, the history's cached fragments are joined
+        def message_body(messages: List[Message] = messages) -> bytes:
+            payload = client._build_payload(client._build_message_payload("system", _text(rng, 20), messages), stream=True)
+            return encode_payload(payload)
+
+        encode_payload({"messages": messages})  # each fragment was cached on the turn its message was first sent
+        results[f"dicts_{size}"] = measure(dict_body, repeat * 4)
+        results[f"messages_{size}"] = measure(message_body, repeat * 4)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="bench_suite", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    parser.add_argument("--only", help=f"comma-separated groups to run ({', '.join(GROUPS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per measurement (scaled up for fast ones)")
+    parser.add_argument("--turns", type=int, default=20, help="turns for the end-to-end group")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fake server delay before the first token (e2e)")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="fake server generation rate (e2e, frames)")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        sys.exit(f"unknown group(s): {', '.join(sorted(unknown))}")
+
+    # Keep per-turn INFO logs out of the measurements and the JSON on stdout
+    configure_logging("WARNING")
+
+    results: Dict[str, Any] = {}
+    for group in groups:
+        print(f"running {group}...", file=sys.stderr)
+        if group == "client":
+            results[group] = bench_client(args.repeat)
+        elif group == "chat_view":
+            results[group] = bench_chat_view(args.repeat)
+        elif group == "compact":
+            results[group] = bench_compact(args.repeat)
+        elif group == "memory":
+            results[group] = bench_memory(args.repeat)
+        elif group == "payload":
+            results[group] = bench_payload(args.repeat)
+        elif group == "e2e":
+            results[group] = bench_e2e(args.turns, args.latency_ms, args.tokens_per_sec)
+        elif group == "frames":
+            results[group] = bench_frames(args.tokens_per_sec)
+    write_results(results, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_transport.py
+"""
+Per-request overhead of the Ollama transports against a local stub server.
+
+Compares a bare ``requests.post`` per turn (fresh TCP handshake every time)
+with the pooled keep-alive HttpTransport and the asyncio AsyncHttpTransport.
+
+    python -m benchmarks.bench_transport [iterations]
+"""
+
+import asyncio
+import sys
+import time
+
+import requests
+
+from benchmarks.fake_ollama import start_server
+from deltastrik.core.transport import AsyncHttpTransport, HttpTransport
+
+PAYLOAD = {"model": "bench", "messages": [{"role": "user", "content": "ping"}], "stream": False}
+
+
+def bench_bare(url: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        requests.post(url=url, json=PAYLOAD, timeout=10).json()
+    return time.perf_counter() - start
+
+
+def bench_pooled(url: str, iterations: int) -> float:
+    transport = HttpTransport()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        transport.post_json(url, PAYLOAD, timeout=10)
+    elapsed = time.perf_counter() - start
+    transport.close()
+    return elapsed
+
+
+def bench_async(url: str, iterations: int) -> float:
+    async def run() -> float:
+        transport = AsyncHttpTransport()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await transport.post_json(url, PAYLOAD, timeout=10)
+        elapsed = time.perf_counter() - start
+        await transport.aclose()
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = start_server()
+    url = f"http://127.0.0.1:{server.server_port}/api/chat"
+
+    results = {
+        "requests.post (no pool)": bench_bare(url, iterations),
+        "HttpTransport (pooled)": bench_pooled(url, iterations),
+        "AsyncHttpTransport": bench_async(url, iterations),
+    }
+    server.shutdown()
+
+    baseline = results["requests.post (no pool)"] / iterations * 1e6
+    print(f"{iterations} sequential requests against the stub server\n")
+    for name, elapsed in results.items():
+        per_request = elapsed / iterations * 1e6
+        print(f"{name:<26} {per_request:8.1f} us/request   saved {baseline - per_request:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
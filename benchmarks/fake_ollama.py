@@ -0,0 +1,183 @@
+# benchmarks/fake_ollama.py
+"""
+Stdlib stand-in for Ollama's /api/chat endpoint.
+Speaks HTTP/1.1 with keep-alive so client-side connection reuse is measurable.
+
+``GET /api/ps`` lists ``models`` as loaded, for endpoint health checks.
+``POST /api/embed`` returns bag-of-words vectors (hashed word counts), so texts
+sharing words score as similar, like real embeddings do for shared topics.
+
+Timing is configurable per server: ``latency_ms`` is spent before the first
+byte (prompt evaluation), ``tokens_per_sec`` paces generation (0 = as fast as
+possible). Streaming follows the request's ``stream`` flag, and the final
+response carries Ollama-style durations in nanoseconds.
+
+``prompt_ms_per_token`` emulates Ollama's KV cache: a request only pays for the
+prompt tokens (~4 characters each) past the prefix it shares with the previous
+request, and ``prompt_eval_count`` reports just those.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+REPLY = "This is a canned reply from the fake Ollama server."
+EMBED_DIM = 256
+
+
+def embed(text: str, dim: int = EMBED_DIM) -> List[float]:
+    """Hashed bag-of-words vector for ``text``."""
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        vector[zlib.crc32(word.encode("utf-8")) % dim] += 1.0
+    return vector
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency_ms: float = 0.0,
+        tokens_per_sec: float = 0.0,
+        reply: str = REPLY,
+        models: Optional[List[str]] = None,
+        prompt_ms_per_token: float = 0.0,
+    ):
+        super().__init__(("127.0.0.1", port), FakeOllamaHandler)
+        self.latency_ms = latency_ms
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.cached_prompt = ""
+        self.tokens_per_sec = tokens_per_sec
+        self.reply = reply
+        self.models = models if models is not None else ["gpt-oss:latest"]
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients hang up mid-request on purpose (cancelled replies and prefills)
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def evaluate(self, prompt: str) -> int:
+        """Tokens of ``prompt`` past the prefix cached by the previous request; caches ``prompt``."""
+        with self._lock:
+            common = len(os.path.commonprefix([self.cached_prompt, prompt]))
+            self.cached_prompt = prompt
+        return (len(prompt) - common) // 4 + 1
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Go's net/http (and so Ollama) sets TCP_NODELAY; without it keep-alive hits the Nagle/delayed-ACK stall
+    disable_nagle_algorithm = True
+    server: FakeOllamaServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002 - silence access logs
+        pass
+
+    def _send_json(self, data: Dict[str, Any]) -> None:
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") != "/api/ps":
+            self.send_error(404)
+            return
+        self._send_json({"models": [{"name": m, "model": m} for m in self.server.models]})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        server.count_request()
+        if self.path.rstrip("/") == "/api/embed":
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"model": request.get("model"), "embeddings": [embed(text) for text in inputs]})
+            return
+
+        start = time.perf_counter()
+        if server.latency_ms:
+            time.sleep(server.latency_ms / 1000)
+        prompt = json.dumps(request.get("messages", []))
+        prompt_tokens = len(prompt) // 4
+        if server.prompt_ms_per_token:
+            prompt_tokens = server.evaluate(prompt)
+            time.sleep(prompt_tokens * server.prompt_ms_per_token / 1000)
+        prompt_ns = int((time.perf_counter() - start) * 1e9)
+        words = server.reply.split(" ")
+        num_predict = request.get("options", {}).get("num_predict", -1)
+        if num_predict > 0:
+            words = words[:num_predict]
+        delay = 1 / server.tokens_per_sec if server.tokens_per_sec else 0.0
+
+        def stats(eval_start: float) -> Dict[str, Any]:
+            return {
+                "done": True,
+                "total_duration": int((time.perf_counter() - start) * 1e9),
+                "load_duration": 0,
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": prompt_ns,
+                "eval_count": len(words),
+                "eval_duration": int((time.perf_counter() - eval_start) * 1e9),
+            }
+
+        if not request.get("stream"):
+            eval_start = time.perf_counter()
+            if delay:
+                time.sleep(delay * len(words))
+            self._send_json({"message": {"role": "assistant", "content": server.reply}, **stats(eval_start)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        eval_start = time.perf_counter()
+        for i, word in enumerate(words):
+            if delay:
+                time.sleep(delay)
+            content = word if i == len(words) - 1 else word + " "
+            line = json.dumps({"message": {"role": "assistant", "content": content}, "done": False}) + "\n"
+            self._write_chunk(line.encode("utf-8"))
+        self._write_chunk((json.dumps({"message": {"role": "assistant", "content": ""}, **stats(eval_start)}) + "\n").encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_server(
+    port: int = 0,
+    latency_ms: float = 0.0,
+    tokens_per_sec: float = 0.0,
+    reply: str = REPLY,
+    models: Optional[List[str]] = None,
+    prompt_ms_per_token: float = 0.0,
+) -> FakeOllamaServer:
+    """Start the fake server on a background thread and return it (port 0 = any free port)."""
+    server = FakeOllamaServer(port, latency_ms=latency_ms, tokens_per_sec=tokens_per_sec, reply=reply, models=models, prompt_ms_per_token=prompt_ms_per_token)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
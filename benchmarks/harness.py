@@ -0,0 +1,85 @@
+# benchmarks/harness.py
+"""
+Timing helpers and JSON result output shared by the benchmark suite.
+"""
+
+import json
+import platform
+import statistics
+import subprocess  # nosec B404 - only used to read the current git commit
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from deltastrik.core.metrics import percentile
+
+
+def summarize(samples_s: List[float]) -> Dict[str, Any]:
+    """Milliseconds statistics for a list of samples in seconds."""
+    ms = [s * 1000 for s in samples_s]
+    return {
+        "runs": len(ms),
+        "min_ms": round(min(ms), 4),
+        "median_ms": round(statistics.median(ms), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "max_ms": round(max(ms), 4),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Time ``fn()`` ``repeat`` times after ``warmup`` untimed calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def ameasure(fn: Callable[[], Awaitable[Any]], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    """Async variant of ``measure``."""
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(  # nosec B603 B607 - fixed argv, no shell
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=False
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def environment() -> Dict[str, Any]:
+    """Metadata that makes runs comparable over time."""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def write_results(results: Dict[str, Any], path: Optional[str] = None) -> None:
+    """Write ``results`` plus environment metadata as JSON to ``path`` (or stdout)."""
+    document = {"environment": environment(), "results": results}
+    text = json.dumps(document, indent=2)
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
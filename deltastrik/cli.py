@@ -1,12 +1,133 @@
 # deltastrik/cli.py
 
-# import sys
-from deltastrik.tui.app import DeltaStrikApp
-from deltastrik.core.config import load_config
+import argparse
+import subprocess  # nosec B404 - only used to re-run our own interpreter for --startup-profile
+import sys
+import time
 
+from deltastrik.core.config import Config, ConfigError, load_config
+from deltastrik.utils.logging_utils import configure_logging
 
-def main() -> None:
+# Module imported to start the TUI; profiled by --startup-profile
+STARTUP_MODULE = "deltastrik.tui.app"
+
+
+def profile_import(module: str = STARTUP_MODULE) -> tuple[int, list[tuple[int, int, str]]]:
+    """
+    Import ``module`` in a fresh interpreter under ``-X importtime``.
+    Returns (cumulative microseconds for ``module``, rows of (cumulative_us, self_us, name)).
+    """
+    result = subprocess.run(  # nosec B603 - fixed argv, no shell
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+
+    total_us = next((cum for cum, _, name in rows if name.strip() == module), 0)
+    return total_us, rows
+
+
+def startup_profile(top: int = 25) -> None:
+    """
+    Print an ``-X importtime`` breakdown of a cold TUI import, measured in a fresh
+    interpreter so modules already loaded by this process don't hide the cost.
+    """
+    start = time.perf_counter()
+    total_us, rows = profile_import()
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Cold import of {STARTUP_MODULE}: {total_us / 1000:.1f} ms (process wall time {wall_ms:.1f} ms)\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+
+def batch(config: Config, args: argparse.Namespace) -> None:
+    """Run ``deltastrik batch`` and print a one-line summary to stderr."""
+    # Deferred like the TUI import: only batch runs need the async client
+    from deltastrik.core.batch import run_batch
+
+    start = time.perf_counter()
+    try:
+        runner = run_batch(config, args.input, args.output, args.concurrency or config.get("batch_concurrency", 4), args.resume)
+    except (OSError, ValueError) as e:
+        sys.exit(f"deltastrik batch: {e}")
+    except KeyboardInterrupt:
+        sys.exit("deltastrik batch: interrupted; rerun with --resume to continue")
+
+    summary = runner.metrics.summary()
+    print(
+        f"{runner.completed} ok, {runner.failed} failed, {runner.skipped} skipped in {time.perf_counter() - start:.1f} s"
+        f" | latency p50 {summary['latency_ms_p50']:.0f} ms p95 {summary['latency_ms_p95']:.0f} ms"
+        f" | {summary['eval_tokens_total']} tokens at {summary['tokens_per_sec']:.1f} tok/s",
+        file=sys.stderr,
+    )
+    if runner.failed:
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="deltastrik", description="Terminal chat client for Ollama.")
+    parser.add_argument("--startup-profile", action="store_true", help="print an import-time breakdown of startup and exit")
+    parser.add_argument("--config", metavar="PATH", help="config file (default: $DELTASTRIK_CONFIG or ~/.deltastrik/config.yaml)")
+    parser.add_argument("--model", help="model to chat with (overrides the config file)")
+    parser.add_argument("--ollama-url", help="Ollama host, e.g. http://127.0.0.1:11434")
+    parser.add_argument("--temperature", help="sampling temperature")
+    parser.add_argument("--set", metavar="KEY=VALUE", action="append", default=[], help="override any config setting; repeatable")
+    commands = parser.add_subparsers(dest="command")
+
+    batch_parser = commands.add_parser("batch", help="run prompts from a JSONL file or stdin without the TUI")
+    batch_parser.add_argument("input", nargs="?", default="-", help='JSONL prompts: strings or {"id", "prompt"} objects (default: stdin)')
+    batch_parser.add_argument("-o", "--output", help="write results here as JSONL (default: stdout)")
+    batch_parser.add_argument("-c", "--concurrency", type=int, help="requests in flight; match the server's OLLAMA_NUM_PARALLEL (default: batch_concurrency or 4)")
+    batch_parser.add_argument("--resume", action="store_true", help="skip items already answered in --output and retry the rest")
+    return parser
+
+
+def config_overrides(args: argparse.Namespace) -> dict:
+    """CLI flags as the top config layer: ``--set`` first, so the named flags win."""
+    overrides = {}
+    for item in args.set:
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip():
+            raise ConfigError(f"--set {item!r}: expected KEY=VALUE")
+        overrides[key.strip()] = value
+    for key in ("model", "ollama_url", "temperature"):
+        if getattr(args, key) is not None:
+            overrides[key] = getattr(args, key)
+    return overrides
+
+
+def main(argv: list[str] | None = None) -> None:
     """Main entrypoint for the deltastrik CLI."""
-    config = load_config()
+    args = build_parser().parse_args(argv)
+    if args.startup_profile:
+        startup_profile()
+        return
+
+    # Config is loaded exactly once here and injected everywhere else
+    try:
+        config = load_config(args.config, config_overrides(args))
+    except ConfigError as e:
+        sys.exit(f"deltastrik: config error: {e}")
+    configure_logging(config.get("log_level"), config.get("log_max_bytes"), config.get("log_backups"))
+
+    if args.command == "batch":
+        batch(config, args)
+        return
+
+    # Imported late so `--help` and `--startup-profile` never pay for Textual
+    from deltastrik.tui.app import DeltaStrikApp
+
     app = DeltaStrikApp(config)
     app.run()  # start the TUI
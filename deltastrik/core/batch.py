@@ -0,0 +1,195 @@
+# deltastrik/core/batch.py
+"""
+Headless batch runner for DeltaStrik.
+Streams prompts from a JSONL file (or stdin) through OllamaClient with a
+bounded pool of concurrent requests and appends one JSONL result per prompt
+as soon as it finishes.
+
+Input lines are either a JSON object with a ``prompt`` (and optionally ``id``
+and ``history``) or a bare JSON string. Items without an ``id`` are numbered
+by their line. Input is read lazily, at most a few items ahead of the workers,
+so arbitrarily large files run in constant memory.
+
+Resuming: results that completed without an error are recorded by ``id`` in
+the output file; rerunning with ``resume`` skips them and retries the rest.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack
+from dataclasses import asdict
+from typing import IO, Any, Dict, Optional, Set
+
+from deltastrik.core.config import ConfigLike
+from deltastrik.core.metrics import MetricsRecorder, ResponseMetrics
+from deltastrik.core.ollama_client import OllamaClient
+from deltastrik.core.prompt_engine import build_runtime_context, build_system_prompt
+from deltastrik.core.transport import AsyncHttpTransport
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("batch")
+
+# Matches Ollama's default OLLAMA_NUM_PARALLEL; raise it together with the server setting
+DEFAULT_CONCURRENCY = 4
+
+
+class BatchInputError(ValueError):
+    """Raised for an input line that is neither a prompt object nor a string."""
+
+
+def parse_item(line: str, line_no: int) -> Dict[str, Any]:
+    """Turn one input line into ``{"id", "prompt", "history"}``."""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise BatchInputError(f"line {line_no}: invalid JSON ({e})") from e
+    if isinstance(data, str):
+        data = {"prompt": data}
+    if not isinstance(data, dict) or not isinstance(data.get("prompt"), str):
+        raise BatchInputError(f"line {line_no}: expected a string or an object with a 'prompt'")
+    return {"id": str(data.get("id", line_no)), "prompt": data["prompt"], "history": data.get("history")}
+
+
+def completed_ids(path: str) -> Set[str]:
+    """IDs already answered without an error in an earlier run's output file."""
+    done: Set[str] = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut short by the interruption
+                if isinstance(result, dict) and "error" not in result and "id" in result:
+                    done.add(str(result["id"]))
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def _ends_mid_line(path: str) -> bool:
+    """True if the file's last line has no trailing newline."""
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+class BatchRunner:
+    """
+    Runs prompts through one shared OllamaClient with at most ``concurrency``
+    requests in flight; the persona and settings come from the loaded config.
+    """
+
+    def __init__(self, config: ConfigLike, concurrency: int = DEFAULT_CONCURRENCY):
+        self.config = config
+        self.concurrency = max(1, concurrency)
+        # One pooled connection per worker, reused for the whole run
+        self.transport = AsyncHttpTransport(max_connections=self.concurrency)
+        self.client = OllamaClient(config, async_transport=self.transport)
+        self.system_prompt = build_system_prompt(config)
+        self.metrics = MetricsRecorder()
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+
+    async def run(self, source: IO[str], sink: IO[str], skip: Optional[Set[str]] = None) -> None:
+        """Read items from ``source`` and write one result line per item to ``sink``."""
+        skip = skip or set()
+        queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue, sink)) for _ in range(self.concurrency)]
+        try:
+            line_no = 0
+            while True:
+                # Off the loop so a slow stdin never stalls in-flight requests
+                line = await asyncio.to_thread(source.readline)
+                if not line:
+                    break
+                line_no += 1
+                if not line.strip():
+                    continue
+                try:
+                    item = parse_item(line, line_no)
+                except BatchInputError as e:
+                    self._write(sink, {"id": str(line_no), "error": str(e)})
+                    self.failed += 1
+                    continue
+                if item["id"] in skip:
+                    self.skipped += 1
+                    continue
+                await queue.put(item)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await self.client.router.aclose()
+            await self.transport.aclose()
+
+    async def _worker(self, queue: "asyncio.Queue[Optional[Dict[str, Any]]]", sink: IO[str]) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            self._write(sink, await self._run_item(item))
+
+    async def _run_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        reply, data = await self.client.aquery_response(
+            prompt=self.system_prompt,
+            user_message=item["prompt"],
+            history=item["history"],
+            runtime_context=build_runtime_context(self.config),
+        )
+        latency_ms = (time.perf_counter() - start) * 1000
+        if self.client.is_error_reply(reply):
+            self.failed += 1
+            logger.warning("Batch item %s failed: %s", item["id"], reply)
+            return {"id": item["id"], "error": reply, "wall_ms": latency_ms}
+
+        metrics = ResponseMetrics.from_response(data, self.client.model, latency_ms)
+        self.metrics.record(metrics)
+        self.completed += 1
+        result = {"id": item["id"], "response": reply, **asdict(metrics)}
+        result["tokens_per_sec"] = round(metrics.tokens_per_sec, 2)
+        del result["ttft_ms"]  # replies are not streamed in batch mode
+        if "cache" in data:
+            result["cache"] = data["cache"]
+        return result
+
+    @staticmethod
+    def _write(sink: IO[str], result: Dict[str, Any]) -> None:
+        # One write per line, flushed at once: an interruption never leaves earlier results unwritten
+        sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+        sink.flush()
+
+
+def run_batch(
+    config: ConfigLike,
+    input_path: str = "-",
+    output_path: Optional[str] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    resume: bool = False,
+) -> BatchRunner:
+    """
+    Run a whole batch. ``-`` reads prompts from stdin; without ``output_path``
+    results go to stdout. With ``resume`` the output file is appended to and
+    items it already answered are skipped.
+    """
+    if resume and not output_path:
+        raise ValueError("--resume needs an --output file to resume from")
+
+    runner = BatchRunner(config, concurrency)
+    skip = completed_ids(output_path) if resume and output_path else set()
+    with ExitStack() as files:
+        source = sys.stdin if input_path == "-" else files.enter_context(open(input_path, "r", encoding="utf-8"))
+        sink = files.enter_context(open(output_path, "a" if resume else "w", encoding="utf-8")) if output_path else sys.stdout
+        if resume and output_path and _ends_mid_line(output_path):
+            sink.write("\n")  # don't glue the first new result onto a line cut short by the interruption
+        asyncio.run(runner.run(source, sink, skip))
+    return runner
@@ -4,6 +4,9 @@ Supports built-in commands like /help, /init, etc.
 """
 
 from typing import Optional
+from rich.markup import escape
+from deltastrik.core.memory import PYTHON_SEARCH_ROWS, search_backend
+from deltastrik.core.session_store import MATCH_START, MATCH_END
 from deltastrik.utils.logging_utils import setup_logger
 
 logger = setup_logger("command_handler")
@@ -19,6 +22,7 @@ class CommandHandler:
         self.client = client
         self.build_system_prompt = system_prompt_builder
         self.app = app
+        self._last_search: list[dict] = []  # hits from the last /search, for /open
 
     def handle(self, user_text: str) -> Optional[str]:
         """
@@ -40,9 +44,32 @@ class CommandHandler:
             return self._handle_copy()
         elif command in ["/exit", "/quit", "exit", "quit"]:
             return self._handle_exit()
+        elif command == "/pin":
+            return self._handle_pin()
+        elif command == "/unpin":
+            return self._handle_unpin()
+        elif command == "/save":
+            return self._handle_save(args)
+        elif command == "/load":
+            return self._handle_load(args)
+        elif command == "/sessions":
+            return self._handle_sessions()
+        elif command == "/search":
+            return self._handle_search(args)
+        elif command == "/open":
+            return self._handle_open(args)
         elif command == "/compact":
-            result = self.session.compact(args)
-            return result
+            return self._handle_compact(args)
+        elif command == "/stats":
+            return self._handle_stats(args)
+        elif command == "/cancel":
+            return self._handle_cancel(args)
+        elif command == "/compare":
+            return self._handle_compare(args)
+        elif command == "/new":
+            return self._handle_new()
+        elif command == "/close":
+            return self._handle_close()
         else:
             return f"[Unknown command: {command}] Try /help for available commands."
 
@@ -59,13 +86,28 @@ class CommandHandler:
       /copy    - Show instructions for copying text (or press Ctrl+M)
       /exit    - Exit the current session
       /compact - Summarize only the reasoning steps and design choices
+      /pin     - Keep the latest message in context regardless of age
+      /unpin   - Remove all pinned messages
+      /save    - Save this session (optionally: /save <name>)
+      /load    - Resume a saved session: /load <name or id>
+      /sessions - List saved sessions
+      /search  - Full-text search across all sessions: /search <query>
+      /open    - Open the session of a search hit: /open <number>
+      /stats   - Latency and token stats for this session (export: /stats json|prom <path>)
+      /cancel  - Stop the reply being generated (or press Ctrl+G): /cancel [keep|drop]
+      /compare - Same prompt to several models side by side: /compare model-a,model-b <prompt>
+      /new     - Start another session in a new tab (or press Ctrl+T; Ctrl+N cycles tabs)
+      /close   - Close this tab (its session stays saved)
     """
         return help_text
 
     def _handle_init(self, args) -> str:
         self.session.clear_history()
-        new_prompt = self.build_system_prompt({})
-        logger.debug(f"Session reinitialized with new system prompt. {new_prompt}")
+        config = self.app.config if self.app else self.session.config
+        new_prompt = self.build_system_prompt(config)
+        if self.app:
+            self.app.system_prompt = new_prompt
+        logger.debug("Session reinitialized with new system prompt (%d chars).", len(new_prompt))
         return "[green]Session reset.[/green] System prompt reloaded."
 
     def _handle_clear(self) -> str:
@@ -73,6 +115,174 @@ class CommandHandler:
         logger.debug("Chat history cleared.")
         return "[green]Chat cleared.[/green]"
 
+    def _handle_pin(self) -> str:
+        if not self.session.pin_message():
+            return "[yellow]Nothing to pin yet.[/yellow]"
+        logger.debug("Pinned latest message.")
+        return "[green]Pinned.[/green] The latest message will always be sent as context."
+
+    def _handle_unpin(self) -> str:
+        self.session.unpin_all()
+        return "[green]All pins removed.[/green]"
+
+    def _handle_compact(self, args) -> str:
+        instructions = " ".join(args) or None
+        if self.app:
+            # Summarization can take a while; run it off the input path
+            self.app.start_compaction(instructions, keep_recent=False)
+            return "[cyan]Compacting conversation in the background...[/cyan]"
+        return self.session.compact(instructions)
+
+    def _handle_save(self, args) -> str:
+        if self.session.store is None:
+            return "[yellow]Session persistence is disabled.[/yellow]"
+        session_id = self.session.save(" ".join(args) or None)
+        label = escape(self.session.name or session_id)
+        return f"[green]Session saved[/green] as {label} (id {session_id})."
+
+    def _handle_load(self, args) -> str:
+        if not args:
+            return "[yellow]Usage: /load <name or id>[/yellow]"
+        if not self.app:
+            return "[yellow]Loading sessions requires the TUI.[/yellow]"
+        return self.app.open_session(" ".join(args))
+
+    def _handle_sessions(self) -> str:
+        if self.session.store is None:
+            return "[yellow]Session persistence is disabled.[/yellow]"
+        self.session.store.flush()
+        rows = self.session.store.list_sessions()
+        if not rows:
+            return "[yellow]No saved sessions yet.[/yellow]"
+        lines = ["[bold cyan]Saved sessions:[/bold cyan]", ""]
+        for row in rows:
+            current = " [green](current)[/green]" if row["id"] == self.session.session_id else ""
+            name = escape(row["name"] or "-")
+            lines.append(f"  {row['id']}  {name:<20} {row['message_count']:>5} msgs  {row['updated_at'][:16]}{current}")
+        return "\n".join(lines)
+
+    def _handle_search(self, args) -> str:
+        store = self.session.store
+        if store is None or not store.search_enabled:
+            return "[yellow]Search is unavailable (persistence disabled or SQLite lacks FTS5).[/yellow]"
+        if not args:
+            return "[yellow]Usage: /search <query>[/yellow]"
+        store.flush()
+        self._last_search = store.search(" ".join(args))
+        if not self._last_search:
+            return "[yellow]No matches.[/yellow]"
+        lines = [f"[bold cyan]{len(self._last_search)} matches[/bold cyan] (use /open <number> to jump):", ""]
+        for i, hit in enumerate(self._last_search, 1):
+            label = escape(hit["session_name"] or hit["session_id"])
+            snippet = escape(hit["snippet"].replace("\n", " "))
+            snippet = snippet.replace(MATCH_START, "[bold magenta]").replace(MATCH_END, "[/bold magenta]")
+            lines.append(f"  [bold]{i:>2}.[/bold] {label} [dim]({hit['role']}, {hit['created_at'][:10]})[/dim]")
+            lines.append(f"      {snippet}")
+        return "\n".join(lines)
+
+    def _handle_open(self, args) -> str:
+        if not args or not args[0].isdigit() or not 1 <= int(args[0]) <= len(self._last_search):
+            return "[yellow]Usage: /open <number from the last /search>[/yellow]"
+        if not self.app:
+            return "[yellow]Opening sessions requires the TUI.[/yellow]"
+        hit = self._last_search[int(args[0]) - 1]
+        return self.app.open_session(hit["session_id"])
+
+    def _handle_stats(self, args) -> str:
+        recorder = self.session.metrics
+        if args:
+            fmt = args[0].lower()
+            if fmt not in ("json", "prom") or len(args) < 2:
+                return "[yellow]Usage: /stats [json|prom <path>][/yellow]"
+            path = " ".join(args[1:])
+            endpoints = self.client.router.stats()
+            try:
+                if fmt == "json":
+                    written = recorder.export_json(path, endpoints)
+                else:
+                    labels = {"model": self.client.model, "session": self.session.session_id}
+                    written = recorder.export_prometheus(path, labels, endpoints)
+            except OSError as e:
+                return f"[red]Could not write stats:[/red] {escape(str(e))}"
+            return f"[green]Stats written[/green] to {escape(written)}."
+
+        s = recorder.summary()
+        routing = self._format_endpoints() if self.client.router.multi else []
+        if not s["requests"]:
+            return "\n".join(["[yellow]No completed replies in this session yet.[/yellow]", *routing])
+        lines = [
+            f"[bold cyan]Session stats[/bold cyan] ({s['requests']} replies)",
+            "",
+            f"  Latency      p50 {s['latency_ms_p50']:.0f} ms   p95 {s['latency_ms_p95']:.0f} ms",
+        ]
+        if any(r.ttft_ms is not None for r in recorder.records):
+            lines.append(f"  TTFT         p50 {s['ttft_ms_p50']:.0f} ms   p95 {s['ttft_ms_p95']:.0f} ms")
+        lines.extend(
+            [
+                f"  Prompt eval  {s['prompt_tokens_total']} tok in {s['prompt_eval_ms_total']:.0f} ms ({s['prompt_tokens_per_sec']:.1f} tok/s)",
+                f"  Generation   {s['eval_tokens_total']} tok in {s['eval_ms_total']:.0f} ms ({s['tokens_per_sec']:.1f} tok/s)",
+                f"  Model load   {s['load_ms_total']:.0f} ms",
+            ]
+        )
+        memory = self.session.memory
+        if memory is not None:
+            recall = f"recall p50 {s['recall_ms_p50']:.0f} ms   p95 {s['recall_ms_p95']:.0f} ms" if s["recalls"] else "nothing recalled yet"
+            backend = search_backend()
+            if backend == "python" and len(memory) > PYTHON_SEARCH_ROWS:
+                backend += f", newest {PYTHON_SEARCH_ROWS} searched"
+            lines.append(f"  Memory       {len(memory)} turns indexed ({backend} search), {recall}")
+        cache = self.client.cache
+        if cache is not None:
+            c = cache.stats()
+            lines.append(f"  Cache        {c['hits']} hits / {c['misses']} misses ({c['disk_bytes'] / 1024:.0f} KiB on disk)")
+        if self.app and self.app.frames.frames:
+            f = self.app.frames.stats()
+            lines.append(
+                f"  UI frames    p50 {f['frame_ms_p50']:.0f} ms   p95 {f['frame_ms_p95']:.0f} ms   max {f['frame_ms_max']:.0f} ms "
+                f"(budget {f['budget_ms']:.0f} ms: {f['over_budget']} of {f['frames']} over, {f['superseded']} updates coalesced)"
+            )
+        return "\n".join(lines + routing)
+
+    def _format_endpoints(self) -> list[str]:
+        lines = ["", "[bold cyan]Endpoints:[/bold cyan]"]
+        for e in self.client.router.stats():
+            state = "[green]up[/green]" if e["healthy"] else "[red]ejected[/red]"
+            latency = f"{e['latency_ms']:.0f} ms" if e["latency_ms"] is not None else "-"
+            models = escape(", ".join(e["models"]) or "-")
+            lines.append(f"  {escape(e['url']):<32} {state}  in flight {e['in_flight']}  {e['requests']} req  {e['errors']} err  latency {latency}  loaded: {models}")
+        return lines
+
+    def _handle_cancel(self, args) -> str:
+        """Abort the in-flight reply; ``keep``/``drop`` decides what happens to the partial text."""
+        if args and args[0].lower() not in ("keep", "drop"):
+            return "[yellow]Usage: /cancel [keep|drop][/yellow]"
+        if not self.app:
+            return "[yellow]Cancelling requires the TUI.[/yellow]"
+        keep = args[0].lower() == "keep" if args else None
+        if not self.app.cancel_generation(keep):
+            return "[yellow]No reply is being generated.[/yellow]"
+        return ""  # The app reports the cancellation itself
+
+    def _handle_compare(self, args) -> str:
+        # Order-preserving dedupe, so "/compare a,a" isn't a comparison
+        models = list(dict.fromkeys(m for m in args[0].split(",") if m)) if args else []
+        if len(models) < 2 or len(args) < 2:
+            return "[yellow]Usage: /compare model-a,model-b[,...] <prompt>[/yellow]"
+        if not self.app:
+            return "[yellow]Comparing models requires the TUI.[/yellow]"
+        return self.app.start_compare(models, " ".join(args[1:]))
+
+    def _handle_new(self) -> str:
+        if not self.app:
+            return "[yellow]Tabs require the TUI.[/yellow]"
+        self.app.open_tab()
+        return ""  # The new tab speaks for itself
+
+    def _handle_close(self) -> str:
+        if not self.app:
+            return "[yellow]Tabs require the TUI.[/yellow]"
+        return self.app.close_tab()
+
     def _handle_copy(self) -> str:
         """Show instructions for copying text from the TUI."""
         if self.app:
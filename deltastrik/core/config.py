@@ -1,7 +1,317 @@
-def load_config():
+# deltastrik/core/config.py
+"""
+Layered configuration for DeltaStrik.
+Settings are resolved into a typed ``Config``, each layer overriding the last:
+
+1. defaults (the field defaults below),
+2. the user file, ``~/.deltastrik/config.yaml`` (or ``DELTASTRIK_CONFIG`` / ``--config``),
+3. environment variables, ``DELTASTRIK_<SETTING>`` (e.g. ``DELTASTRIK_TEMPERATURE=0.2``),
+4. command-line flags and values set by code (``config["model"] = ...``).
+
+Values are converted to each setting's type as they are read, so a bad value
+fails at startup with the setting's name instead of deep inside a request.
+``Config.reload`` re-reads the user file once its mtime changes, so settings
+can be tuned without a restart. YAML files go through ``read_yaml``, which
+only parses a file again when its mtime or size changes.
+
+``Config`` keeps the mapping interface (``get``, ``[]``, ``update``) the rest
+of the code base uses.
+"""
+
+import dataclasses
+import os
+import typing
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("config")
+
+DEFAULT_CONFIG_PATH = "~/.deltastrik/config.yaml"
+ENV_PREFIX = "DELTASTRIK_"
+
+_TRUE = ("1", "true", "yes", "on")
+_FALSE = ("0", "false", "no", "off")
+
+
+class ConfigError(ValueError):
+    """Raised for a config file or value that can't be read as its setting's type."""
+
+
+# ----------------------------------------------------------
+# Cached YAML files
+# ----------------------------------------------------------
+FileStamp = Tuple[int, int]  # (mtime_ns, size)
+_yaml_cache: Dict[str, Tuple[FileStamp, Any]] = {}
+
+
+def file_stamp(path: str) -> Optional[FileStamp]:
+    """Modification stamp of ``path``, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def read_yaml(path: str) -> Any:
     """
-    Placeholder config loader.
-    Eventually this will read deltastrik/data/settings.yaml or user config.
-    For now, just return a simple dict.
+    Parse the YAML file at ``path``, re-reading it only when its stamp changes.
+    Returns None if the file doesn't exist; parse errors propagate.
     """
-    return {"model": "gpt-oss:latest", "temperature": 0.7, "max_tokens": 1024, "timeout": 60}
+    path = os.path.expanduser(path)
+    stamp = file_stamp(path)
+    if stamp is None:
+        _yaml_cache.pop(path, None)
+        return None
+    cached = _yaml_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    import yaml  # deferred: only needed when a user file exists
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f)
+    _yaml_cache[path] = (stamp, data)
+    return data
+
+
+# ----------------------------------------------------------
+# Settings
+# ----------------------------------------------------------
+@dataclass
+class Config:
+    """Every DeltaStrik setting with its type and default."""
+
+    model: str = "gpt-oss:latest"
+    temperature: float = 0.7
+    max_tokens: int = 1024
+    timeout: float = 60
+    stream: bool = True
+    context_tokens: int = 8192  # sent to Ollama as num_ctx
+    auto_compact_tokens: Optional[int] = None  # None = 75% of the prompt budget
+    ollama_url: str = "http://127.0.0.1:11434"
+    ollama_urls: List[str] = field(default_factory=list)  # several Ollama hosts to route between; empty = just ollama_url
+    session_db: str = "~/.deltastrik/sessions.db"
+    resume_window: int = 50  # messages shown when a session is loaded
+    input_history: str = "~/.deltastrik/input_history.jsonl"  # submitted input, shared by all sessions; "" = this run only
+    input_history_size: int = 50000  # distinct entries kept for Up/Down, Ctrl+R and suggestions
+    ui_fps: int = 30  # most times a second streamed text, status and scrolling are redrawn
+    memory: bool = False  # recall relevant earlier turns by embedding instead of sending the whole history
+    memory_model: str = "nomic-embed-text"  # Ollama embedding model for memory
+    memory_top_k: int = 4  # earlier turns recalled per message
+    memory_recent_messages: int = 8  # newest messages always sent verbatim alongside recalled turns
+    memory_dir: str = ""  # "" = a memory/ folder next to session_db (memory-only without one)
+    persona_file: str = "~/.deltastrik/system_prompt.yaml"
+    prompt_layout: str = "stable"  # "stable" keeps the system prompt byte-identical across turns
+    keep_alive: Any = "30m"  # keep the model resident in Ollama between turns (duration or seconds)
+    config_reload_interval: float = 2.0  # seconds between checks for edited config/persona files; 0 = off
+    prefill: bool = False  # warm Ollama's KV cache with the prompt while the user is still typing
+    prefill_idle_ms: int = 600  # typing pause before a prefill is sent
+    compare_models_per_endpoint: int = 2  # models /compare runs at once per host (each one occupies VRAM)
+    cancel_keep_partial: bool = True  # Ctrl+G keeps the reply streamed so far in history
+    log_level: str = "INFO"  # DEBUG adds (size-capped) request/response summaries
+    log_max_bytes: int = 5 * 1024 * 1024
+    log_backups: int = 3
+    endpoint_parallel: int = 4  # requests each endpoint runs at once (its OLLAMA_NUM_PARALLEL)
+    endpoint_max_failures: int = 3  # consecutive failures before an endpoint is ejected
+    endpoint_probe_interval: float = 10.0  # seconds between /api/ps health probes
+    response_cache: bool = False  # reuse replies to identical temperature-0 requests
+    response_cache_path: str = "~/.deltastrik/cache.db"  # disk tier; "" = memory only
+    response_cache_entries: int = 256  # in-memory LRU size
+    response_cache_max_mb: float = 64  # disk tier size before least-recently-used eviction
+    response_cache_force: bool = False  # also cache temperature > 0 replies
+    batch_concurrency: int = 4  # requests in flight for `deltastrik batch`; match OLLAMA_NUM_PARALLEL
+
+    # Keys without a typed setting, kept as given
+    extra: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self) -> None:
+        self._path: Optional[str] = None
+        self._stamp: Optional[FileStamp] = None
+        self._env: Dict[str, str] = {}
+        self._overrides: Dict[str, Any] = {}
+
+    @property
+    def path(self) -> Optional[str]:
+        """The user config file this config reads (it need not exist)."""
+        return self._path
+
+    # -------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------
+    @classmethod
+    def load(cls, path: Optional[str] = None, env: Optional[Mapping[str, str]] = None, overrides: Optional[Mapping[str, Any]] = None) -> "Config":
+        env = os.environ if env is None else env
+        config = cls()
+        config._path = os.path.expanduser(path or env.get(f"{ENV_PREFIX}CONFIG") or DEFAULT_CONFIG_PATH)
+        config._env = {k: v for k, v in env.items() if k.startswith(ENV_PREFIX)}
+        config._overrides = dict(overrides or {})
+        config._apply(config._resolve(config._read_file()))
+        return config
+
+    def reload(self) -> Dict[str, Tuple[Any, Any]]:
+        """
+        Re-read the user file if it changed on disk and apply it in place.
+        Returns ``{setting: (old, new)}`` for what changed. A file that no longer
+        parses is logged and ignored, keeping the current settings.
+        """
+        if self._path is None or file_stamp(self._path) == self._stamp:
+            return {}
+        try:
+            values = self._resolve(self._read_file())
+        except ConfigError as e:
+            logger.warning("Keeping current config: %s", e)
+            return {}
+        changed = self._apply(values)
+        if changed:
+            logger.info("Config reloaded from %s: %s", self._path, ", ".join(sorted(changed)))
+        return changed
+
+    def _read_file(self) -> Dict[str, Any]:
+        assert self._path is not None
+        self._stamp = file_stamp(self._path)
+        try:
+            data = read_yaml(self._path)
+        except Exception as e:
+            raise ConfigError(f"{self._path}: {e}") from e
+        if data is None:
+            return {}
+        if not isinstance(data, dict):
+            raise ConfigError(f"{self._path}: expected a mapping of settings")
+        return data
+
+    def _resolve(self, file_values: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge defaults, file, environment and overrides into converted values."""
+        values = {f.name: _default(f) for f in dataclasses.fields(self) if f.name != "extra"}
+        values.update({key: self._convert(key, value, str(self._path)) for key, value in file_values.items()})
+        for name in SETTINGS:
+            raw = self._env.get(f"{ENV_PREFIX}{name.upper()}")
+            if raw is not None:
+                values[name] = self._convert(name, raw, f"${ENV_PREFIX}{name.upper()}")
+        values.update({key: self._convert(key, value, "override") for key, value in self._overrides.items()})
+        return values
+
+    @staticmethod
+    def _convert(key: str, value: Any, source: str) -> Any:
+        if key not in SETTINGS:
+            return value
+        try:
+            return _coerce(value, SETTINGS[key])
+        except (TypeError, ValueError) as e:
+            raise ConfigError(f"{source}: {key}: {e}") from e
+
+    def _apply(self, values: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+        changed = {}
+        extra = {}
+        for key, value in values.items():
+            old = self.get(key)
+            if key in SETTINGS:
+                setattr(self, key, value)
+            else:
+                extra[key] = value
+            if old != value:
+                changed[key] = (old, value)
+        for key in set(self.extra) - set(extra):
+            changed[key] = (self.extra[key], None)
+        unknown = set(extra) - set(self.extra)
+        if unknown:
+            logger.warning("Unknown config keys (kept as-is): %s", ", ".join(sorted(unknown)))
+        self.extra = extra
+        return changed
+
+    # -------------------------------------------------------
+    # Mapping interface
+    # -------------------------------------------------------
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in SETTINGS:
+            return getattr(self, key)
+        return self.extra.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        if key in SETTINGS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        # Set by code: the top layer, so a later file reload doesn't undo it
+        value = self._convert(key, value, "override")
+        self._overrides[key] = value
+        if key in SETTINGS:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key: object) -> bool:
+        return key in SETTINGS or key in self.extra
+
+    def update(self, values: Mapping[str, Any]) -> None:
+        for key, value in values.items():
+            self[key] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**{name: getattr(self, name) for name in SETTINGS}, **self.extra}
+
+
+# setting name -> annotated type
+SETTINGS: Dict[str, Any] = {name: kind for name, kind in typing.get_type_hints(Config).items() if name != "extra"}
+
+# What settings consumers accept: a loaded Config, or a plain mapping (tests, benchmarks)
+ConfigLike = Union[Config, Mapping[str, Any]]
+
+
+def _default(f: "dataclasses.Field[Any]") -> Any:
+    if f.default_factory is not dataclasses.MISSING:
+        return f.default_factory()
+    return f.default
+
+
+def _coerce(value: Any, kind: Any) -> Any:
+    """Convert a file, environment or flag value to a setting's annotated type."""
+    if kind is Any:
+        # keep_alive: a duration such as "30m", or a number of seconds
+        return int(value) if isinstance(value, str) and value.lstrip("-").isdigit() else value
+    if typing.get_origin(kind) is typing.Union:  # Optional[X]
+        if value is None or (isinstance(value, str) and value.strip().lower() in ("", "none", "null")):
+            return None
+        kind = next(arg for arg in typing.get_args(kind) if arg is not type(None))
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in _TRUE:
+            return True
+        if text in _FALSE:
+            return False
+        raise ValueError(f"expected true or false, got {value!r}")
+    if kind in (int, float):
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"expected a number, got {value!r}")
+        try:
+            number = float(value)
+        except ValueError:
+            raise ValueError(f"expected a number, got {value!r}") from None
+        if kind is int:
+            if not number.is_integer():
+                raise ValueError(f"expected a whole number, got {value!r}")
+            return int(number)
+        return number
+    if kind is str:
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"expected text, got {value!r}")
+        return str(value)
+    if typing.get_origin(kind) is list:
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        if not isinstance(value, list):
+            raise ValueError(f"expected a list, got {value!r}")
+        return [str(item) for item in value]
+    return value
+
+
+def load_config(path: Optional[str] = None, overrides: Optional[Mapping[str, Any]] = None) -> Config:
+    """
+    Resolve the settings once at startup: defaults, then the user file, then
+    ``DELTASTRIK_*`` environment variables, then ``overrides`` (CLI flags).
+    """
+    return Config.load(path, overrides=overrides)
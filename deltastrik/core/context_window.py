@@ -0,0 +1,162 @@
+# deltastrik/core/context_window.py
+"""
+Token-budgeted context selection for DeltaStrik.
+Keeps a token estimate per history message (computed once on append) and picks
+what fits the budget: system prompt first, then pinned messages, then the
+newest turns. The window boundary moves incrementally as messages arrive
+instead of rescanning the whole history every turn.
+"""
+
+import math
+from bisect import insort
+from typing import List
+
+from deltastrik.core.message import Message
+
+# Rough per-message overhead for the chat template (role markers, separators)
+MESSAGE_OVERHEAD = 4
+
+
+class TokenEstimator:
+    """
+    Character-based token estimate, calibrated against the ``prompt_eval_count``
+    Ollama reports. Raw counts never change once computed; calibration only
+    adjusts a global ``scale`` applied at selection time.
+    """
+
+    def __init__(self, chars_per_token: float = 4.0, smoothing: float = 0.3):
+        self.chars_per_token = chars_per_token
+        self.smoothing = smoothing
+        self.scale = 1.0
+
+    def count(self, text: str) -> int:
+        """Raw (uncalibrated) token estimate for one message."""
+        return math.ceil(len(text) / self.chars_per_token) + MESSAGE_OVERHEAD
+
+    def calibrate(self, estimated_raw: int, actual: int) -> None:
+        """Fold one observed prompt size into the running scale factor."""
+        if estimated_raw <= 0 or actual <= 0:
+            return
+        ratio = actual / estimated_raw
+        # A much smaller count usually means Ollama reused its KV cache, not a bad estimate
+        if ratio < 0.25:
+            return
+        ratio = min(ratio, 4.0)
+        self.scale += self.smoothing * (ratio - self.scale)
+
+
+class ContextWindow:
+    """
+    Incrementally maintained selection of history messages under a token budget.
+    """
+
+    def __init__(self, budget: int, estimator: TokenEstimator | None = None):
+        self.budget = budget
+        self.estimator = estimator or TokenEstimator()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all messages and pins."""
+        self.tokens: List[int] = []  # raw estimate per history message
+        self.total_tokens = 0  # raw tokens of the whole history
+        self.pinned: List[int] = []  # sorted indices into history
+        self._pinned_set: set[int] = set()
+        self.pinned_tokens = 0
+        self.start = 0  # oldest unpinned message inside the window
+        self.window_tokens = 0  # raw tokens of unpinned messages in [start:]
+
+    def rebuild(self, history: List[Message]) -> None:
+        """Recount from scratch after history is replaced wholesale."""
+        self.reset()
+        for i, msg in enumerate(history):
+            msg.tokens = self.append(msg.content)
+            if msg.role == "system":
+                self.pin(i)
+
+    def append(self, text: str) -> int:
+        """Record a newly appended message and return its raw token count."""
+        n = self.estimator.count(text)
+        self.tokens.append(n)
+        self.total_tokens += n
+        self.window_tokens += n
+        return n
+
+    def fold_prefix(self, cut: int, summary_text: str) -> int:
+        """
+        Mirror a history rewrite where messages ``[0:cut]`` were replaced by one
+        pinned summary message. Counts for the surviving messages are reused.
+        Returns the summary's raw token count.
+        """
+        kept = self.tokens[cut:]
+        kept_pins = [i - cut + 1 for i in self.pinned if i >= cut]
+        self.reset()
+        summary_tokens = self.append(summary_text)
+        for n in kept:
+            self.tokens.append(n)
+            self.total_tokens += n
+            self.window_tokens += n
+        self.pin(0)
+        for index in kept_pins:
+            self.pin(index)
+        return summary_tokens
+
+    def split_for_tail(self, start: int, tail_raw: int) -> int:
+        """
+        Return the index where the newest ``tail_raw`` tokens begin, scanning back
+        from the end but never before ``start``.
+        """
+        index = len(self.tokens)
+        kept = 0
+        while index > start and kept + self.tokens[index - 1] <= tail_raw:
+            index -= 1
+            kept += self.tokens[index]
+        return index
+
+    def pin(self, index: int) -> None:
+        """Always include the message at ``index``, regardless of age."""
+        if index in self._pinned_set or not 0 <= index < len(self.tokens):
+            return
+        insort(self.pinned, index)
+        self._pinned_set.add(index)
+        self.pinned_tokens += self.tokens[index]
+        if index >= self.start:
+            self.window_tokens -= self.tokens[index]
+
+    def unpin_all(self) -> None:
+        """Drop every pin; pinned messages fall back to normal recency rules."""
+        for index in self.pinned:
+            if index >= self.start:
+                self.window_tokens += self.tokens[index]
+        self.pinned = []
+        self._pinned_set = set()
+        self.pinned_tokens = 0
+
+    def select(self, history: List[Message], fixed_raw: int = 0) -> List[Message]:
+        """
+        Return pinned messages followed by the newest turns that fit the budget.
+        ``fixed_raw`` is the raw estimate of everything sent regardless
+        (system prompt, the new user message, reserved reply tokens).
+        """
+        limit = self.budget / self.estimator.scale - fixed_raw - self.pinned_tokens
+
+        # Shrink: drop the oldest unpinned messages until the window fits
+        while self.window_tokens > limit and self.start < len(self.tokens):
+            if self.start not in self._pinned_set:
+                self.window_tokens -= self.tokens[self.start]
+            self.start += 1
+
+        # Grow: take older messages back if the budget allows (e.g. after calibration)
+        while self.start > 0:
+            prev = self.start - 1
+            cost = 0 if prev in self._pinned_set else self.tokens[prev]
+            if self.window_tokens + cost > limit:
+                break
+            self.window_tokens += cost
+            self.start = prev
+
+        older_pins = [history[i] for i in self.pinned if i < self.start]
+        return older_pins + history[self.start :]
+
+    def selected_raw(self) -> int:
+        """Raw token estimate of the current selection."""
+        return self.window_tokens + self.pinned_tokens
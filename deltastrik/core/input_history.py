@@ -0,0 +1,284 @@
+# deltastrik/core/input_history.py
+"""
+Persistent input history for DeltaStrik.
+Every submitted prompt and command is appended to one file shared by all
+sessions (one JSON string per line). Loading replays the file and keeps each
+entry once, at its most recent position, up to ``max_entries``; once the file
+holds more than ``REWRITE_FACTOR`` times that many lines, it is rewritten
+with just the kept entries.
+
+The index is every entry casefolded and joined into one newline-separated
+text, so lookups run inside the C string and regex engines rather than a
+Python loop per entry:
+- ``search``: fuzzy match for Ctrl+R (the query's characters in order).
+  Entries containing the query as is come first, then ever looser matches
+  (at most 3, then any number of characters between two typed ones),
+  newest first within each tier. Exact hits are scanned for from
+  the newest entry back, a chunk at a time, and usually fill the results
+  on their own. When they don't, one pass finds every line the query
+  matches at all; once that set is small, the tiers and the next keystroke
+  (which can only narrow it) recheck just those lines;
+- ``complete``: the newest entry starting with a prefix (inline suggestions),
+  one ``rfind`` of newline + prefix.
+"""
+
+import json
+import os
+import re
+import threading
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("input_history")
+
+# Characters allowed between two typed ones, tightest tier first (0 = the query as is, None = any)
+MATCH_GAPS = (0, 3, None)
+# Lines scanned per step, newest first
+CHUNK_LINES = 2000
+# Up to this many matching lines, a longer query rechecks just those instead of scanning the index
+NARROW_MAX = 5000
+# The file is rewritten once it has this many times max_entries lines (repeats and dropped entries)
+REWRITE_FACTOR = 2
+
+
+def _fold(text: str) -> str:
+    # Newlines separate entries in the index
+    return text.casefold().replace("\n", " ")
+
+
+def _pattern(needle: str, gap: Optional[int]) -> "re.Pattern[str]":
+    """
+    A regex for lines containing ``needle`` with at most ``gap`` characters
+    between two of its characters (0 = as is, None = any number). Gaps are
+    possessive ([^b\\n]{0,gap}+b) so a line is never backtracked over, and
+    the rest of the line is consumed so each line matches once.
+    """
+    if gap == 0:
+        return re.compile(f"{re.escape(needle)}[^\\n]*")
+    if gap is None:
+        # Any gap: matching greedily from the first occurrence of each character finds the
+        # subsequence if it is there at all, so one attempt per line is enough. Anchored on
+        # the newline before the line, which the engine can scan for like any literal
+        return re.compile("\\n" + "".join(f"[^{re.escape(c)}\\n]*+{re.escape(c)}" for c in needle) + "[^\\n]*")
+    parts = [re.escape(needle[0])]
+    for char in needle[1:]:
+        escaped = re.escape(char)
+        parts.append(f"[^{escaped}\\n]{{0,{gap}}}+{escaped}")
+    return re.compile(f"{''.join(parts)}[^\\n]*")
+
+
+class InputHistory:
+    """
+    Deduplicated history of submitted input, oldest first in ``entries``.
+    ``path`` is the file to persist to; None keeps history for this run only.
+    The app reads the file on a worker thread (``load``) at startup; lookups
+    made before that finishes see the history empty instead of waiting for it.
+    Without a worker, the file is read on first use.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 50000):
+        self.path = os.path.expanduser(path) if path else None
+        self.max_entries = max(1, max_entries)
+        self._entries: List[str] = []
+        self._folded: List[str] = []  # casefolded entries, for matching
+        self._index: Optional[Tuple[str, List[int]]] = None  # (joined text, start of each line); None = stale
+        self._loaded = False
+        self._load_lock = threading.Lock()  # held while the file is read
+        self._file_lines = 0  # lines in the file, repeats included
+        self._last: Optional[Tuple[str, List[int]]] = None  # (query, every line it matched, newest first)
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self) -> Sequence[str]:
+        self._try_load()
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def load(self) -> None:
+        """Read the history file, once; blocks while another thread is reading it."""
+        with self._load_lock:
+            if not self._loaded:
+                self._read()
+
+    def _try_load(self) -> None:
+        """Read the file here unless another thread already is (its entries appear once it is done)."""
+        if self._loaded or not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            if not self._loaded:
+                self._read()
+        finally:
+            self._load_lock.release()
+
+    def _read(self) -> None:
+        if self.path is None:
+            self._loaded = True
+            return
+        order: Dict[str, None] = {}
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        text = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    if isinstance(text, str):
+                        # Re-inserting moves a repeated entry to its latest position
+                        order.pop(text, None)
+                        order[text] = None
+        except FileNotFoundError:
+            self._loaded = True
+            return
+        except OSError as e:
+            logger.warning("Ignoring unreadable input history %s: %s", self.path, e)
+            self._loaded = True
+            return
+        entries = list(order)[-self.max_entries :]
+        folded = [_fold(text) for text in entries]
+        with self._lock:
+            self._entries, self._folded = entries, folded
+            self._index = None
+            self._last = None
+            self._file_lines = lines
+            self._loaded = True
+            if lines > REWRITE_FACTOR * self.max_entries:
+                self._rewrite()
+
+    def _joined(self) -> Tuple[str, List[int]]:
+        """The index text ("\\n" + one folded entry per line) and each line's offset in it."""
+        if self._index is None:
+            text = "\n" + "\n".join(self._folded)
+            starts = list(accumulate((len(line) + 1 for line in self._folded[:-1]), initial=1))
+            self._index = (text, starts if self._folded else [])
+        return self._index
+
+    # ----------------------------------------------------------
+    # Recording
+    # ----------------------------------------------------------
+    def add(self, text: str) -> None:
+        """Record a submitted entry, moving an earlier copy of it to the newest position."""
+        text = text.strip()
+        if not text:
+            return
+        self.load()
+        with self._lock:
+            if self._entries and self._entries[-1] == text:
+                return
+            if text in self._entries:
+                index = self._entries.index(text)
+                del self._entries[index], self._folded[index]
+            self._entries.append(text)
+            self._folded.append(_fold(text))
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                del self._entries[:overflow], self._folded[:overflow]
+            self._index = None
+            self._last = None
+            if self.path is not None:
+                self._append(self.path, text)
+                if self._file_lines > REWRITE_FACTOR * self.max_entries:
+                    self._rewrite()
+
+    def _append(self, path: str, text: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(text, ensure_ascii=False) + "\n")
+            self._file_lines += 1
+        except OSError as e:
+            logger.warning("Could not save input history to %s: %s", path, e)
+
+    def _rewrite(self) -> None:
+        """Replace the file with just the kept entries (called with the lock held)."""
+        if self.path is None:
+            return
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(text, ensure_ascii=False) + "\n" for text in self._entries)
+            # Atomic: a crash leaves either the old file or the new one
+            os.replace(tmp, self.path)
+            self._file_lines = len(self._entries)
+        except OSError as e:
+            logger.warning("Could not compact input history %s: %s", self.path, e)
+
+    # ----------------------------------------------------------
+    # Lookups
+    # ----------------------------------------------------------
+    def search(self, query: str, limit: int = 50) -> List[str]:
+        """
+        Entries containing ``query``'s characters in order (case-insensitive),
+        tightest matches first and newest first among equals. An empty query
+        lists the newest entries.
+        """
+        self._try_load()
+        needle = _fold(query)
+        with self._lock:
+            if not needle:
+                return self._entries[: -limit - 1 : -1]
+            text, starts = self._joined()
+            found: Dict[int, None] = {}  # matching lines, best first
+            tiers: List[Iterable[int]]
+            last = self._last
+            if last is not None and needle.startswith(last[0]):
+                # Typing narrows: only lines that matched the shorter query can match this one
+                candidates = self._matching(last[1], _pattern(needle, None), text, starts)
+                tiers = [self._matching(candidates, _pattern(needle, gap), text, starts) for gap in MATCH_GAPS[:-1]]
+            else:
+                candidates = None
+                tiers = [self._newest_matches(text, starts, _pattern(needle, gap)) for gap in MATCH_GAPS[:-1]]
+            for tier in tiers:
+                for line in tier:
+                    found.setdefault(line)
+                    if len(found) == limit:
+                        self._last = None
+                        return [self._entries[line] for line in found]
+            if candidates is None:
+                # Few matches: find them all, so the next keystroke only rechecks those
+                candidates = list(self._newest_matches(text, starts, _pattern(needle, None)))
+            self._last = (needle, candidates) if len(candidates) <= NARROW_MAX else None
+            found.update(dict.fromkeys(candidates))
+            return [self._entries[line] for line in islice(found, limit)]
+
+    def _matching(self, lines: List[int], pattern: "re.Pattern[str]", text: str, starts: List[int]) -> List[int]:
+        """The ``lines`` (in order) that ``pattern`` matches."""
+        search, folded = pattern.search, self._folded
+        return [line for line in lines if search(text, starts[line] - 1, starts[line] + len(folded[line]))]
+
+    @staticmethod
+    def _newest_matches(text: str, starts: List[int], pattern: "re.Pattern[str]") -> Iterator[int]:
+        """Lines of the index ``pattern`` matches, newest first, scanned a chunk at a time."""
+        end = len(starts)
+        while end > 0:
+            begin = max(0, end - CHUNK_LINES)
+            stop = starts[end] - 1 if end < len(starts) else len(text)
+            # From the newline before the chunk; a match starts at most one character before its line
+            found = pattern.finditer(text, starts[begin] - 1, stop)
+            lines = [bisect_right(starts, match.start() + 1) - 1 for match in found]
+            yield from reversed(lines)
+            end = begin
+
+    def complete(self, prefix: str) -> Optional[str]:
+        """The newest entry that starts with ``prefix`` (case-insensitive) and is longer than it."""
+        self._try_load()
+        needle = "\n" + _fold(prefix)
+        if needle == "\n":
+            return None
+        with self._lock:
+            text, starts = self._joined()
+            end = len(text)
+            while True:
+                pos = text.rfind(needle, 0, end)
+                if pos < 0:
+                    return None
+                line = bisect_right(starts, pos + 1) - 1
+                if len(self._folded[line]) > len(needle) - 1:
+                    return self._entries[line]
+                end = pos  # the entry is exactly the prefix: look further back
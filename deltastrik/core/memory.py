@@ -0,0 +1,163 @@
+# deltastrik/core/memory.py
+"""
+Long-term conversation memory for DeltaStrik.
+Each completed turn (a question and its reply) is embedded through Ollama's
+/api/embed and kept in a per-session index. When a message is sent, the turns
+most similar to it are recalled and sent together with the recent window, in
+place of the whole history, so prompt size stays flat as a session grows.
+
+Vectors are unit-normalized float32 rows in one flat buffer. NumPy scores them
+with a single matrix-vector product when it is installed (``pip install
+deltastrik[memory]``; imported on the first search, not at startup).
+Otherwise ``math.sumprod`` scores them row by row, which takes about 35 ms per
+thousand turns, so only the newest ``PYTHON_SEARCH_ROWS`` are searched. Each
+index is two append-only files next to the session database, keyed by session
+and embedding model:
+
+- ``<session>.<model>.f32``: the vectors, row after row;
+- ``<session>.<model>.jsonl``: a ``{"dim": ...}`` header, then one turn per line.
+"""
+
+import functools
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("memory")
+
+RECALL_HEADER = "Relevant earlier turns from this conversation:"
+# Without NumPy, the newest turns searched (older ones are never recalled); keeps a search under ~100 ms
+PYTHON_SEARCH_ROWS = 2000
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy() -> Any:
+    """NumPy, imported on first use so it stays off the startup path; None if it isn't installed."""
+    try:
+        import numpy
+    except ImportError:  # optional: only makes search faster
+        return None
+    return numpy
+
+
+def search_backend() -> str:
+    """How ``MemoryIndex.search`` scores vectors: "numpy", or "python" (newest ``PYTHON_SEARCH_ROWS`` only)."""
+    return "numpy" if _numpy() is not None else "python"
+
+
+def memory_path(directory: str, session_id: str, model: str) -> str:
+    """File prefix (without extension) of one session's index for ``model``."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model)
+    return os.path.join(os.path.expanduser(directory), f"{session_id}.{slug}")
+
+
+def turn_text(turn: Dict[str, str]) -> str:
+    """The text a turn is embedded (and recalled) as."""
+    return f"user: {turn['user']}\nassistant: {turn['assistant']}"
+
+
+def _normalize(vector: Sequence[float]) -> array:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return array("f", (x / norm for x in vector))
+
+
+class MemoryIndex:
+    """
+    Embedded turns of one session. ``path`` is the file prefix to persist to;
+    None keeps the index in memory only. Safe to use from worker threads.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.dim = 0
+        self.turns: List[Dict[str, str]] = []
+        self._vectors = array("f")  # len(turns) rows of dim floats
+        self._lock = threading.Lock()
+        if path is not None:
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def _load(self) -> None:
+        assert self.path is not None
+        try:
+            with open(f"{self.path}.jsonl", "r", encoding="utf-8") as f:
+                header = json.loads(f.readline() or "{}")
+                turns = [json.loads(line) for line in f if line.strip()]
+            self.dim = int(header.get("dim", 0))
+            if not self.dim:
+                return
+            vectors = array("f")
+            with open(f"{self.path}.f32", "rb") as f:
+                rows = min(len(turns), os.fstat(f.fileno()).st_size // (vectors.itemsize * self.dim))
+                vectors.fromfile(f, rows * self.dim)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable memory index %s: %s", self.path, e)
+            self.dim = 0
+            return
+        # A crash between the two appends leaves one file a row ahead; drop the unmatched tail
+        self.turns = turns[:rows]
+        self._vectors = vectors
+
+    def add(self, vector: Sequence[float], turn: Dict[str, str]) -> None:
+        """Index (and persist) one turn under its embedding."""
+        row = _normalize(vector)
+        with self._lock:
+            if not self.dim:
+                self.dim = len(row)
+                self._write_header()
+            elif len(row) != self.dim:
+                raise ValueError(f"embedding has {len(row)} dimensions, index has {self.dim}")
+            self._vectors.extend(row)
+            self.turns.append(turn)
+            if self.path is not None:
+                with open(f"{self.path}.f32", "ab") as f:
+                    row.tofile(f)
+                with open(f"{self.path}.jsonl", "a", encoding="utf-8") as f:
+                    f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+
+    def _write_header(self) -> None:
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.jsonl", "w", encoding="utf-8") as f:
+            f.write(json.dumps({"dim": self.dim}) + "\n")
+        open(f"{self.path}.f32", "wb").close()
+
+    def search(self, vector: Sequence[float], k: int, exclude: Iterable[str] = ()) -> List[Tuple[float, Dict[str, str]]]:
+        """
+        The ``k`` turns most similar to ``vector`` as (cosine score, turn), best
+        first. Turns whose question is in ``exclude`` (already in the prompt) are skipped.
+        """
+        skip = set(exclude)
+        with self._lock:
+            count = len(self.turns)
+            if not count or k <= 0 or len(vector) != self.dim:
+                return []
+            query = _normalize(vector)
+            numpy = _numpy()
+            if numpy is not None:
+                wanted = min(count, k + len(skip))
+                matrix = numpy.frombuffer(self._vectors, dtype=numpy.float32).reshape(count, self.dim)
+                scores = matrix @ numpy.frombuffer(query, dtype=numpy.float32)
+                best = numpy.argpartition(-scores, wanted - 1)[:wanted]
+                ranked = [(float(scores[i]), int(i)) for i in best]
+                del matrix, scores  # release the buffer export so add() can grow the array
+            else:
+                first = max(0, count - PYTHON_SEARCH_ROWS)
+                wanted = min(count - first, k + len(skip))
+                dim, rows = self.dim, memoryview(self._vectors)
+                ranked = [(math.sumprod(query, rows[i * dim : (i + 1) * dim]), i) for i in range(first, count)]
+                rows.release()
+            top = heapq.nlargest(wanted, ranked)
+            return [(score, self.turns[i]) for score, i in top if self.turns[i]["user"] not in skip][:k]
@@ -0,0 +1,109 @@
+# deltastrik/core/message.py
+"""
+Chat messages for DeltaStrik.
+A ``Message`` is one history entry (role, content, estimated tokens, timestamp
+and id) stored in ``__slots__`` rather than a dict per message. It encodes its
+own /api/chat JSON form the first time it is sent and keeps the bytes, so
+``encode_payload`` builds a request body by joining cached fragments: each
+turn serializes only the messages that are new, however long the history.
+
+Messages are not edited once created; a changed message is a new ``Message``.
+They still read like the ``{"role", "content"}`` dicts they replace
+(``msg["content"]``, ``msg.get("role")``, ``dict(msg)``), and plain dicts are
+accepted anywhere a message is (batch files, benchmarks).
+"""
+
+import itertools
+import json
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+_ids = itertools.count(1)
+
+MessageLike = Union["Message", Mapping[str, Any]]
+
+
+class Message:
+    """One chat message with its encoded JSON cached."""
+
+    __slots__ = ("role", "content", "tokens", "timestamp", "id", "_encoded")
+
+    def __init__(self, role: str, content: str, tokens: int = 0, timestamp: Optional[float] = None):
+        self.role = role
+        self.content = content
+        self.tokens = tokens  # raw (uncalibrated) estimate; 0 until counted
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.id = next(_ids)  # unique within the process
+        self._encoded: Optional[bytes] = None
+
+    @classmethod
+    def of(cls, message: MessageLike) -> "Message":
+        """``message`` itself, or a Message made from a ``{"role", "content"}`` mapping."""
+        if isinstance(message, Message):
+            return message
+        return cls(message["role"], message["content"])
+
+    @property
+    def encoded(self) -> bytes:
+        """``{"role": ..., "content": ...}`` as UTF-8 JSON, serialized once."""
+        if self._encoded is None:
+            self._encoded = json.dumps({"role": self.role, "content": self.content}, ensure_ascii=False).encode("utf-8")
+        return self._encoded
+
+    # -------------------------------------------------------
+    # Dict-style access
+    # -------------------------------------------------------
+    def keys(self) -> Tuple[str, str]:
+        return ("role", "content")
+
+    def __getitem__(self, key: str) -> str:
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"role": self.role, "content": self.content}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Message):
+            return self.role == other.role and self.content == other.content
+        if isinstance(other, Mapping):
+            return dict(other) == self.to_dict()
+        return NotImplemented
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, content={self.content!r})"
+
+
+def _fragment(message: MessageLike) -> bytes:
+    if isinstance(message, Message):
+        return message.encoded
+    return json.dumps(dict(message), ensure_ascii=False).encode("utf-8")
+
+
+def encode_messages(messages: Iterable[MessageLike]) -> bytes:
+    """A JSON array of ``messages`` joined from their cached fragments."""
+    return b"[" + b", ".join(map(_fragment, messages)) + b"]"
+
+
+def encode_payload(payload: Mapping[str, Any]) -> bytes:
+    """
+    ``payload`` as a UTF-8 JSON request body. Only the small fields around
+    ``messages`` are serialized here; the messages are spliced in pre-encoded.
+    """
+    if "messages" not in payload:
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    rest = {key: value for key, value in payload.items() if key != "messages"}
+    head = json.dumps(rest, ensure_ascii=False).encode("utf-8")[:-1]  # without the closing brace
+    separator = b", " if rest else b""
+    return head + separator + b'"messages": ' + encode_messages(payload["messages"]) + b"}"
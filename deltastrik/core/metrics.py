@@ -0,0 +1,176 @@
+# deltastrik/core/metrics.py
+"""
+Response metrics for DeltaStrik.
+Turns Ollama's server-side timings (reported in nanoseconds on the final
+response/chunk) plus client-side wall time and TTFT into structured records,
+and aggregates them per session for /stats and JSON / Prometheus export.
+"""
+
+import json
+import math
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+NS_PER_MS = 1_000_000
+
+
+@dataclass
+class ResponseMetrics:
+    """One completed request."""
+
+    model: str
+    wall_ms: float
+    ttft_ms: Optional[float] = None
+    total_duration_ms: float = 0.0
+    load_duration_ms: float = 0.0
+    prompt_eval_count: int = 0
+    prompt_eval_ms: float = 0.0
+    eval_count: int = 0
+    eval_ms: float = 0.0
+    timestamp: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_response(cls, data: Dict[str, Any], model: str, wall_ms: float, ttft_ms: Optional[float] = None) -> "ResponseMetrics":
+        """Build a record from the final /api/chat response (or last streamed chunk)."""
+        return cls(
+            model=data.get("model", model),
+            wall_ms=wall_ms,
+            ttft_ms=ttft_ms,
+            total_duration_ms=data.get("total_duration", 0) / NS_PER_MS,
+            load_duration_ms=data.get("load_duration", 0) / NS_PER_MS,
+            prompt_eval_count=data.get("prompt_eval_count", 0),
+            prompt_eval_ms=data.get("prompt_eval_duration", 0) / NS_PER_MS,
+            eval_count=data.get("eval_count", 0),
+            eval_ms=data.get("eval_duration", 0) / NS_PER_MS,
+        )
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """Generation speed as measured by the server."""
+        return self.eval_count / (self.eval_ms / 1000) if self.eval_ms else 0.0
+
+    @property
+    def prompt_tokens_per_sec(self) -> float:
+        """Prompt evaluation speed as measured by the server."""
+        return self.prompt_eval_count / (self.prompt_eval_ms / 1000) if self.prompt_eval_ms else 0.0
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100); 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class MetricsRecorder:
+    """
+    Collects ResponseMetrics for one session and summarizes them.
+    """
+
+    def __init__(self):
+        self.records: List[ResponseMetrics] = []
+        self.recall_ms: List[float] = []  # memory retrieval time per message (embed + search)
+
+    def record(self, metrics: ResponseMetrics) -> None:
+        self.records.append(metrics)
+
+    def record_recall(self, ms: float) -> None:
+        self.recall_ms.append(ms)
+
+    def summary(self) -> Dict[str, Any]:
+        """Latency percentiles, token totals and mean speeds across the session."""
+        records = self.records
+        wall = [r.wall_ms for r in records]
+        ttft = [r.ttft_ms for r in records if r.ttft_ms is not None]
+        eval_ms = sum(r.eval_ms for r in records)
+        prompt_ms = sum(r.prompt_eval_ms for r in records)
+        eval_tokens = sum(r.eval_count for r in records)
+        prompt_tokens = sum(r.prompt_eval_count for r in records)
+        return {
+            "requests": len(records),
+            "latency_ms_p50": percentile(wall, 50),
+            "latency_ms_p95": percentile(wall, 95),
+            "ttft_ms_p50": percentile(ttft, 50),
+            "ttft_ms_p95": percentile(ttft, 95),
+            "prompt_tokens_total": prompt_tokens,
+            "eval_tokens_total": eval_tokens,
+            "prompt_eval_ms_total": prompt_ms,
+            "eval_ms_total": eval_ms,
+            "load_ms_total": sum(r.load_duration_ms for r in records),
+            "tokens_per_sec": eval_tokens / (eval_ms / 1000) if eval_ms else 0.0,
+            "prompt_tokens_per_sec": prompt_tokens / (prompt_ms / 1000) if prompt_ms else 0.0,
+            "recalls": len(self.recall_ms),
+            "recall_ms_p50": percentile(self.recall_ms, 50),
+            "recall_ms_p95": percentile(self.recall_ms, 95),
+        }
+
+    # ----------------------------------------------------------
+    # Export
+    # ----------------------------------------------------------
+    def export_json(self, path: str, endpoints: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Write the summary, every record and any endpoint snapshots as JSON; returns the resolved path."""
+        path = os.path.expanduser(path)
+        data = {"summary": self.summary(), "records": [asdict(r) for r in self.records]}
+        if endpoints is not None:
+            data["endpoints"] = endpoints
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        return path
+
+    def export_prometheus(self, path: str, labels: Optional[Dict[str, str]] = None, endpoints: Optional[List[Dict[str, Any]]] = None) -> str:
+        """
+        Write the summary in Prometheus text format (for node_exporter's textfile
+        collector). The file is replaced atomically so scrapes never see a partial write.
+        """
+        path = os.path.expanduser(path)
+        label_text = ",".join(f'{k}="{v}"' for k, v in sorted((labels or {}).items()))
+
+        def metric(name: str, value: float, extra: str = "") -> str:
+            all_labels = ",".join(part for part in (label_text, extra) if part)
+            return f"deltastrik_{name}{{{all_labels}}} {value}" if all_labels else f"deltastrik_{name} {value}"
+
+        s = self.summary()
+        lines = [
+            "# TYPE deltastrik_requests_total counter",
+            metric("requests_total", s["requests"]),
+            "# TYPE deltastrik_latency_ms summary",
+            metric("latency_ms", s["latency_ms_p50"], 'quantile="0.5"'),
+            metric("latency_ms", s["latency_ms_p95"], 'quantile="0.95"'),
+            "# TYPE deltastrik_ttft_ms summary",
+            metric("ttft_ms", s["ttft_ms_p50"], 'quantile="0.5"'),
+            metric("ttft_ms", s["ttft_ms_p95"], 'quantile="0.95"'),
+            "# TYPE deltastrik_prompt_tokens_total counter",
+            metric("prompt_tokens_total", s["prompt_tokens_total"]),
+            "# TYPE deltastrik_eval_tokens_total counter",
+            metric("eval_tokens_total", s["eval_tokens_total"]),
+            "# TYPE deltastrik_tokens_per_second gauge",
+            metric("tokens_per_second", round(s["tokens_per_sec"], 3)),
+            "# TYPE deltastrik_prompt_tokens_per_second gauge",
+            metric("prompt_tokens_per_second", round(s["prompt_tokens_per_sec"], 3)),
+        ]
+        if s["recalls"]:
+            lines.extend(
+                [
+                    "# TYPE deltastrik_recall_ms summary",
+                    metric("recall_ms", s["recall_ms_p50"], 'quantile="0.5"'),
+                    metric("recall_ms", s["recall_ms_p95"], 'quantile="0.95"'),
+                ]
+            )
+        if endpoints:
+            for name, key, kind in (
+                ("endpoint_healthy", "healthy", "gauge"),
+                ("endpoint_in_flight", "in_flight", "gauge"),
+                ("endpoint_requests_total", "requests", "counter"),
+                ("endpoint_errors_total", "errors", "counter"),
+            ):
+                lines.append(f"# TYPE deltastrik_{name} {kind}")
+                lines.extend(metric(name, int(e[key]), f'endpoint="{e["url"]}"') for e in endpoints)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        return path
@@ -1,98 +1,451 @@
-import requests
-from typing import List, Dict, Any, Optional
+import json
+import logging
+import time
+from typing import List, Dict, Any, Optional, Iterator, AsyncGenerator, Sequence, Tuple
 from urllib.parse import urljoin
-from deltastrik.utils.logging_utils import setup_logger
+from deltastrik.core.config import ConfigLike
+from deltastrik.core.transport import HttpTransport, AsyncHttpTransport
+from deltastrik.core.message import Message, MessageLike
+from deltastrik.core.router import EndpointRouter, can_fail_over, is_endpoint_failure
+from deltastrik.core.response_cache import ResponseCache, cache_key
+from deltastrik.utils.logging_utils import setup_logger, describe_payload, truncate
 
 logger = setup_logger("ollama_client")
 
 
 class OllamaClient:
-    def __init__(self, config: Dict[str, Any]):
-        self.base_url = config.get("ollama_url", "http://127.0.0.1:11434")
+    def __init__(
+        self,
+        config: ConfigLike,
+        transport: Optional[HttpTransport] = None,
+        async_transport: Optional[AsyncHttpTransport] = None,
+    ):
+        # Several Ollama hosts (``ollama_urls``) are spread by the router; ``base_url`` is the first
+        urls = config.get("ollama_urls") or [config.get("ollama_url", "http://127.0.0.1:11434")]
+        self.base_url = urls[0]
+        self.router = EndpointRouter(urls)
+        self.apply_config(config)
+        # Opt-in cache of deterministic (temperature 0) replies; ``response_cache_force`` caches any temperature
+        self.cache: Optional[ResponseCache] = None
+        if config.get("response_cache"):
+            self.cache = ResponseCache(
+                config.get("response_cache_path", "~/.deltastrik/cache.db"),
+                max_entries=config.get("response_cache_entries", 256),
+                max_bytes=int(config.get("response_cache_max_mb", 64) * 1024 * 1024),
+            )
+        # Transports are shared with the app so pooled connections outlive a single turn
+        self.transport = transport or HttpTransport()
+        self.async_transport = async_transport or AsyncHttpTransport()
+        # The system prompt rarely changes, so its encoded message is kept between requests
+        self._system_message: Optional[Message] = None
+
+    def apply_config(self, config: ConfigLike) -> None:
+        """(Re)read the per-request settings; called again when the config file is edited."""
+        # The endpoint list is fixed at startup, but how each endpoint is used can change
+        self.router.slots = config.get("endpoint_parallel", 4)
+        self.router.max_failures = config.get("endpoint_max_failures", 3)
+        self.router.probe_interval = config.get("endpoint_probe_interval", 10.0)
         self.model = config.get("model", "gpt-oss:latest")
         self.temperature = config.get("temperature", 0.7)
         self.max_tokens = config.get("max_tokens", 1024)
         self.stream = config.get("stream", False)
         self.timeout = config.get("timeout", 10)
+        self.num_ctx = config.get("context_tokens")
+        # How long Ollama keeps the model (and its KV cache) resident after a request
+        self.keep_alive = config.get("keep_alive")
+        self.cache_force = config.get("response_cache_force", False)
 
-    def query(self, prompt: str, user_message: str, history: Optional[List[Dict[str, str]]] = None) -> str:
-        messages = self._build_message_payload(prompt, user_message, history)
+    @property
+    def chat_url(self) -> str:
+        """Chat endpoint of the first configured host (requests themselves go through the router)."""
+        return urljoin(self.base_url, "api/chat")
 
-        payload = {
-            "model": self.model,
+    def _build_payload(self, messages: Sequence[MessageLike], stream: bool, model: Optional[str] = None) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"temperature": self.temperature, "num_predict": self.max_tokens}
+        if self.num_ctx:
+            # Match the server's context window to the budget the session selects against
+            options["num_ctx"] = self.num_ctx
+        payload: Dict[str, Any] = {
+            "model": model or self.model,
             "messages": messages,
-            "options": {"temperature": self.temperature, "num_predict": self.max_tokens},
-            "stream": self.stream,
+            "options": options,
+            "stream": stream,
         }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
 
-        try:
-            url_test = urljoin(self.base_url, "api/chat")
-            logger.debug(f"Hitting Ollama at: {url_test}")
-            logger.debug(f"Payload: {payload}")
+    # ----------------------------------------------------------
+    # Blocking API
+    # ----------------------------------------------------------
+    def query(self, prompt: str, user_message: str, history: Optional[Sequence[MessageLike]] = None, runtime_context: Optional[str] = None) -> str:
+        messages = self._build_message_payload(prompt, user_message, history, runtime_context)
+        return self._chat(messages)
 
-            response = requests.post(url=url_test, json=payload, timeout=self.timeout)
-            logger.info(f"Ollama response status: {response.status_code}")
-            logger.debug(f"Ollama raw response: {response.text}")
+    def compress_generate(self, system_prompt: str, summary_prompt: str) -> str:
+        """This generates a context short summary of the Ollama"""
+        messages = self._build_message_payload(system_prompt, summary_prompt, history=None)
+        return self._chat(messages)
 
-            response.raise_for_status()
-            data = response.json()
+    def _chat(self, messages: Sequence[MessageLike]) -> str:
+        payload = self._build_payload(messages, stream=False)
+        key = self._cache_key(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._extract_reply(cached)
+        error: Optional[Exception] = None
+        for endpoint in self.router.attempts(self.model):
+            start = time.perf_counter()
+            failed = False
+            try:
+                url = endpoint.api_url("api/chat")
+                self._log_request(payload, url)
+                data = self.transport.post_json(url, payload, timeout=self.timeout)
+            except Exception as e:
+                error = e
+                failed = is_endpoint_failure(e)
+                if can_fail_over(e):
+                    logger.warning("Failing over from %s: %r", endpoint.url, e)
+                    continue
+                break
+            finally:
+                # Also on cancellation, or the endpoint's in-flight count leaks
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000, failed)
+            self._cache_put(key, data)
             return self._extract_reply(data)
 
-        except Exception as e:
-            logger.exception("Error contacting Ollama backend")
-            return f"[Error contacting Ollama backend: {e}]"
+        logger.error("Error contacting Ollama backend", exc_info=error)
+        return f"[Error contacting Ollama backend: {error}]"
+
+    def stream_query(
+        self, prompt: str, user_message: str, history: Optional[Sequence[MessageLike]] = None, runtime_context: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a chat reply from /api/chat as parsed NDJSON chunks.
+        Each chunk carries a partial ``message.content``; the last one has ``done`` set
+        and the server-side stats. Errors are yielded as a final chunk so callers can
+        render them like any other reply.
+        """
+        messages = self._build_message_payload(prompt, user_message, history, runtime_context)
+        payload = self._build_payload(messages, stream=True)
+        key = self._cache_key(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            for chunk in self._replay(cached):
+                yield chunk
+            return
+        error: Optional[Exception] = None
+
+        for endpoint in self.router.attempts(self.model):
+            start = time.perf_counter()
+            failed = started = False
+            parts: List[str] = []
+            try:
+                url = endpoint.api_url("api/chat")
+                self._log_request(payload, url)
+                for line in self.transport.stream_lines(url, payload, timeout=self.timeout):
+                    started = True
+                    chunk = self._parse_chunk(line)
+                    parts.append(self.chunk_text(chunk))
+                    if chunk.get("done"):
+                        self._cache_put(key, chunk, "".join(parts))
+                    yield chunk
+                    if chunk.get("done"):
+                        return
+                return
+
+            except Exception as e:
+                error = e
+                failed = is_endpoint_failure(e)
+                if not started and can_fail_over(e):
+                    logger.warning("Failing over from %s: %r", endpoint.url, e)
+                    continue
+                break
+            finally:
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000, failed)
+
+        logger.error("Error streaming from Ollama backend", exc_info=error)
+        yield self._error_chunk(error)
+
+    # ----------------------------------------------------------
+    # Async API (runs on the caller's event loop, no worker threads)
+    # ----------------------------------------------------------
+    async def aquery(self, prompt: str, user_message: str, history: Optional[Sequence[MessageLike]] = None, runtime_context: Optional[str] = None) -> str:
+        reply, _ = await self.aquery_response(prompt, user_message, history, runtime_context)
+        return reply
+
+    async def aquery_response(
+        self, prompt: str, user_message: str, history: Optional[Sequence[MessageLike]] = None, runtime_context: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Like aquery, but also returns the raw response body so callers can read the
+        server-side stats (durations, prompt_eval_count, eval_count). The body is
+        empty when the request itself failed.
+        """
+        messages = self._build_message_payload(prompt, user_message, history, runtime_context)
+        return await self._achat_response(messages)
+
+    async def acompress_generate(self, system_prompt: str, summary_prompt: str) -> str:
+        """Async variant of compress_generate."""
+        messages = self._build_message_payload(system_prompt, summary_prompt, history=None)
+        return await self._achat(messages)
+
+    async def _achat(self, messages: Sequence[MessageLike]) -> str:
+        reply, _ = await self._achat_response(messages)
+        return reply
+
+    async def _achat_response(self, messages: Sequence[MessageLike]) -> Tuple[str, Dict[str, Any]]:
+        payload = self._build_payload(messages, stream=False)
+        key = self._cache_key(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return self._extract_reply(cached), cached
+        self.router.ensure_probing()
+        error: Optional[Exception] = None
+        for endpoint in self.router.attempts(self.model):
+            start = time.perf_counter()
+            failed = False
+            try:
+                url = endpoint.api_url("api/chat")
+                self._log_request(payload, url)
+                data = await self.async_transport.post_json(url, payload, timeout=self.timeout)
+            except Exception as e:
+                error = e
+                failed = is_endpoint_failure(e)
+                if can_fail_over(e):
+                    logger.warning("Failing over from %s: %r", endpoint.url, e)
+                    continue
+                break
+            finally:
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000, failed)
+            self._cache_put(key, data)
+            return self._extract_reply(data), data
+
+        logger.error("Error contacting Ollama backend", exc_info=error)
+        return f"[Error contacting Ollama backend: {error}]", {}
+
+    async def astream_query(
+        self,
+        prompt: str,
+        user_message: str,
+        history: Optional[Sequence[MessageLike]] = None,
+        runtime_context: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Async variant of stream_query, reading chunks straight off the event loop.
+        ``model`` overrides the configured model for this one request.
+        """
+        model = model or self.model
+        messages = self._build_message_payload(prompt, user_message, history, runtime_context)
+        payload = self._build_payload(messages, stream=True, model=model)
+        key = self._cache_key(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            for chunk in self._replay(cached):
+                yield chunk
+            return
+        self.router.ensure_probing()
+        error: Optional[Exception] = None
+
+        for endpoint in self.router.attempts(model):
+            start = time.perf_counter()
+            failed = started = False
+            parts: List[str] = []
+            try:
+                url = endpoint.api_url("api/chat")
+                self._log_request(payload, url)
+                async for line in self.async_transport.stream_lines(url, payload, timeout=self.timeout):
+                    started = True
+                    chunk = self._parse_chunk(line)
+                    parts.append(self.chunk_text(chunk))
+                    if chunk.get("done"):
+                        self._cache_put(key, chunk, "".join(parts))
+                    yield chunk
+                    if chunk.get("done"):
+                        return
+                return
+
+            except Exception as e:
+                error = e
+                failed = is_endpoint_failure(e)
+                # Only before the first chunk: a half-streamed reply can't be resumed elsewhere
+                if not started and can_fail_over(e):
+                    logger.warning("Failing over from %s: %r", endpoint.url, e)
+                    continue
+                break
+            finally:
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000, failed)
+
+        logger.error("Error streaming from Ollama backend", exc_info=error)
+        yield self._error_chunk(error)
+
+    async def aprefill(self, prompt: str, user_message: str, history: Optional[Sequence[MessageLike]] = None, runtime_context: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Have Ollama evaluate a prompt without really answering it, so its KV cache
+        already holds the prefix when the real request for it arrives. Returns the
+        response body ({} on failure: a prefill is only ever an optimization).
+        """
+        messages = self._build_message_payload(prompt, user_message, history, runtime_context)
+        # Same options as the real request (a different num_ctx would reload the model), except
+        # num_predict: Ollama only enforces it when positive, so 0 would mean "no limit"
+        payload = self._build_payload(messages, stream=False)
+        payload["options"]["num_predict"] = 1
+        self.router.ensure_probing()
+        for endpoint in self.router.attempts(self.model):
+            start = time.perf_counter()
+            try:
+                url = endpoint.api_url("api/chat")
+                self._log_request(payload, url)
+                data = await self.async_transport.post_json(url, payload, timeout=self.timeout)
+            except Exception as e:
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000, is_endpoint_failure(e))
+                logger.debug("Prefill on %s failed: %r", endpoint.url, e)
+                return {}
+            except BaseException:
+                # Cancelled because the real message was sent
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000)
+                raise
+            self.router.release(endpoint, (time.perf_counter() - start) * 1000)
+            logger.info("Prefilled %s prompt tokens in %.0f ms", data.get("prompt_eval_count"), (time.perf_counter() - start) * 1000)
+            return data
+        return {}
+
+    async def aembed(self, texts: List[str], model: str) -> List[List[float]]:
+        """
+        Embed ``texts`` with ``model`` through /api/embed, one vector per text.
+        Unlike chat replies, failures raise: callers fall back to sending history.
+        """
+        payload: Dict[str, Any] = {"model": model, "input": texts}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        self.router.ensure_probing()
+        error: Optional[Exception] = None
+        for endpoint in self.router.attempts(model):
+            start = time.perf_counter()
+            failed = False
+            try:
+                data = await self.async_transport.post_json(endpoint.api_url("api/embed"), payload, timeout=self.timeout)
+            except Exception as e:
+                error = e
+                failed = is_endpoint_failure(e)
+                if can_fail_over(e):
+                    logger.warning("Failing over from %s: %r", endpoint.url, e)
+                    continue
+                break
+            finally:
+                self.router.release(endpoint, (time.perf_counter() - start) * 1000, failed)
+            if "error" in data:
+                raise RuntimeError(f"Ollama Error: {data['error']}")
+            embeddings = data.get("embeddings") or []
+            if len(embeddings) != len(texts):
+                raise RuntimeError(f"expected {len(texts)} embeddings, got {len(embeddings)}")
+            return embeddings
+        raise RuntimeError(f"Error contacting Ollama backend: {error}")
+
+    # ----------------------------------------------------------
+    # Helpers
+    # ----------------------------------------------------------
+    def _log_request(self, payload: Dict[str, Any], url: str) -> None:
+        # Only summarize (hash + sizes) the payload, and only when DEBUG is actually on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Hitting Ollama at %s: %s", url, describe_payload(payload))
+
+    @staticmethod
+    def chunk_text(chunk: Dict[str, Any]) -> str:
+        """Return the content fragment carried by a streamed chunk."""
+        return chunk.get("message", {}).get("content", "")
 
-    def _build_message_payload(self, prompt, user_message, history):
-        messages = []
+    @staticmethod
+    def is_error_reply(text: str) -> bool:
+        """True if ``text`` is one of the bracketed error strings this client returns."""
+        return text.startswith(("[Error contacting Ollama backend", "[Ollama Error", "[No response received"))
+
+    # ----------------------------------------------------------
+    # Response cache
+    # ----------------------------------------------------------
+    def _cache_key(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Cache key for ``payload``, or None when the cache is off or the reply isn't deterministic."""
+        if self.cache is None:
+            return None
+        if payload["options"].get("temperature") != 0 and not self.cache_force:
+            return None
+        return cache_key(payload)
+
+    def _cache_get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The cached reply body marked ``cache: hit``, or None (a lookup miss is counted)."""
+        if key is None or self.cache is None:
+            return None
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        logger.debug("Response cache hit %s", key[:12])
+        return {**cached, "done": True, "cache": "hit"}
+
+    def _cache_put(self, key: Optional[str], data: Dict[str, Any], content: Optional[str] = None) -> None:
+        """
+        Store a successful reply (``content`` overrides ``data``'s message, for
+        streams) and mark ``data`` as a cache miss so the UI can show it.
+        """
+        if key is None or self.cache is None or "error" in data:
+            return
+        if content is None:
+            content = data.get("message", {}).get("content")
+            if content is None:
+                return
+        data["cache"] = "miss"
+        # Only what a replay needs: the server timings of the original run would be misleading
+        self.cache.put(key, {"model": data.get("model", self.model), "message": {"role": "assistant", "content": content}})
+
+    @staticmethod
+    def _replay(cached: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Stream-shaped chunks for a cached reply: the whole text, then the final chunk."""
+        return [{"message": cached["message"], "done": False}, {**cached, "message": {"role": "assistant", "content": ""}}]
+
+    @staticmethod
+    def _parse_chunk(line: bytes) -> Dict[str, Any]:
+        chunk = json.loads(line)
+        if "error" in chunk:
+            return {"message": {"content": f"[Ollama Error: {chunk['error']}]"}, "done": True, "error": chunk["error"]}
+        if chunk.get("done"):
+            logger.info(
+                "prompt_eval_count=%s prompt_eval_duration=%s eval_count=%s eval_duration=%s",
+                chunk.get("prompt_eval_count"),
+                chunk.get("prompt_eval_duration"),
+                chunk.get("eval_count"),
+                chunk.get("eval_duration"),
+            )
+        return chunk
+
+    @staticmethod
+    def _error_chunk(error: Optional[Exception]) -> Dict[str, Any]:
+        return {"message": {"content": f"[Error contacting Ollama backend: {error}]"}, "done": True, "error": str(error)}
+
+    def _build_message_payload(
+        self, prompt: str, user_message: str, history: Optional[Sequence[MessageLike]], runtime_context: Optional[str] = None
+    ) -> List[MessageLike]:
+        # History entries are sent as they are: Messages carry their JSON pre-encoded
+        messages: List[MessageLike] = []
         if prompt:
-            messages.append({"role": "system", "content": prompt})
+            if self._system_message is None or self._system_message.content != prompt:
+                self._system_message = Message("system", prompt)
+            messages.append(self._system_message)
         if history:
             messages.extend(history)
-        messages.append({"role": "user", "content": user_message})
+        if runtime_context:
+            # Volatile context goes last so the system prompt + history prefix stays cacheable
+            messages.append(Message("system", runtime_context))
+        messages.append(Message("user", user_message))
         return messages
 
     def _extract_reply(self, data: Dict[str, Any]) -> str:
         if "message" in data and "content" in data["message"]:
             content = data["message"]["content"]
-            logger.debug(f"Extracted assistant reply: {content}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Extracted assistant reply: %s", truncate(content))
             return content
         elif "error" in data:
             return f"[Ollama Error: {data['error']}]"
         else:
-            logger.warning(f"Unexpected Ollama response: {data}")
+            logger.warning("Unexpected Ollama response: %s", truncate(repr(data)))
             return "[No response received from Ollama]"
-
-    def compress_generate(self, system_prompt: str, summary_prompt: str) -> str:
-        """This generates a context short summary of the Ollama"""
-        messages = self._build_message_payload(system_prompt, summary_prompt, history=None)
-
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "options": {"temperature": self.temperature, "num_predict": self.max_tokens},
-            "stream": self.stream,
-        }
-
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "options": {"temperature": self.temperature, "num_predict": self.max_tokens},
-            "stream": self.stream,
-        }
-
-        try:
-            url_test = urljoin(self.base_url, "api/chat")
-            logger.debug(f"Hitting Ollama at: {url_test}")
-            logger.debug(f"Payload: {payload}")
-
-            response = requests.post(url=url_test, json=payload, timeout=self.timeout)
-            logger.info(f"Ollama response status: {response.status_code}")
-            logger.debug(f"Ollama raw response: {response.text}")
-
-            response.raise_for_status()
-            data = response.json()
-            return self._extract_reply(data)
-
-        except Exception as e:
-            logger.exception("Error contacting Ollama backend")
-            return f"[Error contacting Ollama backend: {e}]"
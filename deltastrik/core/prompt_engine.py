@@ -2,16 +2,21 @@
 """
 Prompt engine for building Claude-like system instructions for DeltaStrik.
 Handles persona templates, runtime context injection, and optional user overrides.
+
+Two layouts are supported (config key ``prompt_layout``):
+- ``stable`` (default): the system prompt holds only the persona and other
+  fields that don't change between turns, so it stays byte-identical and Ollama
+  can reuse its KV cache for the prefix. Volatile context (the current time) is
+  sent separately by ``build_runtime_context`` at the end of the message list.
+- ``classic``: the original layout with the timestamp embedded in the system prompt.
 """
 
 import os
-import yaml
-from datetime import datetime
-from typing import Dict, Any, Optional
-from deltastrik.core.config import load_config
-
+import re
+from datetime import datetime, timezone
+from typing import Any, Optional, Tuple
 
-model: str = load_config().get("model")
+from deltastrik.core.config import ConfigLike, file_stamp, read_yaml
 
 
 DEFAULT_PERSONA = """
@@ -23,29 +28,70 @@ Your responses should be:
 Avoid unnecessary filler phrases. Always stay focused on the user’s question.
 """
 
+# Start of the message built by build_runtime_context
+RUNTIME_CONTEXT_PREFIX = "[Context: Current time is "
+# The timestamp a classic-layout system prompt ends its context line with
+CLASSIC_TIMESTAMP_RE = re.compile(r" at \d{4}-\d{2}-\d{2} \d{2}:\d{2} UTC\]")
+
+
+def _persona_path(config: ConfigLike) -> str:
+    return os.path.expanduser(config.get("persona_file", "~/.deltastrik/system_prompt.yaml"))
+
+
+def _load_persona(config: ConfigLike) -> str:
+    """Return the persona text from the YAML override, or the default persona."""
+    # Step 1: locate the persona YAML (if provided)
+    persona_path = _persona_path(config)
+
+    # Step 2: load YAML if it exists, else use default; read_yaml only re-parses an edited file
+    persona_text = DEFAULT_PERSONA
+    try:
+        data = read_yaml(persona_path)
+        if data is not None:
+            persona_text = data.get("prompt", DEFAULT_PERSONA)
+    except Exception as e:
+        persona_text = DEFAULT_PERSONA + f"\n(Note: Failed to load YAML: {e})"
+    return persona_text
+
+
+def system_prompt_inputs(config: ConfigLike) -> Tuple[Any, ...]:
+    """
+    Everything ``build_system_prompt`` depends on apart from the clock; the
+    prompt only needs rebuilding when this changes.
+    """
+    path = _persona_path(config)
+    return path, file_stamp(path), config.get("model", "gpt-oss:latest"), config.get("prompt_layout", "stable")
+
 
-def build_system_prompt(config: Optional[Dict[str, Any]] = None) -> str:
+def build_system_prompt(config: Optional[ConfigLike] = None, model: Optional[str] = None) -> str:
     """
     Build the system prompt using defaults + any YAML persona overrides.
+    ``model`` overrides the configured model the prompt names.
     """
     config = config or {}
+    persona_text = _load_persona(config)
+    model = model or config.get("model", "gpt-oss:latest")
 
-    # Step 1: locate the persona YAML (if provided)
-    persona_path = config.get("persona_file", os.path.expanduser("~/.deltastrik/system_prompt.yaml"))
-
-    # Step 2: load YAML if it exists, else use default
-    persona_text = DEFAULT_PERSONA
-    if os.path.exists(persona_path):
-        try:
-            with open(persona_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-                persona_text = data.get("prompt", DEFAULT_PERSONA)
-        except Exception as e:
-            persona_text = DEFAULT_PERSONA + f"\n(Note: Failed to load YAML: {e})"
+    if config.get("prompt_layout", "stable") == "stable":
+        # Nothing time-dependent here: an identical prefix lets Ollama reuse its KV cache
+        return f"{persona_text.strip()}\n\n[Context: Running on model '{model}']\n"
 
     # Step 3: add runtime context (optional but nice)
-    date_info = datetime.utcnow().strftime("%Y-%m-%d %H:%M UTC")
+    date_info = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
 
     system_prompt = f"{persona_text.strip()}\n\n" f"[Context: Running on model '{model}' at {date_info}]\n"
 
     return system_prompt
+
+
+def build_runtime_context(config: Optional[ConfigLike] = None) -> Optional[str]:
+    """
+    Volatile per-turn context, sent after the history so it never invalidates
+    the cached prefix. Returns None for the classic layout, which embeds it in
+    the system prompt instead.
+    """
+    config = config or {}
+    if config.get("prompt_layout", "stable") != "stable":
+        return None
+    date_info = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+    return f"{RUNTIME_CONTEXT_PREFIX}{date_info}]"
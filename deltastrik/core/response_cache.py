@@ -0,0 +1,163 @@
+# deltastrik/core/response_cache.py
+"""
+Deterministic response cache for DeltaStrik.
+Identical requests (same model, messages and options) at temperature 0 produce
+the same output, so their replies can be served without touching the GPU.
+
+The key is a SHA-256 of the canonicalized request payload, minus fields that
+don't affect the output (``stream``, ``keep_alive``) and the current time the
+prompt engine adds to each request, so a repeated request still hits after the
+clock has moved on. Two tiers:
+- an in-memory LRU of recent replies,
+- a size-bounded SQLite file that evicts least-recently-used entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from deltastrik.core.message import Message, MessageLike
+from deltastrik.core.prompt_engine import CLASSIC_TIMESTAMP_RE, RUNTIME_CONTEXT_PREFIX
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("response_cache")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used);
+"""
+
+# Payload fields that change how a reply is delivered, not what it says
+IGNORED_FIELDS = ("stream", "keep_alive")
+
+
+def _timeless(messages: Sequence[MessageLike]) -> List[MessageLike]:
+    """``messages`` without the runtime-context message, and with the classic layout's timestamp cut from system prompts."""
+    kept: List[MessageLike] = []
+    for message in messages:
+        if message.get("role") == "system":
+            content = message.get("content") or ""
+            if content.startswith(RUNTIME_CONTEXT_PREFIX):
+                continue
+            if CLASSIC_TIMESTAMP_RE.search(content):
+                message = {"role": "system", "content": CLASSIC_TIMESTAMP_RE.sub("]", content)}
+        kept.append(message)
+    return kept
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """Hash of the canonical JSON form of ``payload`` (sorted keys, no whitespace), ignoring the current time."""
+    canonical = {k: v for k, v in payload.items() if k not in IGNORED_FIELDS}
+    if "messages" in canonical:
+        canonical["messages"] = _timeless(canonical["messages"])
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=Message.to_dict)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache of reply bodies (``{"model", "message"}``). Safe to share
+    between the event loop and worker threads.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_bytes = 0
+        if path:
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._remember(key, value)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remember(key, value)
+            if self._db is None:
+                return
+            data = json.dumps(value, ensure_ascii=False)
+            size = len(data.encode("utf-8"))
+            if size > self.max_bytes:
+                return
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, data, size, time.time()))
+            self._disk_bytes += size - (old[0] if old else 0)
+            if self._disk_bytes > self.max_bytes:
+                self._evict(self._db)
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        """Drop least-recently-used disk entries until the file is back under 90% of its budget."""
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        rows = db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        db.execute("BEGIN")
+        for key, size in rows:
+            if self._disk_bytes <= target:
+                break
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._disk_bytes -= size
+            evicted += 1
+        db.execute("COMMIT")
+        logger.debug("Evicted %d cached responses (%d bytes left)", evicted, self._disk_bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._disk_bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
@@ -0,0 +1,239 @@
+# deltastrik/core/router.py
+"""
+Endpoint routing for DeltaStrik.
+Spreads requests over several Ollama hosts: each request goes to the
+least-loaded healthy endpoint, preferring one that already has the model
+loaded (as reported by ``/api/ps``). Endpoints that keep failing are ejected
+and re-probed in the background until they answer again.
+"""
+
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Collection, Dict, Iterator, List, Optional, Set
+from urllib.parse import urljoin
+
+from deltastrik.core.transport import AsyncHttpTransport, TransportError
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("router")
+
+
+@dataclass(eq=False)
+class Endpoint:
+    """One Ollama host and what the router knows about it (compared by identity)."""
+
+    url: str
+    in_flight: int = 0
+    latency_ms: Optional[float] = None  # rolling (EWMA) request latency
+    healthy: bool = True
+    failures: int = 0  # consecutive failed requests or probes
+    ejected_at: Optional[float] = None
+    models: Set[str] = field(default_factory=set)  # models resident per the last /api/ps
+    requests: int = 0
+    errors: int = 0
+
+    def api_url(self, path: str) -> str:
+        return urljoin(self.url, path)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict view for /stats and exports."""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "models": sorted(self.models),
+        }
+
+
+def can_fail_over(error: BaseException) -> bool:
+    """True if the request never reached a working server (refused or reset), so another endpoint can take it."""
+    if isinstance(error, ConnectionError):
+        return True
+    requests = sys.modules.get("requests")
+    if requests is None or not isinstance(error, requests.ConnectionError):
+        return False
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    # Only while connecting (urllib3 gave up opening the socket): "Connection aborted" comes after the request was sent
+    from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """
+    True if ``error`` says the endpoint itself is unwell (unreachable, timing
+    out, 5xx). A 4xx such as an unknown model is the request's fault, and so is
+    anything else (a malformed reply, a bug in the caller).
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if isinstance(error, TransportError):
+        return error.status >= 500
+    # requests is only imported once HttpTransport is used; until then the error can't be one of its own
+    requests = sys.modules.get("requests")
+    if requests is None or not isinstance(error, requests.RequestException):
+        return False
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    status = getattr(error.response, "status_code", None)  # requests.HTTPError
+    return status is not None and status >= 500
+
+
+class EndpointRouter:
+    """
+    Picks an endpoint per request and tracks in-flight counts, rolling latency
+    and health. ``acquire``/``release`` are plain (non-async) calls so blocking
+    and async callers share the same bookkeeping.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        slots: int = 4,
+        max_failures: int = 3,
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        smoothing: float = 0.3,
+    ):
+        if not urls:
+            raise ValueError("EndpointRouter needs at least one endpoint URL")
+        # A trailing slash keeps urljoin from replacing the last path segment
+        self.endpoints = [Endpoint(url.rstrip("/") + "/") for url in urls]
+        self.slots = slots  # parallel requests one endpoint serves (OLLAMA_NUM_PARALLEL)
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.smoothing = smoothing
+        # Separate single-connection pool, so probes never queue behind long generations
+        self._probe_transport: Optional[AsyncHttpTransport] = None
+        self._probe_task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def multi(self) -> bool:
+        return len(self.endpoints) > 1
+
+    # ----------------------------------------------------------
+    # Dispatch
+    # ----------------------------------------------------------
+    def choose(self, model: str, exclude: Collection[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Least-loaded healthy endpoint. Endpoints that already have ``model`` loaded
+        win while they have a free slot (loading a model elsewhere costs seconds);
+        once they are all busy the request spills over to the least-loaded one.
+        """
+        available = [e for e in self.endpoints if e not in exclude]
+        if not available:
+            return None
+        candidates = [e for e in available if e.healthy] or self._cooled_down(available)
+        warm = [e for e in candidates if model in e.models and e.in_flight < self.slots]
+        return min(warm or candidates, key=lambda e: (e.in_flight, e.latency_ms if e.latency_ms is not None else 0.0))
+
+    @staticmethod
+    def _cooled_down(endpoints: List[Endpoint]) -> List[Endpoint]:
+        """
+        Everything is ejected: rather than fail outright, retry the endpoint
+        ejected longest ago (the failure that ejected it may have been transient).
+        """
+        return sorted(endpoints, key=lambda e: e.ejected_at or 0.0)[:1]
+
+    def acquire(self, model: str, exclude: Collection[Endpoint] = ()) -> Optional[Endpoint]:
+        """Pick an endpoint for one request and count it as in flight (None if all are excluded)."""
+        endpoint = self.choose(model, exclude)
+        if endpoint is None:
+            return None
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        if self.multi:
+            logger.info(
+                "Routing %s to %s (in_flight=%d, latency=%s ms, model_loaded=%s)",
+                model,
+                endpoint.url,
+                endpoint.in_flight,
+                f"{endpoint.latency_ms:.0f}" if endpoint.latency_ms is not None else "-",
+                model in endpoint.models,
+            )
+        return endpoint
+
+    def attempts(self, model: str) -> Iterator[Endpoint]:
+        """
+        Acquire endpoints for one request: the best one first, then (if the caller
+        asks for another after a connection failure) each remaining one in turn.
+        The caller releases every endpoint it receives.
+        """
+        tried: List[Endpoint] = []
+        while True:
+            endpoint = self.acquire(model, exclude=tried)
+            if endpoint is None:
+                return
+            tried.append(endpoint)
+            yield endpoint
+
+    def release(self, endpoint: Endpoint, latency_ms: float, failed: bool = False) -> None:
+        endpoint.in_flight -= 1
+        if failed:
+            endpoint.errors += 1
+            self._record_failure(endpoint, "request failed")
+            return
+        endpoint.failures = 0
+        if endpoint.latency_ms is None:
+            endpoint.latency_ms = latency_ms
+        else:
+            endpoint.latency_ms += self.smoothing * (latency_ms - endpoint.latency_ms)
+
+    def _record_failure(self, endpoint: Endpoint, reason: str) -> None:
+        endpoint.failures += 1
+        if endpoint.healthy and self.multi and endpoint.failures >= self.max_failures:
+            endpoint.healthy = False
+            endpoint.ejected_at = time.monotonic()
+            logger.warning("Ejecting %s after %d consecutive failures (%s)", endpoint.url, endpoint.failures, reason)
+
+    # ----------------------------------------------------------
+    # Health checks
+    # ----------------------------------------------------------
+    async def probe(self, endpoint: Endpoint) -> bool:
+        """Query ``/api/ps``: refreshes loaded models and restores an ejected endpoint."""
+        if self._probe_transport is None:
+            self._probe_transport = AsyncHttpTransport(max_connections=1)
+        try:
+            data = await self._probe_transport.get_json(endpoint.api_url("api/ps"), timeout=self.probe_timeout)
+        except Exception as e:
+            self._record_failure(endpoint, f"probe: {e!r}")
+            return False
+        endpoint.models = {m.get("model") or m.get("name", "") for m in data.get("models", [])}
+        endpoint.failures = 0
+        if not endpoint.healthy:
+            endpoint.healthy = True
+            endpoint.ejected_at = None
+            logger.info("Restored %s after a successful probe", endpoint.url)
+        return True
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(e) for e in self.endpoints))
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.probe_interval)
+
+    def ensure_probing(self) -> None:
+        """Start background probing on the running event loop (only needed with several endpoints)."""
+        if self.multi and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    async def aclose(self) -> None:
+        """Stop background probing and close the probe connections."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        if self._probe_transport is not None:
+            await self._probe_transport.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [e.snapshot() for e in self.endpoints]
@@ -0,0 +1,121 @@
+# deltastrik/core/scheduler.py
+"""
+Request scheduling for DeltaStrik.
+Several sessions (TUI tabs) share the same Ollama backends. Each backend only
+runs ``endpoint_parallel`` requests at once (its ``OLLAMA_NUM_PARALLEL``);
+anything beyond that would queue inside Ollama, invisible and unordered.
+
+The scheduler admits at most that many requests per healthy backend and holds
+the rest in a fair queue: owners take turns, so one session with several
+requests waiting can't starve another.
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Hashable, List, Optional
+
+from deltastrik.core.router import EndpointRouter
+
+
+class RequestScheduler:
+    """
+    Admission control in front of an EndpointRouter. Capacity follows the router:
+    ``slots`` requests per healthy endpoint, so ejected hosts shrink it.
+    """
+
+    def __init__(self, router: EndpointRouter):
+        self.router = router
+        self.active = 0
+        # owner -> its waiting requests; the first owner is served next (round-robin)
+        self._queues: "OrderedDict[Hashable, Deque[asyncio.Future[None]]]" = OrderedDict()
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def capacity(self) -> int:
+        healthy = sum(1 for e in self.router.endpoints if e.healthy) or 1
+        return healthy * self.router.slots
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` whenever requests are admitted, finish or join the queue."""
+        self._listeners.append(callback)
+
+    def position(self, owner: Hashable) -> Optional[int]:
+        """
+        1-based place in line of ``owner``'s next waiting request, or None if it
+        has nothing waiting. Owners take turns, so that is its place among owners.
+        """
+        for i, queued in enumerate(self._queues):
+            if queued == owner:
+                return i + 1
+        return None
+
+    @asynccontextmanager
+    async def slot(self, owner: Hashable) -> AsyncIterator[None]:
+        """Hold one request slot for the duration of the block."""
+        await self.acquire(owner)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, owner: Hashable) -> None:
+        if self.active < self.capacity and not self._queues:
+            self.active += 1
+            self._notify()
+            return
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(owner, deque()).append(future)
+        self._notify()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter was cancelled: pass the slot on
+                self.release()
+            else:
+                self._discard(owner, future)
+                self._notify()
+            raise
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now; for optional work that must never queue."""
+        if self.active < self.capacity and not self._queues:
+            self.active += 1
+            self._notify()
+            return True
+        return False
+
+    def release(self) -> None:
+        self.active -= 1
+        self._grant()
+        self._notify()
+
+    def _grant(self) -> None:
+        while self.active < self.capacity and self._queues:
+            owner, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            if queue:
+                self._queues.move_to_end(owner)  # its next request waits for everyone else's turn
+            else:
+                del self._queues[owner]
+            if future.done():
+                continue
+            future.set_result(None)
+            self.active += 1
+
+    def _discard(self, owner: Hashable, future: "asyncio.Future[None]") -> None:
+        queue = self._queues.get(owner)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        if not queue:
+            del self._queues[owner]
+
+    def _notify(self) -> None:
+        for callback in self._listeners:
+            callback()
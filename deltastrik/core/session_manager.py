@@ -5,10 +5,31 @@ Provides an interface for storing, retrieving, and serializing
 conversation context between the user and the LLM (Ollama backend).
 """
 
-from typing import List, Dict, Any
+from typing import Collection, List, Dict, Any, Optional
+import asyncio
 import datetime
+import os
+import time
+import uuid
 from deltastrik.core.prompt_engine import build_system_prompt
 from deltastrik.core.ollama_client import OllamaClient
+from deltastrik.core.context_window import ContextWindow
+from deltastrik.core.message import Message
+from deltastrik.core.metrics import MetricsRecorder, ResponseMetrics
+from deltastrik.core.session_store import SessionStore
+from deltastrik.core.memory import RECALL_HEADER, MemoryIndex, memory_path, turn_text
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("session_manager")
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+# Settings the open memory index depends on (session_db only changes with a restart)
+MEMORY_SETTINGS = ("memory", "memory_dir", "memory_model")
+
+
+def _epoch_seconds(created_at: str) -> float:
+    return datetime.datetime.fromisoformat(created_at).timestamp()
 
 
 class SessionManager:
@@ -16,31 +37,187 @@ class SessionManager:
     Maintains conversation history and context.
     """
 
-    def __init__(self, config):
-        # Chat history follows the typical OpenAI/Ollama format:
+    def __init__(self, config, client: Optional[OllamaClient] = None, store: Optional[SessionStore] = None):
+        # Chat history follows the typical OpenAI/Ollama format, as Messages that read like
         # [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]
         self.config = config
-        self.history: List[Dict[str, str]] = []
+        # Reuse the app's client (and its pooled connections) when one is provided
+        self.client = client
+        self.history: List[Message] = []
+        self.context = ContextWindow(budget=self._budget(config))
+        self._last_prompt_raw = 0
+        # Rolling compaction: a running summary replaces the oldest messages
+        self.auto_compact_tokens: int = config.get("auto_compact_tokens") or int(self.context.budget * 0.75)
+        self.summary = ""
+        self._compacting = False
+        self._epoch = 0  # bumped whenever history is replaced wholesale
         self.created_at: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+        # Persistence: every message is appended to the store as it is added
+        self.store = store
+        self.session_id = uuid.uuid4().hex[:12]
+        self.name: Optional[str] = None
+        self._seq = 0  # sequence number of the last persisted message
+        self.oldest_loaded_seq = 1  # older messages stay on disk until paged in
+        # Per-session response timings for /stats
+        self.metrics = MetricsRecorder()
+        # Long-term memory (opt-in): embedded turns, recalled by similarity to each new message
+        self.memory: Optional[MemoryIndex] = None
+        self._open_memory()
+
+    @staticmethod
+    def _budget(config) -> int:
+        # Prompt budget = model context minus the tokens reserved for the reply
+        return config.get("context_tokens", 8192) - config.get("max_tokens", 1024)
+
+    def apply_config(self, config, changed: Collection[str] = ()) -> None:
+        """
+        Pick up edited context settings; the next turn selects against the new
+        budget. Memory is reopened only if one of ``changed`` affects it.
+        """
+        self.config = config
+        self.context.budget = self._budget(config)
+        self.auto_compact_tokens = config.get("auto_compact_tokens") or int(self.context.budget * 0.75)
+        if any(key in changed for key in MEMORY_SETTINGS):
+            self._open_memory()
 
     # ----------------------------------------------------------
     # Message management
     # ----------------------------------------------------------
     def add_user_message(self, message: str):
         """Append a user message to the session."""
-        self.history.append({"role": "user", "content": message})
+        self._append("user", message)
 
     def add_assistant_message(self, message: str):
         """Append an assistant (model) message to the session."""
-        self.history.append({"role": "assistant", "content": message})
+        self._append("assistant", message)
+
+    def _append(self, role: str, message: str):
+        entry = Message(role, message)
+        entry.tokens = self.context.append(message)
+        self.history.append(entry)
+        if self.store is not None:
+            now = datetime.datetime.fromtimestamp(entry.timestamp, datetime.timezone.utc).isoformat()
+            if self._seq == 0:
+                # Create the session row lazily so empty sessions are never stored
+                self.store.create_session(self.session_id, self.created_at.isoformat(), self.name)
+            self._seq += 1
+            self.store.append_message(self.session_id, self._seq, role, message, now)
+
+    def pin_message(self, index: int = -1) -> bool:
+        """Pin a history message (default: the latest) so it always stays in context."""
+        if not self.history:
+            return False
+        self.context.pin(index % len(self.history))
+        return True
+
+    def unpin_all(self):
+        """Remove all pins."""
+        self.context.unpin_all()
 
     # ----------------------------------------------------------
     # Retrieval & context
     # ----------------------------------------------------------
-    def get_recent_context(self, limit: int = 10) -> List[Dict[str, str]]:
+    def get_recent_context(self, limit: int = 10) -> List[Message]:
         """Return the last N messages for context."""
         return self.history[-limit:]
 
+    def build_context(self, system_prompt: str, user_message: str) -> List[Message]:
+        """
+        Select the history to send with ``user_message``: pinned messages first,
+        then as many of the newest turns as fit the token budget.
+        """
+        estimator = self.context.estimator
+        fixed_raw = estimator.count(system_prompt) + estimator.count(user_message)
+        selected = self.context.select(self.history, fixed_raw)
+        self._last_prompt_raw = fixed_raw + self.context.selected_raw()
+        return selected
+
+    async def abuild_context(self, system_prompt: str, user_message: str) -> List[Message]:
+        """
+        ``build_context`` with long-term memory: the earlier turns most relevant to
+        ``user_message`` plus the newest ``memory_recent_messages``, instead of as
+        much history as fits. Falls back to ``build_context`` when memory is off
+        or the embedding request fails.
+        """
+        index = self.memory
+        if index is None:
+            return self.build_context(system_prompt, user_message)
+        in_window = {m.content for m in self.history[self._recent_start() :] if m.role == "user"}
+        recalled: List[Dict[str, str]] = []
+        if len(index) > len(in_window):  # otherwise every indexed turn is already in the window
+            start = time.perf_counter()
+            try:
+                ollama = self.client or OllamaClient(config=self.config)
+                [vector] = await ollama.aembed([user_message], self.config.get("memory_model", "nomic-embed-text"))
+            except Exception as e:
+                logger.warning("Memory recall failed, sending history instead: %s", e)
+                return self.build_context(system_prompt, user_message)
+            embed_ms = (time.perf_counter() - start) * 1000
+            hits = await asyncio.to_thread(index.search, vector, self.config.get("memory_top_k", 4), in_window)
+            recall_ms = (time.perf_counter() - start) * 1000
+            self.metrics.record_recall(recall_ms)
+            logger.debug("Recalled %d of %d turns in %.1f ms (embed %.1f ms)", len(hits), len(index), recall_ms, embed_ms)
+            recalled = [turn for _, turn in hits]
+        return self._memory_context(system_prompt, user_message, recalled)
+
+    def _recent_start(self) -> int:
+        """Index of the oldest message in the verbatim window sent alongside recalled turns."""
+        start = max(0, len(self.history) - self.config.get("memory_recent_messages", 8))
+        # Start on a question so no reply is sent without it
+        if start > 0 and self.history[start].role == "assistant":
+            start -= 1
+        return start
+
+    def _memory_context(self, system_prompt: str, user_message: str, recalled: List[Dict[str, str]]) -> List[Message]:
+        """Pinned messages, then the recalled turns as one system message, then the recent window."""
+        estimator = self.context.estimator
+        fixed_raw = estimator.count(system_prompt) + estimator.count(user_message)
+        recall: List[Message] = []
+        if recalled:
+            # Best match first, within a quarter of the budget
+            cap = self.context.budget / 4 / estimator.scale
+            parts, used = [RECALL_HEADER], estimator.count(RECALL_HEADER)
+            for turn in recalled:
+                text = turn_text(turn)
+                if used + estimator.count(text) > cap:
+                    break
+                parts.append(text)
+                used += estimator.count(text)
+            if len(parts) > 1:
+                recall = [Message("system", "\n\n".join(parts), used)]
+                fixed_raw += used
+        # The budget still applies: a window of long messages is cut like any other
+        self.context.select(self.history, fixed_raw)
+        start = max(self.context.start, self._recent_start())
+        pinned = [i for i in self.context.pinned if i < start]
+        self._last_prompt_raw = fixed_raw + sum(self.context.tokens[i] for i in pinned) + sum(self.context.tokens[start:])
+        return [self.history[i] for i in pinned] + recall + self.history[start:]
+
+    async def remember(self, user_message: str, reply: str) -> None:
+        """Embed a completed turn into long-term memory (no-op when memory is off)."""
+        index = self.memory  # captured: the turn belongs to this session even if another is loaded meanwhile
+        if index is None:
+            return
+        turn = {"user": user_message, "assistant": reply}
+        ollama = self.client or OllamaClient(config=self.config)
+        [vector] = await ollama.aembed([turn_text(turn)], self.config.get("memory_model", "nomic-embed-text"))
+        await asyncio.to_thread(index.add, vector, turn)
+
+    def calibrate(self, prompt_eval_count: int | None) -> None:
+        """Calibrate token estimates against the prompt size Ollama reported for the last turn."""
+        if prompt_eval_count:
+            self.context.estimator.calibrate(self._last_prompt_raw, prompt_eval_count)
+
+    def record_response(self, data: Dict[str, Any], wall_ms: float, ttft_ms: float | None = None) -> ResponseMetrics:
+        """
+        Record the server-side stats of a finished reply (the non-streamed body or
+        the final streamed chunk) and calibrate token estimates against them.
+        """
+        self.calibrate(data.get("prompt_eval_count"))
+        metrics = ResponseMetrics.from_response(data, self.config.get("model", ""), wall_ms, ttft_ms)
+        self.metrics.record(metrics)
+        return metrics
+
     @property
     def conversation_length(self) -> int:
         """Total number of messages exchanged."""
@@ -52,12 +229,17 @@ class SessionManager:
     def reset(self):
         """Clear the chat history for a new session."""
         self.history.clear()
+        self.context.reset()
+        self.summary = ""
+        self._epoch += 1
+        self._start_new_session()
 
     def export(self) -> Dict[str, Any]:
         """Return session data as a serializable dict."""
         return {
             "created_at": self.created_at.isoformat(),
-            "history": self.history,
+            "history": [m.to_dict() for m in self.history],
+            "summary": self.summary,
         }
 
     # def load_from(self, session_data: Dict[str, Any]):
@@ -66,7 +248,10 @@ class SessionManager:
     #     self.created_at = datetime.datetime.fromisoformat(session_data.get("created_at"))
     def load_from(self, session_data: Dict[str, Any]) -> None:
         """Load an existing session from serialized data."""
-        self.history = session_data.get("history", [])
+        self.history = [Message.of(m) for m in session_data.get("history", [])]
+        self.context.rebuild(self.history)
+        self.summary = session_data.get("summary", "")
+        self._epoch += 1
 
         created_at_raw = session_data.get("created_at")
         if isinstance(created_at_raw, str):
@@ -77,34 +262,192 @@ class SessionManager:
             self.created_at = datetime.datetime.now(datetime.timezone.utc)
 
     def clear_history(self):
-        """Clear chat history."""
+        """Clear chat history. The stored transcript is kept; new messages go to a fresh session."""
         self.history = []
+        self.context.reset()
+        self.summary = ""
+        self._epoch += 1
+        self._start_new_session()
 
-    def compact(self, instructions: str | None = None) -> str:
+    # ----------------------------------------------------------
+    # Persistence
+    # ----------------------------------------------------------
+    def _start_new_session(self):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.name = None
+        self._seq = 0
+        self.oldest_loaded_seq = 1
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.metrics = MetricsRecorder()
+        self._open_memory()
+
+    def _open_memory(self) -> None:
+        """Open the current session's memory index, persisted next to the session database."""
+        if not self.config.get("memory"):
+            self.memory = None
+            return
+        directory = self.config.get("memory_dir") or ""
+        session_db = self.config.get("session_db") or ""
+        if not directory and session_db:
+            directory = os.path.join(os.path.dirname(os.path.expanduser(session_db)), "memory")
+        model = self.config.get("memory_model", "nomic-embed-text")
+        self.memory = MemoryIndex(memory_path(directory, self.session_id, model) if directory else None)
+
+    def save(self, name: Optional[str] = None) -> str:
+        """Name the current session and make sure all of it is on disk."""
+        if self.store is None:
+            raise RuntimeError("Session persistence is disabled (session_db is empty).")
+        if name:
+            self.name = name
+        self.store.create_session(self.session_id, self.created_at.isoformat(), self.name)
+        if self.name:
+            self.store.rename_session(self.session_id, self.name)
+        if self.summary:
+            self.store.save_summary(self.session_id, self.summary)
+        self.store.flush()
+        return self.session_id
+
+    def resume(self, ref: str, window: int = 50) -> bool:
         """
-        Summarize and compact the chat history into a single system summary.
+        Switch to a stored session, loading only its newest ``window`` messages
+        (plus the running summary). Older messages stay on disk and are paged in
+        on demand with ``load_older``.
         """
-        if not self.history:
-            return "⚠️ No history to compact."
+        if self.store is None:
+            return False
+        self.store.flush()
+        row = self.store.find_session(ref)
+        if row is None:
+            return False
+
+        recent = self.store.load_recent(row["id"], window)
+        self.session_id = row["id"]
+        self.name = row["name"]
+        self.created_at = datetime.datetime.fromisoformat(row["created_at"])
+        self.summary = row["summary"]
+        self._seq = recent[-1]["seq"] if recent else 0
+        self.oldest_loaded_seq = recent[0]["seq"] if recent else 1
+
+        history = [Message(m["role"], m["content"], timestamp=_epoch_seconds(m["created_at"])) for m in recent]
+        if self.summary:
+            history.insert(0, Message("system", f"{SUMMARY_HEADER}\n{self.summary}"))
+        self.history = history
+        self.context.rebuild(self.history)
+        self.metrics = MetricsRecorder()
+        self._open_memory()
+        self._epoch += 1
+        return True
+
+    def load_older(self, limit: int = 50) -> List[Dict[str, str]]:
+        """Fetch the page of stored messages just before the loaded window (display only)."""
+        if self.store is None or self.oldest_loaded_seq <= 1:
+            return []
+        rows = self.store.load_before(self.session_id, self.oldest_loaded_seq, limit)
+        if rows:
+            self.oldest_loaded_seq = rows[0]["seq"]
+        return [{"role": m["role"], "content": m["content"]} for m in rows]
+
+    @property
+    def has_older(self) -> bool:
+        """True if stored messages exist before the loaded window."""
+        return self.store is not None and self.oldest_loaded_seq > 1
+
+    # ----------------------------------------------------------
+    # Compaction
+    # ----------------------------------------------------------
+    @property
+    def needs_compaction(self) -> bool:
+        """True once history passes the auto-compaction threshold and no compaction is running."""
+        if self._compacting or not self.auto_compact_tokens or self.memory is not None:
+            # With memory on, prompts only carry the recent window, so there is nothing to fold
+            return False
+        return self.context.total_tokens * self.context.estimator.scale > self.auto_compact_tokens
 
-        # Step 1: Build summarization prompt
-        summary_prompt = "Summarize the following conversation in a way that retains all essential context, goals, and facts for future continuation.\n"
+    def _plan_segment(self, keep_recent: bool) -> int:
+        """
+        Return the cut index: messages ``[0:cut]`` (including any running summary)
+        are folded into the new summary. With ``keep_recent`` the newest turns
+        worth half the budget stay verbatim.
+        """
+        if not keep_recent:
+            return len(self.history)
+        tail_raw = int(self.context.budget / 2 / self.context.estimator.scale)
+        cut = self.context.split_for_tail(0, tail_raw)
+        # Start the verbatim tail on a user turn so no reply loses its question
+        while cut < len(self.history) and self.history[cut].role != "user":
+            cut += 1
+        return cut
+
+    def _build_summary_prompt(self, segment: List[Message], instructions: str | None = None) -> str:
+        """Build the summarization prompt for one segment, folding in the running summary."""
+        parts = ["Summarize the following conversation in a way that retains all essential context, goals, and facts for future continuation.\n"]
         if instructions:
-            summary_prompt += f"\nAdditional instructions: {instructions}\n"
+            parts.append(f"\nAdditional instructions: {instructions}\n")
+        if self.summary:
+            parts.append("\nMerge the new messages into this existing summary of the earlier conversation:\n")
+            parts.append(self.summary)
+            parts.append("\n")
+            segment = segment[1:]  # history[0] is the summary message itself
+
+        parts.append("\n--- Conversation ---\n")
+        parts.extend(f"{msg.role}: {msg.content}\n" for msg in segment)
+        return "".join(parts)
 
-        summary_prompt += "\n--- Conversation ---\n"
-        for msg in self.history:
-            summary_prompt += f"{msg['role']}: {msg['content']}\n"
+    def _apply_summary(self, cut: int, summary_text: str) -> None:
+        """Swap ``history[0:cut]`` for the summary in a single assignment."""
+        self.summary = summary_text
+        message = Message("system", f"{SUMMARY_HEADER}\n{summary_text}")
+        self.history = [message] + self.history[cut:]
+        message.tokens = self.context.fold_prefix(cut, message.content)
+        self._epoch += 1
+        if self.store is not None and self._seq:
+            self.store.save_summary(self.session_id, summary_text)
+
+    async def compact_async(self, instructions: str | None = None, keep_recent: bool = True) -> str:
+        """
+        Fold the oldest unsummarized segment into the running summary without
+        blocking the event loop. New messages appended while the summary is being
+        generated are kept; a clear/load in the meantime discards the result.
+        """
+        if self._compacting:
+            return "⚠️ Compaction already in progress."
+        cut = self._plan_segment(keep_recent)
+        start = 1 if self.summary else 0
+        if cut <= start:
+            return "⚠️ No history to compact."
 
-        # Step 2: Call local model to summarize
-        ollama = OllamaClient(config=self.config)
-        system_prompt = build_system_prompt()
-        summary_response = ollama.compress_generate(system_prompt, summary_prompt)
+        self._compacting = True
+        try:
+            epoch = self._epoch
+            summary_prompt = self._build_summary_prompt(self.history[:cut], instructions)
+            ollama = self.client or OllamaClient(config=self.config)
+            summary_response = await ollama.acompress_generate(build_system_prompt(self.config), summary_prompt)
 
-        summary_text = summary_response.strip()
+            if ollama.is_error_reply(summary_response):
+                return f"⚠️ Compaction failed: {summary_response}"
+            if epoch != self._epoch:
+                return "⚠️ History changed during compaction; summary discarded."
+            # Appends may have happened during the await; they all live after ``cut``
+            self._apply_summary(cut, summary_response.strip())
+        finally:
+            self._compacting = False
+
+        return f"✅ Compacted {cut - start} messages into the running summary."
+
+    def compact(self, instructions: str | None = None) -> str:
+        """
+        Summarize and compact the chat history into a single system summary.
+        Blocking variant of ``compact_async`` that folds the whole history.
+        """
+        cut = self._plan_segment(keep_recent=False)
+        if cut <= (1 if self.summary else 0):
+            return "⚠️ No history to compact."
 
-        # Step 3: Replace full history with summary as system message
-        self.history = [{"role": "system", "content": summary_text}]
-        # self.save_session()
+        summary_prompt = self._build_summary_prompt(self.history[:cut], instructions)
+        ollama = self.client or OllamaClient(config=self.config)
+        summary_response = ollama.compress_generate(build_system_prompt(self.config), summary_prompt)
+        if ollama.is_error_reply(summary_response):
+            return f"⚠️ Compaction failed: {summary_response}"
+        self._apply_summary(cut, summary_response.strip())
 
         return "✅ Conversation compacted. Summary retained in system context."
@@ -0,0 +1,249 @@
+# deltastrik/core/session_store.py
+"""
+Durable session storage for DeltaStrik.
+Messages are appended to a SQLite database in WAL mode from a single background
+writer thread, so persisting a turn never blocks the UI. Reads page through a
+session by sequence number, so resuming only loads the recent window.
+An FTS5 index over message content is updated in the same transaction as each
+append, giving ranked full-text search across every stored session.
+"""
+
+import asyncio
+import os
+import queue
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("session_store")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    summary TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL REFERENCES sessions(id),
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_session_seq ON messages(session_id, seq);
+CREATE INDEX IF NOT EXISTS idx_sessions_name ON sessions(name);
+"""
+
+# External-content FTS5 index: stores only the index, content stays in `messages`
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE messages_fts USING fts5(
+    content, content='messages', content_rowid='id', tokenize='porter unicode61'
+);
+INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');
+"""
+
+# Control characters mark snippet matches; callers turn them into markup
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+_STOP = object()
+
+
+class SessionStore:
+    """
+    SQLite-backed session store. All writes are queued to one writer thread;
+    reads use a separate connection (WAL lets them run alongside the writer).
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        self._reader = self._connect()
+        self._reader.executescript(SCHEMA)
+        self.search_enabled = self._ensure_fts()
+        self._read_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="session-store-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_fts(self) -> bool:
+        """Create (and backfill) the FTS5 index; returns False if SQLite lacks FTS5."""
+        exists = self._reader.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'messages_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            with self._reader:
+                self._reader.executescript(FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError:
+            logger.warning("SQLite was built without FTS5; /search is disabled")
+            return False
+
+    # ----------------------------------------------------------
+    # Writer thread
+    # ----------------------------------------------------------
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        while True:
+            # Batch whatever is already queued into a single transaction
+            jobs = [self._queue.get()]
+            while True:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(job is _STOP for job in jobs)
+            try:
+                # Opened explicitly: a SAVEPOINT outside a transaction would start (and RELEASE commit) one per job
+                conn.execute("BEGIN")
+                for job in jobs:
+                    if job is not _STOP:
+                        self._run_job(conn, job)
+                conn.commit()
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.exception("Session store write failed")
+            finally:
+                for _ in jobs:
+                    self._queue.task_done()
+            if stop:
+                break
+        conn.close()
+
+    @staticmethod
+    def _run_job(conn: sqlite3.Connection, job: Callable[[sqlite3.Connection], Any]) -> None:
+        # A savepoint per job, nested in the batch's transaction: a failing write (e.g. a seq conflict) is undone alone
+        conn.execute("SAVEPOINT job")
+        try:
+            job(conn)
+        except Exception:
+            conn.execute("ROLLBACK TO job")
+            logger.exception("Session store write failed")
+        finally:
+            conn.execute("RELEASE job")
+
+    def _submit(self, job: Callable[[sqlite3.Connection], Any]) -> None:
+        self._queue.put(job)
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed."""
+        self._queue.join()
+
+    async def aflush(self) -> None:
+        """``flush`` without blocking the event loop."""
+        await asyncio.to_thread(self._queue.join)
+
+    def close(self) -> None:
+        """Flush pending writes and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._reader.close()
+
+    # ----------------------------------------------------------
+    # Writes (asynchronous)
+    # ----------------------------------------------------------
+    def create_session(self, session_id: str, created_at: str, name: Optional[str] = None) -> None:
+        self._submit(
+            lambda c: c.execute(
+                "INSERT OR IGNORE INTO sessions (id, name, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, name, created_at, created_at),
+            )
+        )
+
+    def append_message(self, session_id: str, seq: int, role: str, content: str, created_at: str) -> None:
+        def job(c: sqlite3.Connection) -> None:
+            cursor = c.execute(
+                "INSERT INTO messages (session_id, seq, role, content, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, seq, role, content, created_at),
+            )
+            if self.search_enabled:
+                c.execute("INSERT INTO messages_fts (rowid, content) VALUES (?, ?)", (cursor.lastrowid, content))
+            c.execute("UPDATE sessions SET updated_at = ? WHERE id = ?", (created_at, session_id))
+
+        self._submit(job)
+
+    def rename_session(self, session_id: str, name: str) -> None:
+        self._submit(lambda c: c.execute("UPDATE sessions SET name = ? WHERE id = ?", (name, session_id)))
+
+    def save_summary(self, session_id: str, summary: str) -> None:
+        self._submit(lambda c: c.execute("UPDATE sessions SET summary = ? WHERE id = ?", (summary, session_id)))
+
+    # ----------------------------------------------------------
+    # Reads (synchronous, small and indexed)
+    # ----------------------------------------------------------
+    def _read(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def list_sessions(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently updated sessions with their message counts."""
+        rows = self._read(
+            "SELECT s.id, s.name, s.created_at, s.updated_at, "
+            "(SELECT COUNT(*) FROM messages m WHERE m.session_id = s.id) AS message_count "
+            "FROM sessions s ORDER BY s.updated_at DESC LIMIT ?",
+            (limit,),
+        )
+        return [dict(row) for row in rows]
+
+    def find_session(self, ref: str) -> Optional[Dict[str, Any]]:
+        """Resolve a session by exact name, exact id or unique id prefix."""
+        rows = self._read("SELECT * FROM sessions WHERE name = ? ORDER BY updated_at DESC LIMIT 1", (ref,))
+        if not rows:
+            rows = self._read("SELECT * FROM sessions WHERE id LIKE ? ORDER BY updated_at DESC LIMIT 2", (ref + "%",))
+            if len(rows) != 1:
+                return None
+        return dict(rows[0])
+
+    def load_recent(self, session_id: str, limit: int) -> List[Dict[str, Any]]:
+        """The newest ``limit`` messages of a session, oldest first."""
+        rows = self._read(
+            "SELECT seq, role, content, created_at FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+            (session_id, limit),
+        )
+        return [dict(row) for row in reversed(rows)]
+
+    def load_before(self, session_id: str, before_seq: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to ``limit`` messages older than ``before_seq``, oldest first."""
+        rows = self._read(
+            "SELECT seq, role, content FROM messages WHERE session_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+            (session_id, before_seq, limit),
+        )
+        return [dict(row) for row in reversed(rows)]
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Ranked (BM25) full-text search over every stored message.
+        Each term is quoted, so punctuation in the query is matched literally.
+        """
+        if not self.search_enabled:
+            return []
+        terms = [term.replace('"', '""') for term in query.split()]
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"' for term in terms)
+        rows = self._read(
+            "SELECT m.session_id, s.name AS session_name, m.seq, m.role, m.created_at, "
+            f"snippet(messages_fts, 0, '{MATCH_START}', '{MATCH_END}', '…', 16) AS snippet "
+            "FROM messages_fts "
+            "JOIN messages m ON m.id = messages_fts.rowid "
+            "JOIN sessions s ON s.id = m.session_id "
+            "WHERE messages_fts MATCH ? ORDER BY bm25(messages_fts) LIMIT ?",
+            (match, limit),
+        )
+        return [dict(row) for row in rows]
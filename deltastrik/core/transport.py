@@ -0,0 +1,279 @@
+# deltastrik/core/transport.py
+"""
+HTTP transport layer for talking to Ollama.
+Provides a pooled keep-alive client for blocking callers (built on requests.Session)
+and an asyncio-native client that runs directly on the event loop, so in-flight
+requests don't each hold an OS thread.
+"""
+
+import asyncio
+import json
+import ssl
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from deltastrik.core.message import encode_payload
+from deltastrik.utils.logging_utils import setup_logger
+
+if TYPE_CHECKING:
+    import requests
+
+logger = setup_logger("transport")
+
+# Bodies are pre-encoded (``encode_payload``) so cached message fragments are reused
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class TransportError(Exception):
+    """Raised when the server answers with an HTTP error status."""
+
+    def __init__(self, status: int, body: bytes = b""):
+        self.status = status
+        self.body = body
+        super().__init__(f"HTTP {status}: {body[:200].decode('utf-8', 'replace')}")
+
+
+class HttpTransport:
+    """
+    Blocking transport backed by a single requests.Session.
+    Connections are kept alive and reused across turns instead of a fresh
+    TCP handshake per request.
+    """
+
+    def __init__(self, pool_size: int = 4):
+        self.pool_size = pool_size
+        self._session: Optional["requests.Session"] = None
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session, created (and requests imported) on first use."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self._session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        return self._session
+
+    def post_json(self, url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """POST a JSON payload and return the decoded JSON body."""
+        response = self.session.post(url=url, data=encode_payload(payload), headers=JSON_HEADERS, timeout=timeout)
+        logger.info("Ollama response status: %s", response.status_code)
+        response.raise_for_status()
+        return response.json()
+
+    def get_json(self, url: str, timeout: float) -> Dict[str, Any]:
+        """GET a URL and return the decoded JSON body."""
+        response = self.session.get(url=url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def stream_lines(self, url: str, payload: Dict[str, Any], timeout: float) -> Iterator[bytes]:
+        """POST a JSON payload and yield the response body line by line as it arrives."""
+        with self.session.post(url=url, data=encode_payload(payload), headers=JSON_HEADERS, timeout=timeout, stream=True) as response:
+            logger.info("Ollama response status: %s", response.status_code)
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield line
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        if self._session is not None:
+            self._session.close()
+
+
+# Connection key: (host, port, use_tls)
+_ConnKey = Tuple[str, int, bool]
+_Conn = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class AsyncHttpTransport:
+    """
+    Minimal HTTP/1.1 client on asyncio streams with a per-host keep-alive pool.
+    Supports Content-Length and chunked responses, which is all Ollama's API uses.
+    """
+
+    def __init__(self, max_connections: int = 4):
+        self.max_connections = max_connections
+        self._idle: Dict[_ConnKey, List[_Conn]] = {}
+        self._limits: Dict[_ConnKey, asyncio.Semaphore] = {}
+        self._ssl_context: Optional[ssl.SSLContext] = None
+
+    # ----------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------
+    async def post_json(self, url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """POST a JSON payload and return the decoded JSON body."""
+        body = b"".join([chunk async for chunk in self._request("POST", url, payload, timeout)])
+        return json.loads(body)
+
+    async def get_json(self, url: str, timeout: float) -> Dict[str, Any]:
+        """GET a URL and return the decoded JSON body."""
+        body = b"".join([chunk async for chunk in self._request("GET", url, None, timeout)])
+        return json.loads(body)
+
+    async def stream_lines(self, url: str, payload: Dict[str, Any], timeout: float) -> AsyncGenerator[bytes, None]:
+        """
+        POST a JSON payload and yield the response body line by line as it arrives.
+        Stopping iteration early closes the connection so the server stops generating.
+        """
+        buffer = b""
+        async with aclosing(self._request("POST", url, payload, timeout)) as chunks:
+            async for chunk in chunks:
+                buffer += chunk
+                while b"\n" in buffer:
+                    line, buffer = buffer.split(b"\n", 1)
+                    if line.strip():
+                        yield line
+        if buffer.strip():
+            yield buffer
+
+    async def aclose(self) -> None:
+        """Close every idle pooled connection."""
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+    # ----------------------------------------------------------
+    # Connection pool
+    # ----------------------------------------------------------
+    def _limit(self, key: _ConnKey) -> asyncio.Semaphore:
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.max_connections)
+        return self._limits[key]
+
+    async def _acquire(self, key: _ConnKey, timeout: float) -> Tuple[_Conn, bool]:
+        """Return a pooled connection (reused=True) or open a new one."""
+        idle = self._idle.get(key, [])
+        while idle:
+            reader, writer = idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return (reader, writer), True
+            writer.close()
+
+        host, port, use_tls = key
+        ssl_context = None
+        if use_tls:
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            ssl_context = self._ssl_context
+        async with asyncio.timeout(timeout):
+            conn = await asyncio.open_connection(host, port, ssl=ssl_context)
+        return conn, False
+
+    def _release(self, key: _ConnKey, conn: _Conn) -> None:
+        self._idle.setdefault(key, []).append(conn)
+
+    # ----------------------------------------------------------
+    # HTTP/1.1
+    # ----------------------------------------------------------
+    async def _request(self, method: str, url: str, payload: Optional[Dict[str, Any]], timeout: float) -> AsyncGenerator[bytes, None]:
+        parts = urlsplit(url)
+        use_tls = parts.scheme == "https"
+        host = parts.hostname or "127.0.0.1"
+        port = parts.port or (443 if use_tls else 80)
+        key = (host, port, use_tls)
+        path = parts.path or "/"
+        if parts.query:
+            path += f"?{parts.query}"
+
+        body = encode_payload(payload) if payload is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nConnection: keep-alive\r\nAccept: */*\r\n"
+        if payload is not None:
+            head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+        request = head.encode("latin-1") + b"\r\n" + body
+
+        async with self._limit(key):
+            conn, reused = await self._acquire(key, timeout)
+            try:
+                status, headers = await self._send(conn, request, timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                conn[1].close()
+                if not reused:
+                    raise
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                conn = await self._open(key, timeout)
+                try:
+                    status, headers = await self._send(conn, request, timeout)
+                except BaseException:
+                    conn[1].close()
+                    raise
+            except BaseException:
+                # Cancelled (or timed out) before the response started: the connection is mid-request
+                conn[1].close()
+                raise
+
+            reusable = False
+            try:
+                if status >= 400:
+                    error_body = b"".join([chunk async for chunk in self._read_body(conn[0], headers, timeout)])
+                    reusable = headers.get("connection", "").lower() != "close"
+                    raise TransportError(status, error_body)
+                async for chunk in self._read_body(conn[0], headers, timeout):
+                    yield chunk
+                reusable = headers.get("connection", "").lower() != "close" and ("content-length" in headers or "chunked" in headers.get("transfer-encoding", ""))
+            finally:
+                if reusable:
+                    self._release(key, conn)
+                else:
+                    conn[1].close()
+
+    async def _open(self, key: _ConnKey, timeout: float) -> _Conn:
+        """Drop the (likely stale) idle connections for this host and open a fresh one."""
+        for _, writer in self._idle.pop(key, []):
+            writer.close()
+        conn, _ = await self._acquire(key, timeout)
+        return conn
+
+    @staticmethod
+    async def _send(conn: _Conn, request: bytes, timeout: float) -> Tuple[int, Dict[str, str]]:
+        reader, writer = conn
+        writer.write(request)
+        async with asyncio.timeout(timeout):
+            await writer.drain()
+            status_line = await reader.readuntil(b"\r\n")
+            headers: Dict[str, str] = {}
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                if line == b"\r\n":
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+        status = int(status_line.split(b" ", 2)[1])
+        return status, headers
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str], timeout: float) -> AsyncIterator[bytes]:
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                async with asyncio.timeout(timeout):
+                    size_line = await reader.readuntil(b"\r\n")
+                    size = int(size_line.split(b";", 1)[0], 16)
+                    if size == 0:
+                        # Consume optional trailers up to the terminating blank line
+                        while await reader.readuntil(b"\r\n") != b"\r\n":
+                            pass
+                        return
+                    data = await reader.readexactly(size + 2)
+                yield data[:-2]
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining > 0:
+                async with asyncio.timeout(timeout):
+                    data = await reader.read(min(remaining, 65536))
+                if not data:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                remaining -= len(data)
+                yield data
+        else:
+            while True:
+                async with asyncio.timeout(timeout):
+                    data = await reader.read(65536)
+                if not data:
+                    return
+                yield data
@@ -2,21 +2,57 @@
 """
 Reactive TUI application for DeltaStrik.
 Uses Textual to provide a structured chat-like terminal UI.
+
+Sessions live in tabs that generate replies concurrently. Every request goes
+through one RequestScheduler, so together they never exceed what the Ollama
+backends run in parallel. Their UI updates go through one FrameScheduler, so
+together they repaint at most ``ui_fps`` times a second.
 """
 
 import time
 import asyncio
+from contextlib import aclosing
+from typing import Awaitable
 from textual.app import App, ComposeResult
 from textual.containers import Vertical
 from textual import events
+from textual.timer import Timer
 from deltastrik.tui.chat_view import ChatView
+from deltastrik.tui.compare_view import CompareScreen
+from deltastrik.tui.frame_scheduler import FrameScheduler
+from deltastrik.tui.history_search import HistorySearchScreen
 from deltastrik.tui.input_bar import InputBar
+from deltastrik.tui.session_tab import SessionTab
 from deltastrik.tui.status_bar import StatusBar
 from deltastrik.core.session_manager import SessionManager
+from deltastrik.core.session_store import SessionStore
 from deltastrik.core.ollama_client import OllamaClient
-from deltastrik.core.prompt_engine import build_system_prompt
+from deltastrik.core.scheduler import RequestScheduler
+from deltastrik.core.transport import HttpTransport, AsyncHttpTransport
+from deltastrik.core.prompt_engine import build_system_prompt, build_runtime_context, system_prompt_inputs
 from deltastrik.core.command_handler import CommandHandler
-from textual.widgets import Input
+from deltastrik.core.input_history import InputHistory
+from textual.widgets import ContentSwitcher, Input, TabbedContent
+from rich.markup import escape
+
+# Settings read once at startup (connections, storage, logging); a reload reports them instead of applying them
+RESTART_SETTINGS = frozenset(
+    {
+        "ollama_url",
+        "ollama_urls",
+        "session_db",
+        "input_history",
+        "input_history_size",
+        "response_cache",
+        "response_cache_path",
+        "response_cache_entries",
+        "response_cache_max_mb",
+        "config_reload_interval",
+        "log_level",
+        "log_max_bytes",
+        "log_backups",
+    }
+)
 
 
 class DeltaStrikApp(App):
@@ -27,14 +63,32 @@ class DeltaStrikApp(App):
     # Keybindings for the app
     BINDINGS = [
         ("ctrl+m", "toggle_mouse", "Toggle Mouse Capture"),
+        ("ctrl+g", "cancel_generation", "Cancel Reply"),
+        ("ctrl+t", "new_tab", "New Session Tab"),
+        ("ctrl+n", "next_tab", "Next Session Tab"),
+        ("ctrl+r", "search_history", "Search Input History"),
     ]
 
     def __init__(self, config):
         super().__init__()
         self.config = config
-        self.session = SessionManager(config=self.config)
-        self.client = OllamaClient(config)
+        # One connection pool for the whole app lifetime
+        self.transport = HttpTransport()
+        self.async_transport = AsyncHttpTransport()
+        self.client = OllamaClient(config, transport=self.transport, async_transport=self.async_transport)
+        db_path = config.get("session_db", "~/.deltastrik/sessions.db")
+        self.store = SessionStore(db_path) if db_path else None
+        # Shared by all tabs: caps requests per backend and queues the rest fairly
+        self.scheduler = RequestScheduler(self.client.router)
+        self.scheduler.subscribe(self._show_queue_positions)
+        # Shared by all tabs: streamed text, status and scrolling are applied once per frame
+        self.frames = FrameScheduler(self, config.get("ui_fps", 30))
+        # Submitted input, kept across sessions and runs (Up/Down, Ctrl+R, suggestions)
+        self.input_history = InputHistory(config.get("input_history") or None, config.get("input_history_size", 50000))
+        self._tab_seq = 0
+        self.tab = self._new_tab()  # the active tab
         self.system_prompt = build_system_prompt(config)
+        self._prompt_inputs = system_prompt_inputs(config)
         self.command_handler = CommandHandler(
             self.session,
             self.client,
@@ -42,23 +96,286 @@ class DeltaStrikApp(App):
             app=self,
         )
         self.mouse_capture_enabled = True
+        self._prefill_timer: Timer | None = None
+
+    # The active tab's parts, so single-session code paths read as before
+    @property
+    def session(self) -> SessionManager:
+        return self.tab.session
+
+    @property
+    def chat_view(self) -> ChatView:
+        return self.tab.chat_view
+
+    @property
+    def status_bar(self) -> StatusBar:
+        return self.tab.status_bar
 
     def compose(self) -> ComposeResult:
         """Declare the TUI layout."""
-        self.chat_view = ChatView()
-        self.input_bar = InputBar()
-        self.status_bar = StatusBar()
+        self.input_bar = InputBar(self.input_history)
 
         with Vertical(id="main-layout"):
-            yield self.chat_view
+            with TabbedContent(id="sessions", classes="single"):
+                yield self.tab
             yield self.input_bar
-            yield self.status_bar
+            # One status bar per tab; only the active tab's is shown
+            with ContentSwitcher(id="status-bars", initial=self.tab.status_bar.id):
+                yield self.tab.status_bar
 
     async def on_mount(self) -> None:
         """Set initial focus on the input bar when app starts."""
         self.input_bar.focus()
+        # Replay the input history file off the event loop, so the first keystroke doesn't wait for it
+        self.run_worker(self.input_history.load, thread=True, group="input-history")
         # Show initial hint about copying
         self.status_bar.update_status("Ready • Hold Shift to select/copy text")
+        interval = self.config.get("config_reload_interval", 0)
+        if interval and hasattr(self.config, "reload"):
+            # Pick up edits to the config file and persona without a restart
+            self.set_interval(interval, self._check_config)
+
+    async def on_unmount(self) -> None:
+        """Release pooled connections and stop endpoint probing on shutdown."""
+        for tab in self.query(SessionTab):
+            tab.pending.clear()
+        await self.client.router.aclose()
+        if self.client.cache is not None:
+            self.client.cache.close()
+        await self.async_transport.aclose()
+        self.transport.close()
+        if self.store is not None:
+            self.store.close()
+
+    # ----------------------------------------------------------
+    # Config hot reload
+    # ----------------------------------------------------------
+    def _check_config(self) -> None:
+        """Apply an edited config file or persona; both are only re-parsed when their mtime changes."""
+        changed = self.config.reload()
+        if changed:
+            self.client.apply_config(self.config)
+            self.frames.fps = self.config.get("ui_fps", 30)
+            for tab in self.query(SessionTab):
+                tab.session.apply_config(self.config, changed)
+                tab.status_bar.model_name = self.config.get("model", "")
+            applied = sorted(key for key in changed if key not in RESTART_SETTINGS)
+            pending = sorted(key for key in changed if key in RESTART_SETTINGS)
+            lines = []
+            if applied:
+                lines.append("[green]Config reloaded:[/green] " + ", ".join(escape(key) for key in applied))
+            if pending:
+                lines.append("[yellow]Restart to apply:[/yellow] " + ", ".join(escape(key) for key in pending))
+            self.chat_view.add_message("system", "\n".join(lines))
+        # Compare what the prompt is built from, not the prompt: the classic layout's timestamp changes every minute
+        inputs = system_prompt_inputs(self.config)
+        if inputs != self._prompt_inputs:
+            # Applies from the next turn; history is kept
+            self._prompt_inputs = inputs
+            system_prompt = build_system_prompt(self.config)
+            if system_prompt != self.system_prompt and not changed:
+                self.chat_view.add_message("system", "[green]System prompt reloaded.[/green]")
+            self.system_prompt = system_prompt
+
+    # ----------------------------------------------------------
+    # Tabs
+    # ----------------------------------------------------------
+    def _new_tab(self) -> SessionTab:
+        self._tab_seq += 1
+        session = SessionManager(config=self.config, client=self.client, store=self.store)
+        status_bar = StatusBar(
+            model_name=self.config.get("model", ""),
+            connection_status=self.config.get("connection_status", "Active"),
+            id=f"status-{self._tab_seq}",
+            frames=self.frames,
+        )
+        return SessionTab(f"Chat {self._tab_seq}", session, status_bar, id=f"session-{self._tab_seq}", frames=self.frames)
+
+    def open_tab(self) -> None:
+        """Start a new session in its own tab and switch to it."""
+        self.call_later(self._add_tab, self._new_tab())
+
+    async def _add_tab(self, tab: SessionTab) -> None:
+        tabs = self.query_one("#sessions", TabbedContent)
+        await self.query_one("#status-bars", ContentSwitcher).mount(tab.status_bar)
+        await tabs.add_pane(tab)
+        tabs.remove_class("single")
+        tabs.active = tab.pane_id
+        tab.status_bar.update_status("Ready")
+
+    def close_tab(self) -> str:
+        """Close the active tab, cancelling its reply; the session stays on disk."""
+        tabs = self.query_one("#sessions", TabbedContent)
+        if tabs.tab_count < 2:
+            return "[yellow]This is the only session tab.[/yellow]"
+        tab = self.tab
+        tab.pending.clear()
+        if tab.generation is not None:
+            tab.keep_partial = False
+            tab.generation.cancel()
+        self.call_later(self._remove_tab, tab)
+        return ""
+
+    async def _remove_tab(self, tab: SessionTab) -> None:
+        self._cancel_prefill(tab)
+        for worker in tab.background:
+            worker.cancel()
+        tabs = self.query_one("#sessions", TabbedContent)
+        await tabs.remove_pane(tab.pane_id)
+        await tab.status_bar.remove()
+        tabs.set_class(tabs.tab_count < 2, "single")
+
+    def action_new_tab(self) -> None:
+        self.open_tab()
+
+    def action_next_tab(self) -> None:
+        tabs = self.query_one("#sessions", TabbedContent)
+        panes = list(self.query(SessionTab))
+        if len(panes) > 1:
+            tabs.active = panes[(panes.index(self.tab) + 1) % len(panes)].pane_id
+
+    async def on_tabbed_content_tab_activated(self, event: TabbedContent.TabActivated) -> None:
+        """Point the chat view, status bar and commands at the newly active session."""
+        tab = event.pane
+        if not isinstance(tab, SessionTab):
+            return
+        if tab is not self.tab:
+            # The hidden tab keeps streaming into its transcript without rendering it
+            self.tab.chat_view.set_background(True)
+            # Its warm-up was for a draft that is no longer being typed there
+            self._cancel_prefill(self.tab)
+            self.tab = tab
+        tab.chat_view.set_background(False)
+        self.command_handler.session = tab.session
+        self.query_one("#status-bars", ContentSwitcher).current = tab.status_bar.id
+        self.input_bar.focus()
+
+    def _tab_of(self, chat_view: ChatView) -> SessionTab:
+        return next(tab for tab in self.query(SessionTab) if tab.chat_view is chat_view)
+
+    def _show_queue_positions(self) -> None:
+        """Show each tab's place in the shared request queue (blank once it has a slot)."""
+        for tab in self.query(SessionTab):
+            tab.status_bar.queue_position = self.scheduler.position(tab.id)
+
+    # ----------------------------------------------------------
+    # Sessions
+    # ----------------------------------------------------------
+    def open_session(self, ref: str) -> str:
+        """Resume a stored session in the active tab, showing only its recent window."""
+        if self.store is None:
+            return "[yellow]Session persistence is disabled.[/yellow]"
+        if self.tab.generation is not None:
+            return "[yellow]Wait for the current reply (or cancel it) before loading a session.[/yellow]"
+        if not self.session.resume(ref, window=self.config.get("resume_window", 50)):
+            return f"[red]No saved session matches '{ref}'.[/red]"
+        self.chat_view.clear_messages()
+        for msg in self.session.history:
+            self.chat_view.add_message(msg["role"], msg["content"])
+        self.chat_view.has_more_older = self.session.has_older
+        label = escape(self.session.name or self.session.session_id)
+        self.query_one("#sessions", TabbedContent).get_tab(self.tab).label = label
+        return f"[green]Loaded session[/green] {label}."
+
+    async def on_chat_view_older_requested(self, event: ChatView.OlderRequested) -> None:
+        """Page older messages of a resumed session in from disk."""
+        tab = self._tab_of(event.chat_view)
+        rows = await asyncio.to_thread(tab.session.load_older, self.config.get("resume_window", 50))
+        tab.chat_view.prepend_messages([(m["role"], m["content"]) for m in rows], tab.session.has_older)
+
+    def start_compare(self, models: list[str], user_text: str) -> str:
+        """Send the active session's context plus ``user_text`` to several models side by side."""
+        tab = self.tab
+        request = {
+            "user_message": user_text,
+            "history": tab.session.build_context(self.system_prompt, user_text),
+            "runtime_context": build_runtime_context(self.config),
+        }
+        self.push_screen(
+            CompareScreen(
+                self.client,
+                self.scheduler,
+                tab.id,
+                models,
+                request,
+                # Each model is told its own name, not the configured one
+                {model: build_system_prompt(self.config, model=model) for model in models},
+                models_per_endpoint=self.config.get("compare_models_per_endpoint", 2),
+                frames=self.frames,
+                on_done=lambda summary: tab.chat_view.add_message("system", summary),
+            )
+        )
+        return ""  # The comparison screen takes over until closed
+
+    def action_search_history(self) -> None:
+        """Ctrl+R: fuzzy-search earlier input, starting from the current draft."""
+        if len(self.screen_stack) > 1:
+            return
+
+        def use(entry: str | None) -> None:
+            if entry is not None:
+                self.input_bar.value = entry
+                self.input_bar.cursor_position = len(entry)
+            self.input_bar.focus()
+
+        self.push_screen(HistorySearchScreen(self.input_history, self.input_bar.value), use)
+
+    def start_compaction(self, instructions: str | None = None, keep_recent: bool = True, tab: SessionTab | None = None) -> None:
+        """Fold old history into the running summary on a background worker."""
+        tab = tab or self.tab
+        self._run_background(tab, self._compact(tab, instructions, keep_recent), "compaction")
+
+    async def _compact(self, tab: SessionTab, instructions: str | None, keep_recent: bool) -> None:
+        # Summarizing is a model request too, so it waits its turn like a reply
+        async with self.scheduler.slot(tab.id):
+            result = await tab.session.compact_async(instructions, keep_recent=keep_recent)
+        # Auto-compaction stays quiet unless something went wrong
+        if not keep_recent or not result.startswith("✅"):
+            tab.chat_view.add_message("system", result)
+
+    def _show_cache_status(self, tab: SessionTab, data: dict) -> None:
+        """Show whether the reply came from the response cache (nothing when the cache is off)."""
+        if self.client.cache is not None:
+            tab.status_bar.cache_status = data.get("cache", "bypass")
+
+    def _maybe_compact(self, tab: SessionTab) -> None:
+        if tab.session.needs_compaction:
+            self.start_compaction(tab=tab)
+
+    def _remember(self, tab: SessionTab, user_text: str, response: str) -> None:
+        """Embed a completed turn into the session's long-term memory in the background."""
+        if tab.session.memory is not None and not self.client.is_error_reply(response):
+            self._run_background(tab, self._embed_turn(tab, user_text, response), "memory")
+
+    def _run_background(self, tab: SessionTab, work: Awaitable[None], group: str) -> None:
+        """Run ``work`` on a worker owned by ``tab``, so closing the tab cancels it."""
+        tab.background = {worker for worker in tab.background if not worker.is_finished}
+        tab.background.add(self.run_worker(work, group=group))
+
+    async def _embed_turn(self, tab: SessionTab, user_text: str, response: str) -> None:
+        # An embedding is a backend request too, so it takes a scheduler slot
+        try:
+            async with self.scheduler.slot(tab.id):
+                await tab.session.remember(user_text, response)
+        except Exception as e:
+            tab.status_bar.update_status(f"Memory not updated: {escape(str(e))}")
+
+    def cancel_generation(self, keep_partial: bool | None = None) -> bool:
+        """
+        Abort the active tab's reply. Closing its HTTP request makes Ollama stop
+        generating; ``keep_partial`` overrides the ``cancel_keep_partial`` setting.
+        Returns False if nothing was in flight.
+        """
+        if self.tab.generation is None:
+            return False
+        if keep_partial is not None:
+            self.tab.keep_partial = keep_partial
+        self.tab.generation.cancel()
+        return True
+
+    def action_cancel_generation(self) -> None:
+        """Cancel the in-flight reply (Ctrl+G)."""
+        self.cancel_generation()
 
     def action_toggle_mouse(self) -> None:
         """Show information about text copying."""
@@ -83,8 +400,8 @@ class DeltaStrikApp(App):
 
     async def on_key(self, event: events.Key) -> None:
         """Handle global key bindings for focus management."""
-        # Press Escape to focus chat view for scrolling
-        if event.key == "escape":
+        # Press Escape to focus chat view for scrolling (other screens, e.g. /compare, use it to close)
+        if event.key == "escape" and len(self.screen_stack) == 1:
             if self.chat_view.has_focus:
                 # If already in chat view, return to input
                 self.input_bar.focus()
@@ -100,46 +417,225 @@ class DeltaStrikApp(App):
         if not user_text:
             return
 
+        # The real request supersedes any warm-up for the draft
+        self._cancel_prefill()
+
         # Add to command history
         self.input_bar.add_to_history(user_text)
 
+        if user_text.startswith("/") and self.session.store is not None:
+            # Commands that read the store flush it first; wait for queued writes here, off the event loop
+            await self.session.store.aflush()
         command_response = self.command_handler.handle(user_text)
-        if command_response:
-            self.chat_view.add_message("system", command_response)
+        if command_response is not None:
+            if command_response:
+                self.chat_view.add_message("system", command_response)
             return
-        # Display user message
-        self.chat_view.add_message("user", user_text)
+
+        tab = self.tab
+        if tab.generation is not None:
+            # One reply at a time per tab: the message waits until this one finishes or is cancelled
+            tab.pending.append(user_text)
+            tab.status_bar.queued = len(tab.pending)
+            return
+        self._start_generation(tab, user_text)
+
+    # ----------------------------------------------------------
+    # Speculative prefill
+    # ----------------------------------------------------------
+    def on_input_changed(self, event: Input.Changed) -> None:
+        """Debounce typing: once the draft sits idle, warm the KV cache for it (``prefill``)."""
+        if self._prefill_timer is not None:
+            self._prefill_timer.stop()
+            self._prefill_timer = None
+        if self.config.get("prefill", False) and event.value.strip():
+            self._prefill_timer = self.set_timer(self.config.get("prefill_idle_ms", 600) / 1000, self._start_prefill)
+
+    def _start_prefill(self) -> None:
+        self._prefill_timer = None
+        tab = self.tab
+        draft = self.input_bar.value.strip()
+        if not draft or draft.startswith("/") or tab.generation is not None or tab.prefill is not None:
+            return
+        # The prompt prefix only changes with the history, so one warm-up per turn is enough
+        key = (tab.session.session_id, tab.session.conversation_length, self.system_prompt, self.client.model)
+        if key != tab.prefilled:
+            tab.prefill = self.run_worker(self._prefill(tab, draft, key), group="prefill")
+
+    async def _prefill(self, tab: SessionTab, draft: str, key: tuple) -> None:
+        """Send the prompt the draft would go out with, generating nothing, so only new tokens are left to evaluate."""
+        try:
+            # Never queued: a warm-up only uses a slot no real request is waiting for
+            if not self.scheduler.try_acquire():
+                return
+            try:
+                history = await tab.session.abuild_context(self.system_prompt, draft)
+                data = await self.client.aprefill(self.system_prompt, draft, history, build_runtime_context(self.config))
+            finally:
+                self.scheduler.release()
+            if data.get("done"):
+                tab.prefilled = key
+        finally:
+            tab.prefill = None
+
+    def _cancel_prefill(self, tab: SessionTab | None = None) -> None:
+        """Stop the pending warm-up timer and ``tab``'s (default: the active tab's) warm-up."""
+        tab = tab or self.tab
+        if self._prefill_timer is not None:
+            self._prefill_timer.stop()
+            self._prefill_timer = None
+        if tab.prefill is not None:
+            # Closing the request stops Ollama mid-prompt; whatever it evaluated stays cached
+            tab.prefill.cancel()
+            tab.prefill = None
+
+    def _start_generation(self, tab: SessionTab, user_text: str) -> None:
+        """Show the user message and generate the reply on a cancellable worker."""
+        tab.chat_view.add_message("user", user_text)
         # Show processing indicator
-        self.chat_view.add_processing_indicator()
-        self.status_bar.update_status("Thinking...")
+        tab.chat_view.add_processing_indicator()
+        tab.status_bar.update_status("Thinking...")
+        tab.keep_partial = self.config.get("cancel_keep_partial", True)
+        tab.generation = self.run_worker(self._generate(tab, user_text), group="generation")
 
-        # Yield to event loop to allow UI to update before blocking API call
-        await asyncio.sleep(0.01)
+    async def _generate(self, tab: SessionTab, user_text: str) -> None:
+        try:
+            if self.client.stream:
+                await self._stream_reply(tab, user_text)
+            else:
+                await self._query_reply(tab, user_text)
+        finally:
+            tab.generation = None
+            # Via the message queue, so nothing is dispatched once the app is shutting down
+            self.call_later(self._dispatch_next, tab)
 
+    def _dispatch_next(self, tab: SessionTab) -> None:
+        """Send the tab's oldest queued message, if any."""
+        if tab.generation is None and tab.pending:
+            user_text = tab.pending.popleft()
+            tab.status_bar.queued = len(tab.pending)
+            self._start_generation(tab, user_text)
+
+    async def _query_reply(self, tab: SessionTab, user_text: str) -> None:
+        """Fetch the whole reply in one request, then commit it to the session."""
+        session, chat_view, status_bar = tab.session, tab.chat_view, tab.status_bar
         start = time.time()
         try:
-            # Run the blocking HTTP call in a background thread to keep UI responsive
-            response = await asyncio.to_thread(
-                self.client.query,
-                prompt=self.system_prompt,
-                user_message=user_text,
-                history=self.session.history,
-            )
-
-            self.session.add_user_message(user_text)
-            self.session.add_assistant_message(response)
+            async with self.scheduler.slot(tab.id):
+                # Timed from admission: waiting for a free slot isn't model latency
+                start = time.time()
+                history = await session.abuild_context(self.system_prompt, user_text)
+                # The async client runs on the event loop, so the UI stays responsive
+                response, data = await self.client.aquery_response(
+                    prompt=self.system_prompt,
+                    user_message=user_text,
+                    history=history,
+                    runtime_context=build_runtime_context(self.config),
+                )
             latency = int((time.time() - start) * 1000)
+            if data.get("done"):
+                status_bar.update_metrics(session.record_response(data, latency))
+            self._show_cache_status(tab, data)
+
+            session.add_user_message(user_text)
+            session.add_assistant_message(response)
+            self._maybe_compact(tab)
+            self._remember(tab, user_text, response)
 
             # Remove processing indicator before showing response
-            self.chat_view.remove_processing_indicator()
-            self.chat_view.add_message("assistant", response)
-            self.status_bar.update_status("Ready", latency)
+            chat_view.remove_processing_indicator()
+            chat_view.add_message("assistant", response)
+            status_bar.update_status("Ready", latency)
+
+        except asyncio.CancelledError:
+            chat_view.remove_processing_indicator()
+            self._note_cancelled(tab, user_text, "", start)
+            raise
 
         except Exception as e:
             # Remove processing indicator before showing error
-            self.chat_view.remove_processing_indicator()
-            self.chat_view.add_message("assistant", f"[red]Error:[/red] {e}")
-            self.status_bar.update_status("Error")
+            chat_view.remove_processing_indicator()
+            chat_view.add_message("assistant", f"[red]Error:[/red] {e}")
+            status_bar.update_status("Error")
+
+    async def _stream_reply(self, tab: SessionTab, user_text: str) -> None:
+        """Stream the reply token by token into the tab's chat view, then commit it to the session."""
+        session, chat_view, status_bar = tab.session, tab.chat_view, tab.status_bar
+        parts: list[str] = []
+        ttft: int | None = None
+        start = first_token_at = time.time()
+        try:
+            async with self.scheduler.slot(tab.id):
+                # Timed from admission: waiting for a free slot isn't model latency
+                start = time.time()
+                history = await session.abuild_context(self.system_prompt, user_text)
+                chunks = self.client.astream_query(
+                    prompt=self.system_prompt,
+                    user_message=user_text,
+                    history=history,
+                    runtime_context=build_runtime_context(self.config),
+                )
+                # aclosing: however the loop ends, the generator (and its HTTP connection) is closed at once
+                async with aclosing(chunks) as stream:
+                    async for chunk in stream:
+                        text = self.client.chunk_text(chunk)
+                        if text:
+                            if ttft is None:
+                                first_token_at = time.time()
+                                ttft = int((first_token_at - start) * 1000)
+                                chat_view.begin_stream()
+                                status_bar.update_status("Streaming...", ttft_ms=ttft)
+                            parts.append(text)
+                            chat_view.append_stream(text)
+                            # Ollama streams one token per chunk, so chunks/sec is a live tok/s estimate
+                            elapsed = time.time() - first_token_at
+                            if elapsed > 0:
+                                status_bar.show(tokens_per_sec=(len(parts) - 1) / elapsed)
+                        if chunk.get("done"):
+                            if not chunk.get("error"):
+                                # Server-side timings replace the live estimate; a low prompt_eval_count
+                                # means the KV cache prefix was reused
+                                metrics = session.record_response(chunk, int((time.time() - start) * 1000), ttft)
+                                status_bar.update_metrics(metrics)
+                            self._show_cache_status(tab, chunk)
+                            break
+
+            chat_view.end_stream()
+            response = "".join(parts)
+            if ttft is None:
+                # Nothing streamed (empty reply); still show an assistant turn
+                chat_view.remove_processing_indicator()
+                chat_view.add_message("assistant", response)
+
+            session.add_user_message(user_text)
+            session.add_assistant_message(response)
+            self._maybe_compact(tab)
+            self._remember(tab, user_text, response)
+            latency = int((time.time() - start) * 1000)
+            status_bar.update_status("Ready", latency)
+
+        except asyncio.CancelledError:
+            chat_view.end_stream()
+            chat_view.remove_processing_indicator()
+            self._note_cancelled(tab, user_text, "".join(parts), start)
+            raise
+
+        except Exception as e:
+            chat_view.end_stream()
+            chat_view.remove_processing_indicator()
+            chat_view.add_message("assistant", f"[red]Error:[/red] {e}")
+            status_bar.update_status("Error")
+
+    def _note_cancelled(self, tab: SessionTab, user_text: str, partial: str, start: float) -> None:
+        """Record a cancelled turn: the partial reply goes into history only if asked to keep it."""
+        kept = tab.keep_partial and bool(partial)
+        if kept:
+            tab.session.add_user_message(user_text)
+            tab.session.add_assistant_message(partial)
+            self._maybe_compact(tab)
+        note = "partial reply kept in history" if kept else "not added to history"
+        tab.chat_view.add_message("system", f"[yellow]Reply cancelled[/yellow] ({note}).")
+        tab.status_bar.update_status("Cancelled", int((time.time() - start) * 1000))
 
 
 if __name__ == "__main__":
@@ -1,18 +1,322 @@
 """
 Chat log view for DeltaStrik's terminal UI.
 Displays user and AI messages in a scrollable, auto-updating panel.
+
+Each message is its own widget holding a memoized Rich renderable, so appending
+a message or streaming into the last reply only re-renders that one message.
+Only the newest ``max_mounted`` messages are mounted; older ones are paged back
+in when the user scrolls to the top. A view in a background tab keeps
+collecting streamed text but renders it only once it is shown again.
+Given a ``FrameScheduler``, streamed text, scrolling to the bottom and
+trimming the window are applied once per frame rather than per fragment or
+message.
+
+Replies longer than ``OFFLOAD_CHARS`` are rendered (Markdown, syntax
+highlighting, panel) in a worker thread to lines at the view's width, since
+a long code answer takes long enough to stall input and scrolling. Until the
+lines are ready the reply shows as plain text; after that it is drawn from
+them line by line, and while it streams it shows the last finished render
+until the next one is done. Rendered lines are cached on (content hash,
+width), so scrolling back to a reply or switching tabs doesn't render it
+again; only a resize does.
+
+While a reply streams, its finished Markdown blocks (everything before the
+last blank line outside a code fence) are rendered once and kept as lines;
+each frame only parses the block still being written. The finished reply is
+rendered whole once, so a block split mid-stream looks right in the end.
 """
 
+import asyncio
+import re
+from collections import OrderedDict
 from textual.containers import VerticalScroll
+from textual.geometry import Size
+from textual.strip import Strip
 from textual.widgets import Static
-from textual.reactive import reactive
 from textual import events
-from rich.markdown import Markdown
+from textual.message import Message
+from rich.console import Console, ConsoleOptions, RenderResult
 from rich.panel import Panel
+from rich.segment import Segment
+from rich.style import Style
 from rich.text import Text
-from rich.console import Group
-from typing import Any
-from typing import Union
+from typing import TYPE_CHECKING, Callable, Sequence, Union
+
+from deltastrik.tui.frame_scheduler import FrameScheduler
+from deltastrik.utils.logging_utils import setup_logger
+
+if TYPE_CHECKING:
+    from rich.markdown import Markdown
+
+logger = setup_logger("chat_view")
+
+# Assistant replies longer than this (in characters) are rendered off the event loop
+OFFLOAD_CHARS = 2000
+# Rendered replies kept, keyed on (content hash, width)
+RENDER_CACHE_SIZE = 64
+PLACEHOLDER_STYLE = Style(dim=True)
+# A line opening or closing a fenced code block
+FENCE_RE = re.compile(r"^ {0,3}(?:```|~~~)", re.MULTILINE)
+# A block that may continue the one before it across a blank line (list item, indented text)
+CONTINUATION_RE = re.compile(r"[ \t]|[-*+][ \t]|\d{1,9}[.)][ \t]")
+
+Rendered = tuple[list[Strip], int]  # lines and the widest line's width
+_rendered: "OrderedDict[tuple[int, int], Rendered]" = OrderedDict()
+
+# role -> (title, title style, border style)
+ROLE_STYLES = {
+    "user": ("You:", "bold cyan", "cyan"),
+    "system": ("System:", "bold yellow", "yellow"),
+    "processing": ("Status:", "bold magenta", "magenta dim"),
+    "assistant": ("DeltaStrik:", "bold green", "green"),
+}
+
+
+def split_settled(content: str) -> tuple[str, str]:
+    """
+    Split streamed Markdown into finished blocks and the text still being
+    written, at the last blank line outside a code fence that doesn't lead
+    into a list (a list's items can go on after blank lines).
+    """
+    fences = [m.start() for m in FENCE_RE.finditer(content)]
+    pairs = list(zip(fences[::2], fences[1::2]))
+    # An unclosed fence is still being written, blank lines and all
+    cut = content.rfind("\n\n", 0, fences[-1] if len(fences) % 2 else len(content))
+    while cut > 0:
+        fence = next((opened for opened, closed in pairs if opened < cut < closed), None)
+        if fence is not None:
+            cut = content.rfind("\n\n", 0, fence)
+        elif CONTINUATION_RE.match(content, cut + 2):
+            cut = content.rfind("\n\n", 0, cut)
+        else:
+            break
+    if cut <= 0:
+        return "", content
+    return content[:cut], content[cut + 2 :]
+
+
+class StreamingMarkdown:
+    """
+    Markdown body of a reply that is still streaming. Finished blocks are
+    rendered once per width and kept as lines; new ones are rendered onto them
+    as they finish, and only the tail is parsed again on every render.
+    """
+
+    def __init__(self) -> None:
+        self.content = ""
+        self._settled = ""  # text whose lines are in _lines
+        self._lines: list[list[Segment]] = []
+        self._width = 0
+        self._after_rule = False  # the last settled block is a horizontal rule
+
+    def update(self, content: str) -> "StreamingMarkdown":
+        self.content = content
+        return self
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        from rich.markdown import Markdown
+
+        settled, tail = split_settled(self.content)
+        if options.max_width != self._width or not settled.startswith(self._settled):
+            self._settled, self._lines, self._width = "", [], options.max_width
+        if len(settled) > len(self._settled):
+            # Starts at a block boundary, so it renders the same on its own
+            markdown = Markdown(settled[len(self._settled) :])
+            if self._separated(markdown):
+                self._lines.append([])
+            self._lines.extend(console.render_lines(markdown, options, pad=False))
+            self._settled = settled
+            self._after_rule = bool(markdown.parsed) and markdown.parsed[-1].type == "hr"
+        new_line = Segment.line()
+        for line in self._lines:
+            yield from line
+            yield new_line
+        if tail.strip():
+            markdown = Markdown(tail)
+            if self._separated(markdown):
+                yield new_line
+            yield markdown
+
+    def _separated(self, markdown: "Markdown") -> bool:
+        """Whether Markdown puts a blank line between the settled blocks and ``markdown``."""
+        # Rules leave no gap after them; block quotes, lists and tables start with their own
+        if not self._lines or self._after_rule or not markdown.parsed:
+            return False
+        return markdown.parsed[0].type not in ("blockquote_open", "bullet_list_open", "ordered_list_open", "table_open")
+
+
+def render_message(role: str, content: str, stream: StreamingMarkdown | None = None) -> Panel:
+    """Build the Rich panel for a single chat message (``stream``: an assistant reply still streaming)."""
+    title, title_style, border_style = ROLE_STYLES.get(role, ROLE_STYLES["assistant"])
+    header = Text(title, style=title_style)
+    body: Union[Text, "Markdown", StreamingMarkdown]
+    if role in ("user", "system"):
+        body = Text.from_markup(content)
+    elif role == "processing":
+        body = Text.from_markup(f"[italic]{content}[/italic]")
+    else:  # assistant
+        # Deferred: markdown-it is a noticeable share of startup and only needed once a reply arrives
+        from rich.markdown import Markdown
+
+        try:
+            body = stream.update(content) if stream is not None else Markdown(content)
+        except Exception:
+            body = Text.from_markup(content)
+    return Panel(body, title=header, border_style=border_style, expand=False)
+
+
+def render_lines(role: str, content: str, width: int, console: Console, stream: StreamingMarkdown | None = None) -> Rendered:
+    """The message's panel rendered to lines at ``width``. Safe to call from a worker thread."""
+    lines = console.render_lines(render_message(role, content, stream), console.options.update_width(width), pad=False)
+    # Measured here rather than on the event loop, which only draws the visible lines
+    strips = [Strip(line, Segment.get_line_length(line)) for line in lines]
+    return strips, max((strip.cell_length for strip in strips), default=0)
+
+
+def placeholder_lines(role: str, content: str) -> tuple[list[Strip | str], int]:
+    """
+    The message as unformatted lines (no wrapping), shown while the real render
+    is made. Lines stay strings until drawn: building thousands of Strips up
+    front would cost about as much as the stall this avoids.
+    """
+    title, title_style, _ = ROLE_STYLES.get(role, ROLE_STYLES["assistant"])
+    lines: list[Strip | str] = [Strip([Segment(title, Style.parse(title_style))])]
+    lines.extend(content.expandtabs().splitlines())
+    # Characters, not cells: close enough for a stand-in, and the longest lines are cropped anyway
+    return lines, max(map(len, lines[1:]), default=len(title))
+
+
+class MessageWidget(Static):
+    """
+    A single chat message. The panel is rebuilt only when the content changes;
+    Textual caches the rendered lines until then. A long assistant reply is
+    instead drawn from lines rendered in a worker (see the module docstring).
+    """
+
+    def __init__(self, role: str, content: str, index: int, streaming: bool = False):
+        self.role = role
+        self.body_text = content
+        self.index = index  # position in ChatView.messages
+        self.stream = StreamingMarkdown() if streaming else None  # until finish_stream()
+        self._strips: Sequence[Strip | str] | None = None  # lines shown for an offloaded reply (str: placeholder)
+        self._strips_width = 0  # widest of them
+        self._shown: tuple[int, int] | None = None  # cache key of the strips, None for the placeholder
+        self._width = 0  # width available to the panel, from the last layout
+        self._rendering = False
+        super().__init__("" if self.offloaded else render_message(role, content))
+
+    @property
+    def offloaded(self) -> bool:
+        return self.role == "assistant" and len(self.body_text) > OFFLOAD_CHARS
+
+    @property
+    def render_pending(self) -> bool:
+        """True while an offloaded reply shows its placeholder or an older render."""
+        return self.offloaded and self._shown != (hash(self.body_text), self._width)
+
+    def set_content(self, content: str) -> None:
+        """Replace the message body and re-render just this widget."""
+        if content == self.body_text:
+            return
+        self.body_text = content
+        if self.offloaded:
+            self._request_render()
+        else:
+            self._strips = self._shown = None
+            self.update(render_message(self.role, content, self.stream))
+
+    def finish_stream(self) -> None:
+        """Render the finished reply whole, replacing the block-by-block streaming render."""
+        if self.stream is None:
+            return
+        self.stream = None
+        if self.offloaded:
+            self._shown = None  # the streaming render stays up until the full one is ready
+            self._request_render()
+        else:
+            self.update(render_message(self.role, self.body_text))
+
+    # ----------------------------------------------------------
+    # Offloaded rendering
+    # ----------------------------------------------------------
+    def _request_render(self) -> None:
+        """Show the current content's lines if cached, else render them in a worker."""
+        if not self.offloaded or not self._width:
+            return
+        key = (hash(self.body_text), self._width)
+        if key == self._shown:
+            return
+        # Streaming renders aren't cached: each is shown once, then superseded
+        cached = _rendered.get(key) if self.stream is None else None
+        if cached is not None:
+            _rendered.move_to_end(key)
+            self._show(*cached, key)
+            return
+        if self._strips is None:
+            self._show(*placeholder_lines(self.role, self.body_text), None)
+        if self._rendering:
+            return  # the running render asks again when it finishes
+        self._rendering = True
+        self.run_worker(self._render_offloaded(self.body_text, self._width, self.stream), group="render")
+
+    async def _render_offloaded(self, content: str, width: int, stream: StreamingMarkdown | None) -> None:
+        try:
+            rendered = await asyncio.to_thread(render_lines, self.role, content, width, self.app.console, stream)
+        except Exception as e:
+            logger.warning("Could not render a reply (%d chars): %s", len(content), e)
+            return
+        finally:
+            self._rendering = False
+        key = (hash(content), width)
+        if stream is None:
+            _rendered[key] = rendered
+            while len(_rendered) > RENDER_CACHE_SIZE:
+                _rendered.popitem(last=False)
+        elif stream is self.stream:
+            self._show(*rendered, key)
+        # Picks up this render, or starts the next one if the content or width moved on meanwhile
+        self._request_render()
+
+    def _show(self, strips: Sequence[Strip | str], strips_width: int, key: tuple[int, int] | None) -> None:
+        parent = self.parent
+        # The chat view to keep scrolled to the bottom, if it is there now
+        follow = parent if isinstance(parent, ChatView) and parent._at_bottom() else None
+        self._strips = strips
+        self._strips_width = strips_width
+        self._shown = key
+        self.refresh(layout=True)
+        if follow is not None:
+            self.call_after_refresh(follow._scroll_to_bottom)
+
+    def _laid_out(self, container: Size) -> None:
+        """Note the width layout offers the panel; a new one is rendered for once layout is done."""
+        if container.width != self._width:
+            self._width = container.width
+            if self.offloaded:
+                self.call_later(self._request_render)
+
+    def get_content_width(self, container: Size, viewport: Size) -> int:
+        self._laid_out(container)
+        if not self.offloaded:
+            return super().get_content_width(container, viewport)
+        return min(self._strips_width, container.width) if self._strips is not None else container.width
+
+    def get_content_height(self, container: Size, viewport: Size, width: int) -> int:
+        self._laid_out(container)
+        if not self.offloaded:
+            return super().get_content_height(container, viewport, width)
+        return len(self._strips) if self._strips is not None else 1
+
+    def render_line(self, y: int) -> Strip:
+        if not self.offloaded or self._strips is None:
+            return super().render_line(y)
+        style = self.rich_style
+        if y >= len(self._strips):
+            return Strip.blank(self.size.width, style)
+        line = self._strips[y]
+        if isinstance(line, str):
+            line = Strip([Segment(line, PLACEHOLDER_STYLE)])
+        return line.apply_style(style).crop_extend(0, self.size.width, style)
 
 
 class ChatView(VerticalScroll):
@@ -20,48 +324,183 @@ class ChatView(VerticalScroll):
     A scrollable chat display area that renders user and assistant messages.
     """
 
-    messages: Any = reactive(list)
+    class OlderRequested(Message):
+        """Posted when the user scrolls past the oldest loaded message and more exist on disk."""
+
+        def __init__(self, chat_view: "ChatView"):
+            super().__init__()
+            self.chat_view = chat_view
+
+        @property
+        def control(self) -> "ChatView":
+            return self.chat_view
+
+    def __init__(self, max_mounted: int = 150, page_size: int = 50, frames: FrameScheduler | None = None):
+        super().__init__()
+        # Full transcript as (role, content); widgets exist only for the mounted window
+        self.messages: list[tuple[str, str]] = []
+        self.max_mounted = max_mounted
+        self.page_size = page_size
+        self._processing: MessageWidget | None = None
+        self._streaming: MessageWidget | None = None
+        # Set by the owner when older messages can be fetched from the session store
+        self.has_more_older = False
+        self.background = False  # hidden tab: streamed text is stored, not rendered
+        self.frames = frames  # None: updates are applied as they come
 
     def on_mount(self):
         """Called when the widget is mounted."""
         self.can_focus = True  # Enable focus for keyboard scrolling
-        # Create a static widget to hold content
-        self.content_widget = Static("")
-        self.mount(self.content_widget)
 
+    # ----------------------------------------------------------
+    # Messages
+    # ----------------------------------------------------------
     def add_message(self, role: str, content: str):
-        """Add a message and refresh."""
-        new_messages = self.messages.copy()
-        new_messages.append((role, content))
-        self.messages = new_messages
+        """Append a message and mount a widget for it."""
+        self.messages.append((role, content))
+        self._append_widget(MessageWidget(role, content, len(self.messages) - 1))
 
     def add_processing_indicator(self):
         """Add a temporary processing indicator."""
-        new_messages = self.messages.copy()
-        new_messages.append(("processing", "● Processing your request..."))
-        self.messages = new_messages
+        if self._processing is None:
+            self._processing = MessageWidget("processing", "● Processing your request...", -1)
+            self._append_widget(self._processing, trim=False)
 
     def remove_processing_indicator(self):
         """Remove the processing indicator if it exists."""
-        new_messages = self.messages.copy()
-        # Remove the last message if it's a processing indicator
-        if new_messages and new_messages[-1][0] == "processing":
-            new_messages.pop()
-        self.messages = new_messages
-
-    async def watch_messages(self, _):
-        """Automatically scroll to bottom whenever new messages appear."""
-        # Update content widget
-        if hasattr(self, "content_widget"):
-            self.content_widget.update(self._render_messages())
-            # Use multiple scroll attempts with delays to handle large content rendering
-            self.set_timer(0.05, self._scroll_to_bottom)
-            self.set_timer(0.15, self._scroll_to_bottom)
+        if self._processing is not None:
+            self._processing.remove()
+            self._processing = None
+
+    def begin_stream(self):
+        """Replace the processing indicator with an empty assistant reply to stream into."""
+        self.remove_processing_indicator()
+        self.messages.append(("assistant", ""))
+        self._streaming = MessageWidget("assistant", "", len(self.messages) - 1, streaming=True)
+        self._append_widget(self._streaming)
+
+    def append_stream(self, text: str):
+        """Append a streamed fragment to the assistant reply being built."""
+        if not text or self._streaming is None:
+            return
+        widget = self._streaming
+        role, content = self.messages[widget.index]
+        self.messages[widget.index] = (role, content + text)
+        if not self.background:
+            self._on_frame("stream", self._show_stream)
+
+    def _show_stream(self) -> None:
+        follow = self._at_bottom()
+        self._render_stream()
+        if follow:
+            self._on_frame("scroll", self._scroll_after_refresh)
+
+    def end_stream(self):
+        """Stop routing fragments to the current reply."""
+        # Whatever is still waiting for a frame goes out now; the frame itself then changes nothing
+        self._show_stream()
+        if self._streaming is not None:
+            self._streaming.finish_stream()
+        self._streaming = None
+
+    def set_background(self, background: bool) -> None:
+        """Hide or show this view; coming back renders whatever streamed in meanwhile."""
+        self.background = background
+        if not background and self._streaming is not None:
+            self._render_stream()
+            self.call_after_refresh(self._scroll_to_bottom)
+
+    def _render_stream(self) -> None:
+        if self._streaming is not None:
+            self._streaming.set_content(self.messages[self._streaming.index][1])
+
+    # ----------------------------------------------------------
+    # Windowing
+    # ----------------------------------------------------------
+    def _mounted_messages(self) -> list[MessageWidget]:
+        return [w for w in self.query_children(MessageWidget) if w.index >= 0]
+
+    def _append_widget(self, widget: MessageWidget, trim: bool = True) -> None:
+        follow = self._at_bottom()
+        if self._processing is not None and widget is not self._processing:
+            # Keep the indicator as the last item
+            self.mount(widget, before=self._processing)
+        else:
+            self.mount(widget)
+        if follow:
+            # Only drop old widgets while following the tail, never under a reader
+            if trim:
+                self._on_frame("trim", self._trim_window)
+            self._on_frame("scroll", self._scroll_after_refresh)
+
+    def _on_frame(self, key: str, update: Callable[[], None]) -> None:
+        """Apply ``update`` on the next frame, once however often it is asked for before then."""
+        if self.frames is None:
+            update()
+        else:
+            self.frames.schedule((self, key), update)
+
+    def _trim_window(self) -> None:
+        """Unmount the oldest widgets once the window exceeds max_mounted."""
+        mounted = self._mounted_messages()
+        excess = len(mounted) - self.max_mounted
+        if excess > 0:
+            self.remove_children(mounted[:excess])
+
+    def _page_in_older(self) -> None:
+        """Mount the page of messages just above the current window."""
+        mounted = self._mounted_messages()
+        first = mounted[0].index if mounted else len(self.messages)
+        if first <= 0:
+            if self.has_more_older:
+                self.post_message(self.OlderRequested(self))
+            return
+        start = max(0, first - self.page_size)
+        widgets = [MessageWidget(role, content, i) for i, (role, content) in enumerate(self.messages[start:first], start)]
+        height_before = self.virtual_size.height
+        self.mount_all(widgets, before=0)
+
+        def keep_position() -> None:
+            # Hold the viewport on the message the user was reading
+            self.scroll_to(y=self.scroll_y + self.virtual_size.height - height_before, animate=False)
+
+        self.call_after_refresh(keep_position)
+
+    def prepend_messages(self, messages: list[tuple[str, str]], has_more: bool) -> None:
+        """Insert older messages fetched from disk ahead of the transcript and show them."""
+        self.has_more_older = has_more
+        if not messages:
+            return
+        shift = len(messages)
+        for widget in self._mounted_messages():
+            widget.index += shift
+        self.messages = messages + self.messages
+        self._page_in_older()
+
+    def clear_messages(self) -> None:
+        """Drop the whole transcript and its widgets."""
+        self.messages = []
+        self._processing = None
+        self._streaming = None
+        self.has_more_older = False
+        self.remove_children()
+
+    def _at_bottom(self) -> bool:
+        return self.scroll_y >= self.max_scroll_y - 1
 
     def _scroll_to_bottom(self):
         """Helper to scroll to bottom."""
         self.scroll_end(animate=False)
 
+    def _scroll_after_refresh(self) -> None:
+        self.call_after_refresh(self._scroll_to_bottom)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        """Page older messages back in when the user reaches the top."""
+        super().watch_scroll_y(old_value, new_value)
+        if new_value <= 0 < old_value:
+            self._page_in_older()
+
     async def on_key(self, event: events.Key) -> None:
         """Handle keyboard scrolling events."""
         if event.key == "up":
@@ -82,37 +521,3 @@ class ChatView(VerticalScroll):
         elif event.key == "end":
             self.scroll_end(animate=True)
             event.prevent_default()
-
-    def _render_messages(self):
-        """Render chat messages using Rich components."""
-        rendered: list[Union[Panel, Text]] = []
-        for i, (role, content) in enumerate(self.messages):
-            body: Union[Text, Markdown]
-            if role == "user":
-                header = Text("You:", style="bold cyan")
-                body = Text.from_markup(content)
-                rendered.append(Panel(body, title=header, border_style="cyan", expand=False))
-
-            elif role == "system":
-                header = Text("System:", style="bold yellow")
-                body = Text.from_markup(content)
-                rendered.append(Panel(body, title=header, border_style="yellow", expand=False))
-
-            elif role == "processing":
-                header = Text("Status:", style="bold magenta")
-                body = Text.from_markup(f"[italic]{content}[/italic]")
-                rendered.append(Panel(body, title=header, border_style="magenta dim", expand=False))
-
-            else:  # assistant
-                header = Text("DeltaStrik:", style="bold green")
-                try:
-                    body = Markdown(content)
-                except Exception:
-                    body = Text.from_markup(content)
-                rendered.append(Panel(body, title=header, border_style="green", expand=False))
-
-            # Add spacing between messages (except after the last one)
-            if i < len(self.messages) - 1:
-                rendered.append(Text(""))
-
-        return Group(*rendered) if rendered else Text("")
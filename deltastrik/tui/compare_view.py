@@ -0,0 +1,177 @@
+# deltastrik/tui/compare_view.py
+"""
+Side-by-side model comparison for DeltaStrik.
+``/compare model-a,model-b <prompt>`` sends the session's context plus the
+prompt to each model and streams the replies into split panes, each footed by
+its TTFT, tokens/sec and token counts.
+
+Requests go through the app's RequestScheduler (per-endpoint caps), and at most
+``compare_models_per_endpoint`` models per healthy endpoint generate at once, so
+a four-way comparison doesn't make Ollama load all four into VRAM together.
+Models that are already loaded go first.
+"""
+
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from rich.markup import escape
+from textual.app import ComposeResult
+from textual.containers import Horizontal, Vertical, VerticalScroll
+from textual.screen import ModalScreen
+from textual.widgets import Static
+
+from deltastrik.core.metrics import ResponseMetrics
+from deltastrik.core.ollama_client import OllamaClient
+from deltastrik.core.scheduler import RequestScheduler
+from deltastrik.tui.frame_scheduler import FrameScheduler
+
+
+class ComparePane(Vertical):
+    """One model's streamed reply, with its stats underneath."""
+
+    def __init__(self, model: str, frames: Optional[FrameScheduler] = None):
+        super().__init__()
+        self.model = model
+        self.frames = frames  # None: each fragment is rendered as it comes
+        self.text = ""
+        self.ttft_ms: Optional[int] = None
+        self.metrics: Optional[ResponseMetrics] = None
+        self.error: Optional[str] = None
+        self.border_title = escape(model)
+        self._scroll = VerticalScroll()
+        self._body = Static("")
+        self._stats = Static("[dim]Waiting for a free slot...[/dim]", classes="compare-stats")
+
+    def compose(self) -> ComposeResult:
+        with self._scroll:
+            yield self._body
+        yield self._stats
+
+    def set_status(self, status: str) -> None:
+        self._stats.update(f"[dim]{status}[/dim]")
+
+    def append(self, text: str) -> None:
+        self.text += text
+        if self.frames is None:
+            self._show_text()
+        else:
+            # Parsed and rendered once per frame, not once per token
+            self.frames.schedule((self, "text"), self._show_text)
+
+    def _show_text(self) -> None:
+        # Deferred like in chat_view: markdown-it is only needed once a reply arrives
+        from rich.markdown import Markdown
+
+        follow = self._scroll.scroll_y >= self._scroll.max_scroll_y - 1
+        self._body.update(Markdown(self.text))
+        if follow:
+            self._scroll.call_after_refresh(self._scroll.scroll_end, animate=False)
+
+    def finish(self, metrics: ResponseMetrics) -> None:
+        self.metrics = metrics
+        self._stats.update(self.stats_line())
+
+    def fail(self, error: str) -> None:
+        self.error = error
+        self._stats.update(f"[red]{escape(error)}[/red]")
+
+    def stats_line(self) -> str:
+        m = self.metrics
+        if m is None:
+            return ""
+        parts = [
+            f"TTFT {m.ttft_ms} ms" if m.ttft_ms is not None else "TTFT -",
+            f"{m.tokens_per_sec:.1f} tok/s",
+            f"{m.prompt_eval_count}+{m.eval_count} tok",
+        ]
+        if m.load_duration_ms >= 1:
+            # A load here means the model was swapped into VRAM for this request
+            parts.append(f"load {m.load_duration_ms:.0f} ms")
+        return " | ".join(parts)
+
+
+class CompareScreen(ModalScreen[None]):
+    """Full-screen split view of one comparison; Escape closes it and cancels what is still running."""
+
+    BINDINGS = [("escape", "close", "Close Comparison")]
+
+    def __init__(
+        self,
+        client: OllamaClient,
+        scheduler: RequestScheduler,
+        owner: Hashable,
+        models: List[str],
+        request: Dict[str, Any],
+        prompts: Dict[str, str],
+        models_per_endpoint: int = 2,
+        frames: Optional[FrameScheduler] = None,
+        on_done: Optional[Callable[[str], None]] = None,
+    ):
+        super().__init__()
+        self.client = client
+        self.scheduler = scheduler
+        self.owner = owner  # scheduler owner: the comparison queues as part of its tab
+        self.request = request  # astream_query arguments shared by every model
+        self.prompts = prompts  # model -> its system prompt
+        self.models_per_endpoint = max(1, models_per_endpoint)
+        self.on_done = on_done
+        self.panes = [ComparePane(model, frames) for model in models]
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="compare-layout"):
+            yield Static(
+                f"[bold cyan]Comparing {len(self.panes)} models[/bold cyan] [dim](Esc to close)[/dim]",
+                id="compare-title",
+            )
+            with Horizontal(id="compare-panes"):
+                yield from self.panes
+
+    def on_mount(self) -> None:
+        # The screen's workers are cancelled with it, which closes the streams
+        self.run_worker(self._run_all(), group="compare")
+
+    def action_close(self) -> None:
+        self.dismiss()
+
+    async def _run_all(self) -> None:
+        router = self.client.router
+        # Refresh which models each endpoint has loaded, so warm ones start first
+        await router.probe_all()
+        order = sorted(self.panes, key=lambda p: not any(p.model in e.models for e in router.endpoints))
+        healthy = sum(1 for e in router.endpoints if e.healthy) or 1
+        limit = asyncio.Semaphore(self.models_per_endpoint * healthy)
+        await asyncio.gather(*(self._run_model(pane, limit) for pane in order))
+        if self.on_done is not None:
+            self.on_done(self.summary())
+
+    async def _run_model(self, pane: ComparePane, limit: asyncio.Semaphore) -> None:
+        async with limit, self.scheduler.slot(self.owner):
+            pane.set_status("Generating...")
+            start = time.time()
+            try:
+                async with aclosing(self.client.astream_query(self.prompts[pane.model], **self.request, model=pane.model)) as stream:
+                    async for chunk in stream:
+                        if chunk.get("error"):
+                            pane.fail(self.client.chunk_text(chunk) or str(chunk["error"]))
+                            return
+                        text = self.client.chunk_text(chunk)
+                        if text:
+                            if pane.ttft_ms is None:
+                                pane.ttft_ms = int((time.time() - start) * 1000)
+                            pane.append(text)
+                        if chunk.get("done"):
+                            wall_ms = int((time.time() - start) * 1000)
+                            pane.finish(ResponseMetrics.from_response(chunk, pane.model, wall_ms, pane.ttft_ms))
+                            return
+            except Exception as e:
+                pane.fail(f"Error: {e}")
+
+    def summary(self) -> str:
+        """Per-model results as a system message for the chat transcript."""
+        lines = ["[bold cyan]Model comparison:[/bold cyan]"]
+        for pane in self.panes:
+            result = f"[red]{escape(pane.error)}[/red]" if pane.error else pane.stats_line()
+            lines.append(f"  {escape(pane.model)}: {result}")
+        return "\n".join(lines)
@@ -0,0 +1,105 @@
+# deltastrik/tui/frame_scheduler.py
+"""
+Frame-budgeted UI updates for DeltaStrik.
+Streaming replies, status changes and scrolling arrive far more often than
+a terminal can show them: a fast model streams a hundred tokens a second
+per tab, and each one used to re-render its reply, reset the status bar and
+queue a scroll. Widgets hand those updates to a ``FrameScheduler`` under a
+key instead; it applies them at most ``fps`` times a second, and an update
+that is replaced before its frame (the same key again) is dropped, so only
+the latest state of each thing is ever drawn.
+
+Each frame is timed from applying its updates until Textual has painted
+them; ``stats`` shows whether the UI stays within the frame budget.
+"""
+
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional
+
+from textual.app import App
+from textual.timer import Timer
+
+from deltastrik.core.metrics import percentile
+from deltastrik.utils.logging_utils import setup_logger
+
+logger = setup_logger("frame_scheduler")
+
+# Frame times kept for the percentiles in stats()
+FRAME_HISTORY = 1000
+
+
+class FrameScheduler:
+    """
+    Coalesces UI updates into frames of at most ``fps`` per second.
+    The first update after a quiet spell is applied at once; later ones wait
+    for the next frame.
+    """
+
+    def __init__(self, app: App, fps: float = 30):
+        self.app = app
+        self.fps = fps
+        self._pending: Dict[Hashable, Callable[[], Any]] = {}  # key -> latest update, in order of first scheduling
+        self._timer: Optional[Timer] = None
+        self._last_frame = 0.0  # perf_counter() at the start of the last frame
+        self.frames = 0
+        self.updates = 0  # updates applied
+        self.superseded = 0  # updates replaced by a newer one before their frame
+        self.over_budget = 0  # frames that took longer than 1 / fps
+        self._frame_ms: Deque[float] = deque(maxlen=FRAME_HISTORY)
+
+    @property
+    def fps(self) -> float:
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps: float) -> None:
+        self._fps = max(1.0, float(fps))
+        self.interval = 1 / self._fps
+
+    def schedule(self, key: Hashable, update: Callable[[], Any]) -> None:
+        """Apply ``update`` on the next frame, replacing any update pending under ``key``."""
+        if key in self._pending:
+            self.superseded += 1
+        self._pending[key] = update
+        if self._timer is None:
+            # As soon as possible after the previous frame (Textual timers need a non-zero delay)
+            delay = max(0.001, self._last_frame + self.interval - time.perf_counter())
+            self._timer = self.app.set_timer(delay, self._frame, name="frame")
+
+    def _frame(self) -> None:
+        self._timer = None
+        if not self._pending:
+            return
+        start = self._last_frame = time.perf_counter()
+        pending, self._pending = self._pending, {}
+        for update in pending.values():
+            try:
+                update()
+            except Exception:
+                # One widget's failed update mustn't take the others' (or the app) with it
+                logger.exception("UI update failed")
+        self.frames += 1
+        self.updates += len(pending)
+        self.app.call_after_refresh(self._painted, start)
+
+    def _painted(self, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        self._frame_ms.append(elapsed * 1000)
+        if elapsed > self.interval:
+            self.over_budget += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Frame counts and frame times (ms, from applying updates until painted) against the budget."""
+        times = list(self._frame_ms)
+        return {
+            "fps": self.fps,
+            "budget_ms": round(self.interval * 1000, 1),
+            "frames": self.frames,
+            "updates": self.updates,
+            "superseded": self.superseded,
+            "over_budget": self.over_budget,
+            "frame_ms_p50": round(percentile(times, 50), 2),
+            "frame_ms_p95": round(percentile(times, 95), 2),
+            "frame_ms_max": round(max(times, default=0.0), 2),
+        }
@@ -0,0 +1,85 @@
+# deltastrik/tui/history_search.py
+"""
+Ctrl+R reverse search over the input history.
+A search box over a list of matches that is refreshed on every keystroke
+(fuzzy: the typed characters in order, tightest and newest first). Enter
+puts the highlighted entry into the input bar, Ctrl+R or Up/Down move
+through the matches, Escape keeps the draft as it was.
+"""
+
+from rich.text import Text
+from textual.app import ComposeResult
+from textual.containers import Vertical
+from textual.screen import ModalScreen
+from textual.widgets import Input, OptionList, Static
+
+from deltastrik.core.input_history import InputHistory
+
+# Matches listed per keystroke; the best ones come first, so more is just scrolling
+MAX_RESULTS = 50
+
+
+class HistorySearchScreen(ModalScreen[str | None]):
+    """Incremental search over earlier input; dismisses with the chosen entry, or None."""
+
+    BINDINGS = [
+        ("escape", "close", "Close Search"),
+        ("ctrl+r", "next_match", "Older Match"),
+        ("down", "next_match", "Next Match"),
+        ("up", "previous_match", "Previous Match"),
+    ]
+
+    def __init__(self, history: InputHistory, query: str = ""):
+        super().__init__()
+        self.history = history
+        self._query = query
+        self._search = Input(value=query, placeholder="Search earlier input...", id="history-query")
+        self._results = OptionList(id="history-results")
+        self._count = Static("", id="history-count")
+        self._matches: list[str] = []
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="history-search"):
+            yield self._search
+            yield self._results
+            yield self._count
+
+    def on_mount(self) -> None:
+        self._search.focus()
+        self._refresh(self._query)
+
+    def _refresh(self, query: str) -> None:
+        matches = self.history.search(query, MAX_RESULTS)
+        self._results.clear_options()
+        # One line per entry: a long prompt is cut at the edge instead of wrapping
+        self._results.add_options([Text(entry, no_wrap=True, overflow="ellipsis") for entry in matches])
+        if matches:
+            self._results.highlighted = 0
+        shown = f"{len(matches)}+" if len(matches) == MAX_RESULTS else str(len(matches))
+        self._count.update(f"[dim]{shown} of {len(self.history)} • Enter to use, Ctrl+R for older, Esc to cancel[/dim]")
+        self._matches = matches
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        # Handled here: the app's own Input handlers are for the message input bar
+        event.stop()
+        self._refresh(event.value)
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        event.stop()
+        self._choose(self._results.highlighted)
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        event.stop()
+        self._choose(event.option_index)
+
+    def _choose(self, index: int | None) -> None:
+        self.dismiss(self._matches[index] if index is not None and index < len(self._matches) else None)
+
+    def action_next_match(self) -> None:
+        self._results.action_cursor_down()
+
+    def action_previous_match(self) -> None:
+        self._results.action_cursor_up()
+
+    def action_close(self) -> None:
+        self.dismiss(None)
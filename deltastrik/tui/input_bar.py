@@ -2,18 +2,22 @@
 """
 User input widget for DeltaStrik.
 Handles keyboard input and emits an event when the user presses Enter.
-Supports command history navigation with up/down arrow keys.
+Supports command history navigation with up/down arrow keys, over the
+persistent input history shared by all sessions.
 """
 
 from textual.widgets import Input
 from textual import events
 from textual.suggester import Suggester
 
+from deltastrik.core.input_history import InputHistory
+
 
 class CommandSuggester(Suggester):
     """
-    Suggester for slash commands.
-    Provides autocomplete suggestions when user types commands starting with '/'.
+    Suggester for slash commands and earlier input.
+    Commands starting with '/' complete from COMMANDS first; anything else
+    completes to the newest matching entry of the input history.
     """
 
     # Available commands with descriptions
@@ -22,64 +26,75 @@ class CommandSuggester(Suggester):
         "/init": "Reset conversation and reload system prompt",
         "/clear": "Clear chat history",
         "/copy": "Show instructions for copying text",
+        "/pin": "Keep the latest message in context",
+        "/unpin": "Remove all pinned messages",
+        "/save": "Save this session",
+        "/load": "Resume a saved session",
+        "/sessions": "List saved sessions",
+        "/search": "Search all saved sessions",
+        "/open": "Open the session of a search hit",
+        "/stats": "Latency and token stats for this session",
+        "/cancel": "Stop the reply being generated",
+        "/compare": "Same prompt to several models side by side",
+        "/new": "Start another session in a new tab",
+        "/close": "Close this session tab",
         "/exit": "Exit the application",
         "/quit": "Exit the application",
     }
 
+    def __init__(self, history: InputHistory | None = None, **kwargs):
+        super().__init__(**kwargs)
+        self.history = history
+
     async def get_suggestion(self, value: str) -> str | None:
         """
         Return a suggestion based on the current input value.
-        Only suggests when input starts with '/'.
+        Commands win over history when input starts with '/'.
         """
-        if not value or not value.startswith("/"):
+        if not value:
             return None
 
-        # Convert input to lowercase for case-insensitive matching
-        value_lower = value.lower()
+        if value.startswith("/"):
+            # Convert input to lowercase for case-insensitive matching
+            value_lower = value.lower()
 
-        # Find the first command that starts with the input
-        for command in self.COMMANDS:
-            if command.startswith(value_lower) and command != value_lower:
-                # Return the rest of the command (after what user already typed)
-                return command
+            # Find the first command that starts with the input
+            for command in self.COMMANDS:
+                if command.startswith(value_lower) and command != value_lower:
+                    # Return the rest of the command (after what user already typed)
+                    return command
 
+        if self.history is not None:
+            return self.history.complete(value)
         return None
 
 
 class InputBar(Input):
     """
     Single-line input for chat messages with command history support.
-    Use Up/Down arrows to navigate through previous commands.
+    Use Up/Down arrows to navigate through previous commands (Ctrl+R searches them).
     """
 
-    def __init__(self, max_history: int = 100):
+    def __init__(self, history: InputHistory | None = None):
+        self.history = history if history is not None else InputHistory()
         super().__init__(
-            placeholder="Type your message here... (Use / for commands)",
-            suggester=CommandSuggester(use_cache=False, case_sensitive=False),
+            placeholder="Type your message here... (Use / for commands, Ctrl+R to search history)",
+            suggester=CommandSuggester(self.history, use_cache=False, case_sensitive=False),
         )
-        self.command_history: list[str] = []  # Stores previous commands
         self.history_index: int = -1  # Current position in history (-1 = not browsing)
         self.current_draft: str = ""  # Preserves what user is typing
-        self.max_history = max_history
+
+    @property
+    def command_history(self):
+        """Previous input, oldest first (deduplicated, shared with other sessions)."""
+        return self.history.entries
 
     def add_to_history(self, command: str) -> None:
         """
         Add a command to the history.
-        Skips empty commands and consecutive duplicates.
+        Skips empty commands; a repeated command moves to the newest position.
         """
-        command = command.strip()
-        if not command:
-            return
-
-        # Don't add if it's the same as the last command
-        if self.command_history and self.command_history[-1] == command:
-            return
-
-        self.command_history.append(command)
-
-        # Limit history size
-        if len(self.command_history) > self.max_history:
-            self.command_history.pop(0)
+        self.history.add(command)
 
         # Reset history navigation
         self.history_index = -1
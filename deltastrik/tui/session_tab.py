@@ -0,0 +1,32 @@
+# deltastrik/tui/session_tab.py
+"""
+One chat session as a tab in DeltaStrik's TUI.
+Each tab owns its history, transcript view, status line and in-flight reply;
+all tabs share the app's client (and its connection pools) and request scheduler.
+"""
+
+from collections import deque
+from textual.widgets import TabPane
+from textual.worker import Worker
+from deltastrik.core.session_manager import SessionManager
+from deltastrik.tui.chat_view import ChatView
+from deltastrik.tui.frame_scheduler import FrameScheduler
+from deltastrik.tui.status_bar import StatusBar
+
+
+class SessionTab(TabPane):
+    """A tab pane holding one session's ChatView, plus the state of its replies."""
+
+    def __init__(self, title: str, session: SessionManager, status_bar: StatusBar, id: str, frames: FrameScheduler | None = None):
+        self.pane_id = id  # ``id`` as a plain str, for TabbedContent (Widget.id is Optional)
+        self.session = session
+        self.chat_view = ChatView(frames=frames)
+        # Mounted in the app's footer, shown only while this tab is active
+        self.status_bar = status_bar
+        self.generation: Worker | None = None  # the reply being generated, if any
+        self.pending: deque[str] = deque()  # messages sent while a reply was in flight
+        self.keep_partial = True
+        self.prefill: Worker | None = None  # cache warm-up for the draft being typed, if any
+        self.prefilled: tuple | None = None  # what the last completed warm-up covered
+        self.background: set[Worker] = set()  # compaction and memory workers, cancelled when the tab closes
+        super().__init__(title, self.chat_view, id=id)
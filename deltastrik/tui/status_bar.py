@@ -1,18 +1,19 @@
 # deltastrik/tui/status_bar.py
 """
 Status bar widget for DeltaStrik.
-Displays model name, connection status, and latency.
+Displays model name, connection status, latency and generation speed.
+Given a ``FrameScheduler``, changes made through ``update_status``,
+``update_metrics`` and ``show`` are applied together once per frame, so a
+live tok/s figure set on every streamed token costs one repaint per frame.
 """
 
 from datetime import datetime
 from textual.widget import Widget
 from textual.reactive import reactive
 from rich.text import Text
-from deltastrik.core.config import load_config
-from typing import Any
+from typing import Any, Dict
 
-model_name: str = load_config()["model"]
-connection_status: str = load_config().get("connection_status", "Active")
+from deltastrik.tui.frame_scheduler import FrameScheduler
 
 
 class StatusBar(Widget):
@@ -20,10 +21,26 @@ class StatusBar(Widget):
     Displays model name, connection status, and latency.
     """
 
-    model_name: Any = reactive(model_name)
-    connection_status: Any = reactive(connection_status)
+    model_name: Any = reactive("")
+    connection_status: Any = reactive("Active")
     status: Any = reactive("Ready")  # e.g. "Ready", "Thinking", "Error"
     latency_ms: Any | None = reactive(None)  # e.g. 320
+    ttft_ms: Any | None = reactive(None)  # time to first streamed token
+    prompt_eval_count: Any | None = reactive(None)  # prompt tokens evaluated last turn
+    tokens_per_sec: Any | None = reactive(None)  # live while streaming, server-measured once done
+    prompt_eval_ms: Any | None = reactive(None)  # server time spent on the prompt last turn
+    eval_ms: Any | None = reactive(None)  # server time spent generating last turn
+    cache_status: Any | None = reactive(None)  # "hit", "miss" or "bypass" when the response cache is on
+    queued: Any = reactive(0)  # messages waiting for the current reply to finish
+    queue_position: Any | None = reactive(None)  # place in the shared request queue while waiting for a slot
+
+    def __init__(self, model_name: str = "", connection_status: str = "Active", id: str | None = None, frames: FrameScheduler | None = None):
+        super().__init__(id=id)
+        # Injected by the app from the already-loaded config
+        self.set_reactive(StatusBar.model_name, model_name)
+        self.set_reactive(StatusBar.connection_status, connection_status)
+        self.frames = frames  # None: changes are applied as they come
+        self._changes: Dict[str, Any] = {}  # field -> value waiting for the next frame
 
     def render(self) -> Text:
         """
@@ -31,7 +48,7 @@ class StatusBar(Widget):
         """
         # Add indicator based on status
         status_indicator = ""
-        if self.status.lower() == "thinking...":
+        if self.status.lower() in ("thinking...", "streaming..."):
             status_indicator = "⏳ "
         elif self.status.lower() == "ready":
             status_indicator = "✓ "
@@ -44,9 +61,30 @@ class StatusBar(Widget):
             f"{status_indicator}{self.status}",
         ]
 
+        if self.queue_position is not None:
+            parts.append(f"Queue: #{self.queue_position}")
+
+        if self.queued:
+            parts.append(f"Queued: {self.queued}")
+
+        if self.ttft_ms is not None:
+            parts.append(f"TTFT: {self.ttft_ms} ms")
+
         if self.latency_ms is not None:
             parts.append(f"Latency: {self.latency_ms} ms")
 
+        if self.prompt_eval_count is not None:
+            parts.append(f"Prompt eval: {self.prompt_eval_count} tok")
+
+        if self.tokens_per_sec is not None:
+            parts.append(f"{self.tokens_per_sec:.1f} tok/s")
+
+        if self.prompt_eval_ms is not None and self.eval_ms is not None:
+            parts.append(f"Prompt/Gen: {self.prompt_eval_ms:.0f}/{self.eval_ms:.0f} ms")
+
+        if self.cache_status is not None:
+            parts.append(f"Cache: {self.cache_status}")
+
         # Timestamp for freshness
         ts = datetime.now().strftime("%H:%M:%S")
         parts.append(f"⏱ {ts}")
@@ -60,9 +98,36 @@ class StatusBar(Widget):
         return Text(text, style=style, justify="center")
 
     # convenience methods
-    def update_status(self, status: str, latency_ms: int | None = None):
-        """Update the displayed status and optional latency."""
-        self.status = status
+    def update_status(self, status: str, latency_ms: int | None = None, ttft_ms: int | None = None):
+        """Update the displayed status and optional latency / time-to-first-token."""
+        changes: Dict[str, Any] = {"status": status}
         if latency_ms is not None:
-            self.latency_ms = latency_ms
-        self.refresh()
+            changes["latency_ms"] = latency_ms
+        if ttft_ms is not None:
+            changes["ttft_ms"] = ttft_ms
+        self.show(**changes)
+
+    def update_metrics(self, metrics) -> None:
+        """Show the server-side stats of a finished reply (a ResponseMetrics record)."""
+        changes: Dict[str, Any] = {
+            "prompt_eval_count": metrics.prompt_eval_count,
+            "prompt_eval_ms": metrics.prompt_eval_ms,
+            "eval_ms": metrics.eval_ms,
+        }
+        if metrics.eval_ms:
+            changes["tokens_per_sec"] = metrics.tokens_per_sec
+        self.show(**changes)
+
+    def show(self, **changes: Any) -> None:
+        """Set the given fields on the next frame; a field set again before then keeps only its last value."""
+        self._changes.update(changes)
+        if self.frames is None:
+            self._apply_changes()
+        else:
+            self.frames.schedule((self, "status"), self._apply_changes)
+
+    def _apply_changes(self) -> None:
+        changes, self._changes = self._changes, {}
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self.refresh()  # the timestamp moves even if nothing else changed
@@ -1,37 +1,133 @@
+import atexit
+import hashlib
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+from typing import Any, Dict, List, Optional
 
+# Logs live under the user's DeltaStrik directory, not whatever the CWD happens to be
+DEFAULT_LOG_DIR = os.environ.get("DELTASTRIK_LOG_DIR", os.path.expanduser("~/.deltastrik/logs"))
+DEFAULT_LOG_LEVEL = os.environ.get("DELTASTRIK_LOG_LEVEL", "INFO").upper()
+# Stderr sits under the Textual screen, so console output is opt-in: "1" for WARNING, or a level name
+CONSOLE_LOG_LEVEL = os.environ.get("DELTASTRIK_LOG_CONSOLE", "").upper()
 
-def setup_logger(name: str = "deltastrik", log_dir: str = "logs") -> logging.Logger:
-    """Configure and return a named logger."""
-    os.makedirs(log_dir, exist_ok=True)
-    log_path = os.path.join(log_dir, f"{datetime.now().strftime('%Y-%m-%d')}.log")
+ROOT_LOGGER = "deltastrik"
 
-    logger = logging.getLogger(name)
-    if logger.hasHandlers():
-        return logger  # prevent duplicate handlers
+# Size caps for anything derived from conversation content
+MAX_LOG_CHARS = 500
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 3
 
-    logger.setLevel(logging.DEBUG)
+_listener: Optional[logging.handlers.QueueListener] = None
+_file_handler: Optional["LazyRotatingFileHandler"] = None
+
+
+class LazyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated file handler that creates its directory and opens the file only on the first record."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES, backup_count: int = DEFAULT_BACKUPS):
+        super().__init__(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that hands the record over as-is. The stock ``prepare`` formats
+    the message on the calling thread; here formatting happens on the listener
+    thread instead. Safe because the queue is in-process and log arguments are
+    immutable (strings and numbers).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def _configure_root(log_dir: str) -> logging.Logger:
+    """
+    Attach one queue handler to the package root logger; named loggers propagate
+    to it. File (and opt-in console) I/O run on a QueueListener thread, off the hot path.
+    """
+    global _listener, _file_handler
+    root = logging.getLogger(ROOT_LOGGER)
+    if root.handlers:
+        return root  # prevent duplicate handlers
+
+    root.setLevel(DEFAULT_LOG_LEVEL)
 
     # File handler
-    file_handler = logging.FileHandler(log_path, encoding="utf-8")
-    file_handler.setLevel(logging.DEBUG)
+    _file_handler = LazyRotatingFileHandler(os.path.join(log_dir, "deltastrik.log"))
+    _file_handler.setLevel(logging.DEBUG)
 
-    # Console handler (optional)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
+    handlers: List[logging.Handler] = [_file_handler]
+
+    # Console handler (opt-in)
+    if CONSOLE_LOG_LEVEL:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(logging.WARNING if CONSOLE_LOG_LEVEL in ("1", "TRUE", "YES", "ON") else CONSOLE_LOG_LEVEL)
+        handlers.append(console_handler)
 
     # Formatting
     formatter = logging.Formatter(
         fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
     # Attach handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    return root
+
+
+def configure_logging(level: Optional[str] = None, max_bytes: Optional[int] = None, backup_count: Optional[int] = None) -> None:
+    """Apply settings from the loaded config (level, rotation size and backups)."""
+    root = setup_logger()
+    if level:
+        root.setLevel(level.upper())
+    if _file_handler is not None:
+        if max_bytes is not None:
+            _file_handler.maxBytes = max_bytes
+        if backup_count is not None:
+            _file_handler.backupCount = backup_count
+
 
-    return logger
+def setup_logger(name: str = ROOT_LOGGER, log_dir: str = DEFAULT_LOG_DIR) -> logging.Logger:
+    """
+    Configure and return a named logger.
+    Cheap to call at import time: no directory or file is created until something is logged.
+    """
+    root = _configure_root(log_dir)
+    if name == ROOT_LOGGER:
+        return root
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def truncate(text: str, limit: int = MAX_LOG_CHARS) -> str:
+    """Cap ``text`` for logging; long values keep a prefix plus their length and a short hash."""
+    if len(text) <= limit:
+        return text
+    digest = hashlib.sha1(text.encode("utf-8", "replace"), usedforsecurity=False).hexdigest()[:12]
+    return f"{text[:limit]}... [{len(text)} chars, sha1 {digest}]"
+
+
+def describe_payload(payload: Dict[str, Any]) -> str:
+    """
+    One-line, size-bounded description of a chat payload: model, options and a
+    hash of the messages instead of the whole conversation.
+    """
+    messages = payload.get("messages") or []
+    chars = sum(len(m.get("content", "")) for m in messages)
+    digest = hashlib.sha1(repr(messages).encode("utf-8", "replace"), usedforsecurity=False).hexdigest()[:12]
+    last = truncate(messages[-1].get("content", ""), 200) if messages else ""
+    return (
+        f"model={payload.get('model')} stream={payload.get('stream')} options={payload.get('options')} messages={len(messages)} chars={chars} sha1={digest} last={last!r}"
+    )
@@ -0,0 +1,69 @@
+import asyncio
+import io
+import json
+
+from benchmarks.fake_ollama import REPLY, start_server
+from deltastrik.core.batch import BatchRunner, run_batch
+
+
+def _read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_resume_retries_only_unfinished_items(tmp_path):
+    server = start_server()
+    try:
+        source = tmp_path / "prompts.jsonl"
+        source.write_text("".join(json.dumps({"id": i, "prompt": f"prompt {i}"}) + "\n" for i in "abcd"), encoding="utf-8")
+        output = tmp_path / "results.jsonl"
+        # An earlier run: "a" answered, "b" failed, "c" was cut short mid-line, "d" never started
+        output.write_text(
+            json.dumps({"id": "a", "response": "old"}) + "\n" + json.dumps({"id": "b", "error": "[Error] boom"}) + "\n" + '{"id": "c", "resp',
+            encoding="utf-8",
+        )
+
+        runner = run_batch({"ollama_urls": [server.url]}, str(source), str(output), concurrency=2, resume=True)
+
+        assert (runner.skipped, runner.completed, runner.failed) == (1, 3, 0)
+        assert server.requests == 3
+        with open(output, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        assert lines[2] == '{"id": "c", "resp'  # the partial line stays on its own
+        new = [json.loads(line) for line in lines[3:]]
+        assert sorted(r["id"] for r in new) == ["b", "c", "d"]
+        assert all(r["response"] == REPLY and "error" not in r for r in new)
+    finally:
+        server.shutdown()
+
+
+def test_input_is_read_at_most_a_few_items_ahead(tmp_path):
+    server = start_server(latency_ms=50)
+
+    class CountingSource(io.StringIO):
+        reads = 0
+
+        def readline(self, *args):
+            CountingSource.reads += 1
+            return super().readline(*args)
+
+    class RecordingSink(io.StringIO):
+        reads_at_first_write = None
+
+        def write(self, text):
+            if RecordingSink.reads_at_first_write is None:
+                RecordingSink.reads_at_first_write = CountingSource.reads
+            return super().write(text)
+
+    try:
+        runner = BatchRunner({"ollama_urls": [server.url]}, concurrency=1)
+        source = CountingSource("".join(f'"prompt {i}"\n' for i in range(50)))
+        sink = RecordingSink()
+        asyncio.run(runner.run(source, sink))
+
+        # One item in flight plus a queue of two, and the line waiting to be queued
+        assert RecordingSink.reads_at_first_write <= 4
+        assert runner.completed == 50
+        assert len(sink.getvalue().splitlines()) == 50
+    finally:
+        server.shutdown()
@@ -0,0 +1,48 @@
+import io
+import itertools
+
+import pytest
+from rich.console import Console
+
+from deltastrik.tui.chat_view import StreamingMarkdown, render_message, split_settled
+
+BLOCKS = ["para", "- a\n- b", "## h", "```\nx\n\ny\n```", "1. x", "> q", "---", "| a | b |\n|---|---|\n| 1 | 2 |"]
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ("one line", ("", "one line")),
+        ("a\n\nb", ("a", "b")),
+        ("a\n\nb\n\nc", ("a\n\nb", "c")),
+        ("a\n\n```\nx\n\ny", ("a", "```\nx\n\ny")),  # inside an open fence
+        ("a\n\n```\nx\n\ny\n```\n\nb", ("a\n\n```\nx\n\ny\n```", "b")),
+        # A list can go on after a blank line, so it stays unsettled until a block after it
+        ("a\n\n- x\n\n- y", ("", "a\n\n- x\n\n- y")),
+        ("a\n\n1. x\n\n   more\n\nb", ("a\n\n1. x\n\n   more", "b")),
+    ],
+)
+def test_split_settled(content, expected):
+    assert split_settled(content) == expected
+
+
+def _text_lines(console, renderable):
+    return ["".join(segment.text for segment in line) for line in console.render_lines(renderable, pad=False)]
+
+
+@pytest.mark.parametrize("blocks", list(itertools.product(BLOCKS, repeat=2)))
+def test_streamed_render_matches_full_render(blocks):
+    reply = "\n\n".join(("para",) + blocks)
+    console = Console(file=io.StringIO(), width=60)
+    stream = StreamingMarkdown()
+    for end in range(0, len(reply), 3):
+        console.render_lines(render_message("assistant", reply[:end], stream), pad=False)
+    assert _text_lines(console, render_message("assistant", reply, stream)) == _text_lines(console, render_message("assistant", reply))
+
+
+def test_streamed_render_starts_over_on_a_new_width():
+    reply = "para\n\n## heading\n\nmore text"
+    stream = StreamingMarkdown()
+    _text_lines(Console(file=io.StringIO(), width=80), render_message("assistant", reply, stream))
+    narrow = Console(file=io.StringIO(), width=30)
+    assert _text_lines(narrow, render_message("assistant", reply, stream)) == _text_lines(narrow, render_message("assistant", reply))
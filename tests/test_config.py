@@ -0,0 +1,101 @@
+import os
+from typing import Any, List, Optional
+
+import pytest
+
+from deltastrik.core.config import Config, ConfigError, _coerce
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    # A distinct mtime even within the filesystem's timestamp resolution
+    stamp = path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(stamp, stamp))
+
+
+@pytest.mark.parametrize(
+    "value, kind, expected",
+    [
+        ("yes", bool, True),
+        ("Off", bool, False),
+        ("3", int, 3),
+        ("2.0", int, 2),
+        ("0.5", float, 0.5),
+        ("none", Optional[int], None),
+        ("7", Optional[int], 7),
+        ("a, b,,c", List[str], ["a", "b", "c"]),
+        ("45", Any, 45),
+        ("30m", Any, "30m"),
+    ],
+)
+def test_coerce_converts_to_the_setting_type(value, kind, expected):
+    assert _coerce(value, kind) == expected
+
+
+@pytest.mark.parametrize(
+    "value, kind",
+    [
+        ("maybe", bool),
+        ("1.5", int),
+        ("fast", float),
+        (True, int),
+        ([1], float),
+        ({"a": 1}, str),
+        (3, List[str]),
+    ],
+)
+def test_coerce_rejects_values_of_the_wrong_type(value, kind):
+    with pytest.raises(ValueError):
+        _coerce(value, kind)
+
+
+def test_bad_value_names_its_setting_and_source(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "max_tokens: lots\n")
+    with pytest.raises(ConfigError, match=r"config.yaml: max_tokens: expected a number"):
+        Config.load(str(path), env={})
+    with pytest.raises(ConfigError, match=r"\$DELTASTRIK_STREAM: stream"):
+        Config.load(str(tmp_path / "missing.yaml"), env={"DELTASTRIK_STREAM": "sometimes"})
+
+
+def test_layers_override_in_order(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "model: from-file\ntemperature: 0.1\nmax_tokens: 10\ncustom: kept\n")
+    env = {"DELTASTRIK_TEMPERATURE": "0.2", "DELTASTRIK_MAX_TOKENS": "20", "OTHER_TEMPERATURE": "9"}
+    config = Config.load(str(path), env=env, overrides={"max_tokens": "30"})
+    assert config.model == "from-file"  # file over default
+    assert config.temperature == 0.2  # environment over file
+    assert config.max_tokens == 30  # overrides over environment
+    assert config.timeout == 60  # default
+    assert config["custom"] == "kept"
+
+
+def test_config_path_from_environment(tmp_path):
+    path = tmp_path / "elsewhere.yaml"
+    _write(path, "model: elsewhere\n")
+    config = Config.load(env={"DELTASTRIK_CONFIG": str(path)})
+    assert config.path == str(path)
+    assert config.model == "elsewhere"
+
+
+def test_reload_applies_file_edits_but_keeps_runtime_overrides(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "model: first\ntemperature: 0.1\n")
+    config = Config.load(str(path), env={})
+    config["model"] = "picked-at-runtime"
+    assert config.reload() == {}  # file unchanged
+
+    _write(path, "model: second\ntemperature: 0.3\n")
+    changed = config.reload()
+    assert changed == {"temperature": (0.1, 0.3)}
+    assert config.model == "picked-at-runtime"
+    assert config.temperature == 0.3
+
+
+def test_reload_keeps_settings_when_the_file_breaks(tmp_path):
+    path = tmp_path / "config.yaml"
+    _write(path, "temperature: 0.1\n")
+    config = Config.load(str(path), env={})
+    _write(path, "temperature: [not, a, number]\n")
+    assert config.reload() == {}
+    assert config.temperature == 0.1
@@ -0,0 +1,84 @@
+import pytest
+
+from deltastrik.core.context_window import MESSAGE_OVERHEAD, ContextWindow, TokenEstimator
+from deltastrik.core.message import Message
+
+
+def _window(messages, budget):
+    history = [Message(role, content) for role, content in messages]
+    window = ContextWindow(budget)
+    window.rebuild(history)
+    return window, history
+
+
+def test_count_is_characters_per_token_plus_overhead():
+    estimator = TokenEstimator()
+    assert estimator.count("") == MESSAGE_OVERHEAD
+    assert estimator.count("x" * 9) == 3 + MESSAGE_OVERHEAD
+
+
+def test_calibration_converges_on_the_observed_ratio():
+    estimator = TokenEstimator()
+    for _ in range(30):
+        estimator.calibrate(100, 150)
+    assert estimator.scale == pytest.approx(1.5, abs=0.01)
+    # KV cache reuse (a far smaller count) and nonsense values leave it alone
+    estimator.calibrate(100, 10)
+    estimator.calibrate(0, 100)
+    assert estimator.scale == pytest.approx(1.5, abs=0.01)
+
+
+def test_calibration_ratio_is_capped():
+    estimator = TokenEstimator()
+    for _ in range(50):
+        estimator.calibrate(10, 1000)
+    assert estimator.scale == pytest.approx(4.0, abs=0.01)
+
+
+def test_empty_history_selects_nothing():
+    window = ContextWindow(100)
+    assert window.select([]) == []
+    assert window.select([], fixed_raw=1000) == []
+    assert window.selected_raw() == 0
+
+
+def test_select_keeps_the_newest_turns_that_fit():
+    window, history = _window([("user", "a" * 40), ("assistant", "b" * 40), ("user", "c" * 40)], budget=30)
+    assert window.select(history) == history[1:]  # 14 raw tokens each
+    assert window.selected_raw() == 28
+
+
+def test_pinned_system_message_larger_than_the_budget_is_still_sent():
+    window, history = _window([("system", "s" * 400), ("user", "hi"), ("assistant", "hello")], budget=50)
+    assert window.select(history) == [history[0]]
+    assert window.selected_raw() == window.tokens[0]
+
+
+def test_selection_grows_back_when_calibration_lowers_the_scale():
+    window, history = _window([("user", "a" * 40), ("assistant", "b" * 40), ("user", "c" * 40)], budget=30)
+    window.estimator.scale = 2.0
+    assert window.select(history) == history[2:]
+    window.estimator.scale = 1.0
+    assert window.select(history) == history[1:]
+
+
+def test_old_pin_is_kept_ahead_of_the_window():
+    window, history = _window([("user", "pin me"), ("assistant", "b" * 40), ("user", "c" * 40)], budget=30)
+    window.pin(0)
+    assert window.select(history) == [history[0], history[2]]
+    window.unpin_all()
+    assert window.select(history) == history[1:]
+
+
+def test_fold_prefix_reuses_counts_and_shifts_pins():
+    window, history = _window([("user", "a" * 40), ("assistant", "b" * 40), ("user", "c" * 20), ("assistant", "d" * 80)], budget=1000)
+    window.pin(3)
+    kept = window.tokens[2:]
+    summary_tokens = window.fold_prefix(2, "summary")
+    assert summary_tokens == window.estimator.count("summary")
+    assert window.tokens == [summary_tokens, *kept]
+    assert window.total_tokens == summary_tokens + sum(kept)
+    assert window.pinned == [0, 2]  # the summary, and old index 3
+    folded = [Message("system", "summary"), *history[2:]]
+    assert window.select(folded) == folded
+    assert window.selected_raw() == window.total_tokens
@@ -0,0 +1,69 @@
+import json
+
+from deltastrik.core.input_history import REWRITE_FACTOR, InputHistory
+
+
+def _history(entries, **kwargs):
+    history = InputHistory(**kwargs)
+    for entry in entries:
+        history.add(entry)
+    return history
+
+
+def _write_lines(path, texts):
+    path.write_text("".join(json.dumps(text) + "\n" for text in texts), encoding="utf-8")
+
+
+def test_search_ranks_exact_then_near_then_loose_newest_first():
+    history = _history(["g-a-a-a-a-i-t far apart", "GIT commit", "g_i_t close", "unrelated", "le git newest", "g__i__t close too"])
+    assert history.search("git") == ["le git newest", "GIT commit", "g__i__t close too", "g_i_t close", "g-a-a-a-a-i-t far apart"]
+    assert history.search("git", limit=2) == ["le git newest", "GIT commit"]
+    assert history.search("") == ["g__i__t close too", "le git newest", "unrelated", "g_i_t close", "GIT commit", "g-a-a-a-a-i-t far apart"]
+    assert history.search("tig") == []
+
+
+def test_typing_narrows_to_the_same_results_as_a_fresh_search():
+    entries = [f"entry {i} {'git' if i % 3 == 0 else 'g i t' if i % 3 == 1 else 'gxxxxit'}" for i in range(300)]
+    typed = _history(entries)
+    for end in range(1, 6):
+        typed.search("git s"[:end])
+    fresh = _history(entries)
+    assert typed.search("git") == fresh.search("git")
+    assert typed.search("gi", limit=500) == fresh.search("gi", limit=500)
+
+
+def test_complete_returns_the_newest_longer_entry():
+    history = _history(["git status", "git", "git stash", "ls"])
+    assert history.complete("GIT S") == "git stash"
+    assert history.complete("git") == "git stash"
+    assert history.complete("ls") is None
+    assert history.complete("") is None
+
+
+def test_load_keeps_the_newest_distinct_entries_up_to_the_cap(tmp_path):
+    path = tmp_path / "history.jsonl"
+    _write_lines(path, [f"cmd {i}" for i in range(12)] + ["cmd 3"])
+    history = InputHistory(str(path), max_entries=7)
+    # A repeat counts once, at its newest position
+    assert list(history.entries) == ["cmd 6", "cmd 7", "cmd 8", "cmd 9", "cmd 10", "cmd 11", "cmd 3"]
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 13  # under the rewrite threshold: untouched
+
+
+def test_load_rewrites_a_file_far_past_the_cap(tmp_path):
+    path = tmp_path / "history.jsonl"
+    texts = [f"cmd {i % 8}" for i in range(REWRITE_FACTOR * 5 + 1)]
+    _write_lines(path, texts[:4] + ["{cut short"] + texts[4:])
+    history = InputHistory(str(path), max_entries=5)
+    expected = ["cmd 6", "cmd 7", "cmd 0", "cmd 1", "cmd 2"]
+    assert list(history.entries) == expected
+    assert [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()] == expected
+    assert list(InputHistory(str(path), max_entries=5).entries) == expected
+
+
+def test_add_trims_at_the_cap_and_compacts_the_file(tmp_path):
+    path = tmp_path / "history.jsonl"
+    history = InputHistory(str(path), max_entries=3)
+    for i in range(REWRITE_FACTOR * 3 + 1):
+        history.add(f"cmd {i}")
+    assert list(history.entries) == ["cmd 4", "cmd 5", "cmd 6"]
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 3
@@ -0,0 +1,40 @@
+import hashlib
+
+from deltastrik.utils.logging_utils import MAX_LOG_CHARS, describe_payload, truncate
+
+
+def _sha1(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8"), usedforsecurity=False).hexdigest()[:12]
+
+
+def test_truncate_keeps_short_text():
+    assert truncate("hello") == "hello"
+    assert truncate("x" * MAX_LOG_CHARS) == "x" * MAX_LOG_CHARS
+
+
+def test_truncate_caps_long_text_and_hashes_it():
+    text = "é" * 40 + "y" * 2000
+    out = truncate(text)
+    assert out.startswith(text[:MAX_LOG_CHARS] + "...")
+    assert out.endswith(f"[{len(text)} chars, sha1 {_sha1(text)}]")
+    assert len(out) < MAX_LOG_CHARS + 50
+    assert truncate(text, 10).startswith(text[:10] + "...")
+
+
+def test_describe_payload_is_bounded_and_hashes_messages():
+    messages = [{"role": "system", "content": "s" * 10_000}, {"role": "user", "content": "q" * 5_000}]
+    payload = {"model": "m", "stream": True, "options": {"temperature": 0.1}, "messages": messages}
+    out = describe_payload(payload)
+    assert len(out) < 500
+    assert "messages=2 chars=15000" in out
+    assert f"sha1={_sha1(repr(messages))}" in out
+    assert "model=m stream=True" in out
+    # Same content hashes the same; any edit changes the hash
+    assert describe_payload(dict(payload)) == out
+    messages[1]["content"] += "!"
+    assert f"sha1={_sha1(repr(messages))}" in describe_payload(payload)
+    assert describe_payload(payload) != out
+
+
+def test_describe_payload_without_messages():
+    assert describe_payload({"model": "m"}).endswith("messages=0 chars=0 sha1=" + _sha1("[]") + " last=''")
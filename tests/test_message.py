@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from deltastrik.core.message import Message, encode_messages, encode_payload
+
+TEXTS = [
+    "plain",
+    "naïve café — ünïcødé, 中文, emoji 🚀",
+    'quotes " and \\ backslashes \\n literal',
+    "control\n\ttab\r\x00\x1f and \u2028 line separator",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_encoded_payload_round_trips(text):
+    payload = {
+        "model": "m",
+        "stream": True,
+        "options": {"temperature": 0.1, "stop": ["\n\n", "é"]},
+        "messages": [Message("system", text), {"role": "user", "content": text}, Message("assistant", text[::-1])],
+    }
+    assert json.loads(encode_payload(payload)) == payload
+
+
+def test_mixed_messages_keep_extra_dict_fields():
+    messages = [Message("user", "look"), {"role": "user", "content": "at this", "images": ["aGk="]}]
+    body = encode_payload({"model": "m", "messages": messages})
+    assert json.loads(body) == {"model": "m", "messages": [{"role": "user", "content": "look"}, messages[1]]}
+
+
+def test_payload_with_only_messages_or_none():
+    messages = [Message("user", "é")]
+    assert json.loads(encode_payload({"messages": messages})) == {"messages": [{"role": "user", "content": "é"}]}
+    assert json.loads(encode_payload({"messages": []})) == {"messages": []}
+    assert json.loads(encode_payload({"model": "m", "keep_alive": "30m"})) == {"model": "m", "keep_alive": "30m"}
+
+
+def test_fragments_are_cached_and_utf8():
+    message = Message("user", "ünïcødé")
+    body = encode_messages([message, message])
+    assert message.encoded is message.encoded
+    assert "ünïcødé".encode("utf-8") in body
+    assert json.loads(body) == [message.to_dict()] * 2
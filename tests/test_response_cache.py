@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from deltastrik.core import prompt_engine
+from deltastrik.core.ollama_client import OllamaClient
+from deltastrik.core.prompt_engine import build_runtime_context, build_system_prompt
+
+
+class FakeTransport:
+    def __init__(self):
+        self.posts = 0
+
+    def post_json(self, url, payload, timeout):
+        self.posts += 1
+        return {"model": payload["model"], "message": {"role": "assistant", "content": f"reply {self.posts}"}, "done": True}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock for the prompt engine that tests move forward by hand."""
+    now = [datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)]
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0]
+
+    monkeypatch.setattr(prompt_engine, "datetime", FrozenDatetime)
+    return now
+
+
+@pytest.mark.parametrize("layout", ["stable", "classic"])
+def test_cache_hits_after_the_clock_moves(clock, layout):
+    config = {"response_cache": True, "response_cache_path": None, "temperature": 0, "prompt_layout": layout}
+    transport = FakeTransport()
+    client = OllamaClient(config, transport=transport)
+
+    def ask(question):
+        return client.query(build_system_prompt(config), question, runtime_context=build_runtime_context(config))
+
+    assert ask("hello") == "reply 1"
+    clock[0] += timedelta(hours=3)
+    assert ask("hello") == "reply 1"
+    assert transport.posts == 1
+    assert client.cache.hits == 1
+
+    # Only the time is ignored: a different question is still a miss
+    assert ask("goodbye") == "reply 2"
+    assert transport.posts == 2
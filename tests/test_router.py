@@ -0,0 +1,92 @@
+import asyncio
+
+import socket
+
+import pytest
+
+from benchmarks.fake_ollama import REPLY, start_server
+from deltastrik.core.ollama_client import OllamaClient
+from deltastrik.core.router import can_fail_over, is_endpoint_failure
+from deltastrik.core.transport import TransportError
+
+
+class HangingTransport:
+    """Async transport whose requests never answer, so they can only end by cancellation."""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+
+    async def post_json(self, url, payload, timeout):
+        self.started.set()
+        await asyncio.Event().wait()
+
+
+@pytest.mark.parametrize("call", ["aquery", "aembed"])
+def test_cancelled_request_releases_its_endpoint(call):
+    async def run():
+        transport = HangingTransport()
+        client = OllamaClient({"ollama_urls": ["http://a:11434", "http://b:11434"]}, async_transport=transport)
+        if call == "aquery":
+            task = asyncio.create_task(client.aquery("system", "hello"))
+        else:
+            task = asyncio.create_task(client.aembed(["hello"], "embed-model"))
+        await transport.started.wait()
+        assert sum(endpoint.in_flight for endpoint in client.router.endpoints) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.router.aclose()
+        return client
+
+    client = asyncio.run(run())
+    assert [endpoint.in_flight for endpoint in client.router.endpoints] == [0, 0]
+    assert all(endpoint.healthy and endpoint.errors == 0 for endpoint in client.router.endpoints)
+
+
+@pytest.mark.parametrize(
+    "error, failure",
+    [
+        (ConnectionRefusedError(), True),
+        (TimeoutError(), True),
+        (TransportError(503), True),
+        (TransportError(404), False),
+        (ValueError("bad JSON"), False),
+        (KeyError("message"), False),
+    ],
+)
+def test_only_unreachable_or_failing_servers_count_against_an_endpoint(error, failure):
+    assert is_endpoint_failure(error) is failure
+
+
+def _refused_url():
+    """An address nothing listens on: bound, never accepting."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+@pytest.mark.parametrize("call", ["query", "stream_query"])
+def test_blocking_requests_fail_over_from_a_refused_endpoint(call):
+    server = start_server()
+    try:
+        client = OllamaClient({"ollama_urls": [_refused_url(), server.url], "timeout": 5})
+        if call == "query":
+            reply = client.query("system", "hello")
+        else:
+            reply = "".join(client.chunk_text(chunk) for chunk in client.stream_query("system", "hello"))
+        dead, live = client.router.endpoints
+        assert reply == REPLY
+        assert (dead.requests, dead.errors) == (1, 1)
+        assert live.requests == 1
+        client.transport.close()
+    finally:
+        server.shutdown()
+
+
+def test_a_connection_dropped_after_sending_is_not_failed_over():
+    requests = pytest.importorskip("requests")
+    from urllib3.exceptions import ProtocolError
+
+    aborted = requests.ConnectionError(ProtocolError("Connection aborted.", ConnectionResetError()))
+    assert not can_fail_over(aborted)
+    assert can_fail_over(requests.ConnectTimeout())
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from deltastrik.core.router import EndpointRouter
+from deltastrik.core.scheduler import RequestScheduler
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_flooding_tab_cannot_starve_another():
+    async def run():
+        scheduler = RequestScheduler(EndpointRouter(["http://a:11434"], slots=1))
+        served = []
+        release = {}
+
+        async def request(owner, n):
+            async with scheduler.slot(owner):
+                served.append(f"{owner}{n}")
+                release[f"{owner}{n}"] = asyncio.Event()
+                await release[f"{owner}{n}"].wait()
+
+        flood = [asyncio.create_task(request("a", n)) for n in range(10)]
+        await _settle()
+        single = asyncio.create_task(request("b", 0))
+        await _settle()
+        assert served == ["a0"]
+        assert scheduler.waiting == 10
+        assert (scheduler.position("a"), scheduler.position("b"), scheduler.position("c")) == (1, 2, None)
+
+        release["a0"].set()
+        await _settle()
+        # a's next request was ahead of b's; once it is in, b is first in line
+        assert served == ["a0", "a1"]
+        assert (scheduler.position("a"), scheduler.position("b")) == (2, 1)
+
+        release["a1"].set()
+        await _settle()
+        assert served == ["a0", "a1", "b0"]
+        assert scheduler.position("b") is None
+
+        for name in ("b0", *(f"a{n}" for n in range(2, 10))):
+            release[name].set()
+            await _settle()
+        await asyncio.gather(single, *flood)
+        assert served[3:] == [f"a{n}" for n in range(2, 10)]
+        assert (scheduler.active, scheduler.waiting) == (0, 0)
+
+    asyncio.run(run())
+
+
+def test_owners_take_turns_when_both_have_several_waiting():
+    async def run():
+        scheduler = RequestScheduler(EndpointRouter(["http://a:11434"], slots=1))
+        gate = asyncio.Event()
+        served = []
+
+        async def request(owner, n):
+            async with scheduler.slot(owner):
+                served.append(f"{owner}{n}")
+                await gate.wait()
+
+        first = asyncio.create_task(request("x", 0))
+        await _settle()
+        tasks = [asyncio.create_task(request(owner, n)) for owner, n in [("a", 0), ("a", 1), ("a", 2), ("b", 0), ("b", 1)]]
+        await _settle()
+        gate.set()
+        await asyncio.gather(first, *tasks)
+        assert served == ["x0", "a0", "b0", "a1", "b1", "a2"]
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue_and_listeners_hear_of_it():
+    async def run():
+        scheduler = RequestScheduler(EndpointRouter(["http://a:11434"], slots=1))
+        changes = []
+        scheduler.subscribe(lambda: changes.append((scheduler.active, scheduler.waiting)))
+        await scheduler.acquire("a")
+        waiter = asyncio.create_task(scheduler.acquire("b"))
+        await _settle()
+        assert scheduler.position("b") == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert scheduler.position("b") is None
+        assert not scheduler.try_acquire()
+        scheduler.release()
+        assert scheduler.try_acquire()
+        assert changes == [(1, 0), (1, 1), (1, 0), (0, 0), (1, 0)]
+
+    asyncio.run(run())
+
+
+def test_capacity_follows_healthy_endpoints():
+    router = EndpointRouter(["http://a:11434", "http://b:11434"], slots=2)
+    scheduler = RequestScheduler(router)
+    assert scheduler.capacity == 4
+    router.endpoints[0].healthy = False
+    assert scheduler.capacity == 2
+    router.endpoints[1].healthy = False
+    assert scheduler.capacity == 2  # never zero: requests still go out and fail over
@@ -0,0 +1,51 @@
+import threading
+
+from deltastrik.core.session_store import SessionStore
+
+
+def test_queued_writes_commit_as_one_transaction(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    store.create_session("s", "2026-01-01T00:00:00")
+    store.flush()
+
+    # Hold the writer so the appends below queue up as one batch
+    started, release = threading.Event(), threading.Event()
+    store._submit(lambda conn: started.set() or release.wait(5))
+    started.wait(5)
+    statements = []
+    in_transaction = []
+    run_job = store._run_job
+
+    def tracing_job(conn, job):
+        conn.set_trace_callback(statements.append)
+        in_transaction.append(conn.in_transaction)
+        run_job(conn, job)
+
+    store._run_job = tracing_job
+    for seq in range(1, 21):
+        store.append_message("s", seq, "user", f"message {seq}", "2026-01-01T00:00:01")
+    release.set()
+    store.flush()
+    commits = sum(sql.strip().upper() == "COMMIT" for sql in statements)
+    store.close()
+
+    assert in_transaction == [True] * 20
+    assert commits == 1
+
+
+def test_a_failing_write_does_not_roll_back_its_batch(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    store.create_session("s", "2026-01-01T00:00:00")
+    store.append_message("s", 1, "user", "one", "2026-01-01T00:00:01")
+    store.flush()
+
+    release = threading.Event()
+    store._submit(lambda conn: release.wait(5))
+    store.append_message("s", 2, "user", "two", "2026-01-01T00:00:02")
+    store.append_message("s", 1, "user", "duplicate seq", "2026-01-01T00:00:03")
+    store.append_message("s", 3, "user", "three", "2026-01-01T00:00:04")
+    release.set()
+    store.flush()
+
+    assert [row["content"] for row in store.load_recent("s", 10)] == ["one", "two", "three"]
+    store.close()
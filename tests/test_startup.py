@@ -0,0 +1,21 @@
+import json
+import subprocess
+import sys
+
+from deltastrik.cli import STARTUP_MODULE, profile_import
+
+# Cold import of the TUI, best of a few runs (typically ~200 ms); generous for slow CI machines
+BUDGET_MS = 600
+# Deferred until first use; none of them may load just to start the TUI
+DEFERRED = ("requests", "yaml", "rich.markdown", "numpy")
+
+
+def test_cold_start_stays_under_budget():
+    best_us = min(profile_import()[0] for _ in range(3))
+    assert best_us / 1000 < BUDGET_MS
+
+
+def test_startup_does_not_import_deferred_modules():
+    code = f"import sys, json, {STARTUP_MODULE}; print(json.dumps([m for m in {DEFERRED!r} if m in sys.modules]))"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout) == []